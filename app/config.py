@@ -0,0 +1,91 @@
+import os
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# how /dashboard/today works out streaks:
+#   "state"  - read the incrementally maintained habit_streak_states rows
+#   "sql"    - gaps-and-islands window query inside the database
+#   "python" - load every log and run app.services.streaks
+#   "bitmap" - bit operations on habit_completion_bitmaps (app/services/bitmap.py)
+STREAK_BACKEND = os.getenv("STREAK_BACKEND", "state")
+
+# in-process cache of authenticated user rows (see app/services/user_cache.py);
+# a size of 0 turns it off
+USER_CACHE_SIZE = int(os.getenv("USER_CACHE_SIZE", "10000"))
+USER_CACHE_TTL_SECONDS = float(os.getenv("USER_CACHE_TTL_SECONDS", "300"))
+
+# bcrypt work factor for new hashes; stored hashes with another cost are
+# rehashed on the next successful login
+BCRYPT_ROUNDS = int(os.getenv("BCRYPT_ROUNDS", "12"))
+# password hashing runs in a process pool of this size (0 = the threadpool),
+# with at most PASSWORD_HASH_MAX_PENDING jobs queued before answering 503
+PASSWORD_HASH_WORKERS = int(os.getenv("PASSWORD_HASH_WORKERS", str(os.cpu_count() or 1)))
+PASSWORD_HASH_MAX_PENDING = int(os.getenv("PASSWORD_HASH_MAX_PENDING", str(4 * max(PASSWORD_HASH_WORKERS, 1))))
+
+# verified JWTs kept by decode_access_token (0 turns the cache off)
+TOKEN_CACHE_SIZE = int(os.getenv("TOKEN_CACHE_SIZE", "10000"))
+
+# map ORM rows straight to dicts and write them with orjson on the dashboard
+# and listing routes, skipping pydantic validation of the response
+FAST_SERIALIZATION = os.getenv("FAST_SERIALIZATION", "false").lower() in ("1", "true", "yes")
+
+# per-request SQL/auth/streak timings in a Server-Timing header, aggregated
+# into the Prometheus histograms served at /metrics
+METRICS_ENABLED = os.getenv("METRICS_ENABLED", "true").lower() in ("1", "true", "yes")
+
+# SQLite connection profile, applied as PRAGMAs on every new connection:
+#   "tuned"   - WAL, synchronous=NORMAL, 64 MB page cache, 256 MB mmap
+#   "durable" - as tuned but synchronous=FULL (fsync on every commit)
+#   "stock"   - SQLite's defaults (rollback journal, synchronous=FULL)
+SQLITE_PROFILE = os.getenv("SQLITE_PROFILE", "tuned")
+# how long a writer waits for the lock before "database is locked"
+SQLITE_BUSY_TIMEOUT_MS = int(os.getenv("SQLITE_BUSY_TIMEOUT_MS", "5000"))
+
+# connection pool per process for Postgres
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "5"))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "10"))
+DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", "30"))
+# seconds before a connection is replaced (-1 = never); keep it below any
+# idle timeout a proxy such as PgBouncer applies
+DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", "1800"))
+
+# run pending migrations when a worker starts instead of failing; only for a
+# single-process setup such as local development, since workers would race
+AUTO_MIGRATE = os.getenv("AUTO_MIGRATE", "false").lower() in ("1", "true", "yes")
+
+# dashboard payloads kept per user, validated by local date and data_version
+# (0 turns the store off)
+DASHBOARD_STORE_SIZE = int(os.getenv("DASHBOARD_STORE_SIZE", "10000"))
+# precompute every user's dashboard at their timezone's midnight, in a pool
+# of DASHBOARD_PRECOMPUTE_WORKERS processes (0 = the request threadpool), on
+# whichever worker holds the lease; the others read the saved snapshots
+DASHBOARD_PRECOMPUTE = os.getenv("DASHBOARD_PRECOMPUTE", "false").lower() in ("1", "true", "yes")
+DASHBOARD_PRECOMPUTE_WORKERS = int(os.getenv("DASHBOARD_PRECOMPUTE_WORKERS", "2"))
+
+# comma-separated database URLs, one per shard; users (and everything they
+# own) are spread over these, while DATABASE_URL becomes the directory that
+# holds credentials and the user -> shard map. Empty keeps one database.
+SHARD_DATABASE_URLS = [url.strip() for url in os.getenv("SHARD_DATABASE_URLS", "").split(",") if url.strip()]
+# how long a worker trusts its cached user -> shard mapping
+SHARD_MAP_TTL = float(os.getenv("SHARD_MAP_TTL", "60"))
+# habit and log ids each worker reserves from the directory at a time
+SHARD_ID_BLOCK_SIZE = int(os.getenv("SHARD_ID_BLOCK_SIZE", "1000"))
+
+# queue POST /habits/{id}/logs inserts and commit them together, one
+# transaction per GROUP_COMMIT_WINDOW_MS or GROUP_COMMIT_MAX_ROWS rows
+GROUP_COMMIT = os.getenv("GROUP_COMMIT", "false").lower() in ("1", "true", "yes")
+GROUP_COMMIT_WINDOW_MS = float(os.getenv("GROUP_COMMIT_WINDOW_MS", "5"))
+GROUP_COMMIT_MAX_ROWS = int(os.getenv("GROUP_COMMIT_MAX_ROWS", "256"))
+# logs waiting for a writer before further requests get 503
+GROUP_COMMIT_MAX_PENDING = int(os.getenv("GROUP_COMMIT_MAX_PENDING", str(4 * GROUP_COMMIT_MAX_ROWS)))
+# requests are answered once their batch has committed:
+#   "commit" - with the database's own durability (SQLITE_PROFILE)
+#   "full"   - on SQLite, each batch commits with synchronous=FULL even
+#              under the tuned profile; one fsync per batch, not per log
+GROUP_COMMIT_DURABILITY = os.getenv("GROUP_COMMIT_DURABILITY", "commit")
+
+# seconds between keep-alive comments on GET /dashboard/stream, so proxies
+# don't cut idle connections
+SSE_HEARTBEAT_SECONDS = float(os.getenv("SSE_HEARTBEAT_SECONDS", "15"))
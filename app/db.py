@@ -1,18 +1,105 @@
 import os
-from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker
+from typing import Dict, Optional, Tuple
+
+from sqlalchemy import create_engine, event
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.engine import Engine
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, async_sessionmaker, create_async_engine
+from sqlalchemy.orm import Session, sessionmaker
+
+from app import config
+from app.services.metrics import instrument_engine
 
 DATABASE_URL = os.getenv("DATABASE_URL", 'sqlite:///Habit-Tracker.db')
 
-if DATABASE_URL.startswith("sqlite"):
-    engine = create_engine(
-        DATABASE_URL,
-        connect_args={"check_same_thread":False},
-    )
-else:
-    engine = create_engine(
-        DATABASE_URL,
-        pool_pre_ping=True,
-    )
-
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
\ No newline at end of file
+def to_async_url(url: str) -> str:
+    scheme, sep, rest = url.partition("://")
+    driver = scheme.split("+")[0]
+    if driver == "sqlite":
+        return f"sqlite+aiosqlite{sep}{rest}"
+    if driver in ("postgres", "postgresql"):
+        return f"postgresql+asyncpg{sep}{rest}"
+    return url
+
+ASYNC_DATABASE_URL = os.getenv("ASYNC_DATABASE_URL", to_async_url(DATABASE_URL))
+
+SQLITE_PROFILES: Dict[str, Dict[str, str]] = {
+    "tuned": {
+        # readers no longer block the writer (or each other)
+        "journal_mode": "WAL",
+        # in WAL mode NORMAL only skips the fsync per commit; a power loss can
+        # drop the last commits but never corrupts the database
+        "synchronous": "NORMAL",
+        "cache_size": "-65536",  # KiB, so 64 MB
+        "mmap_size": str(256 * 1024 * 1024),
+        "temp_store": "MEMORY",
+    },
+    "durable": {
+        "journal_mode": "WAL",
+        "synchronous": "FULL",
+        "cache_size": "-65536",
+        "mmap_size": str(256 * 1024 * 1024),
+        "temp_store": "MEMORY",
+    },
+    "stock": {},
+}
+
+def sqlite_pragmas(profile: str) -> Dict[str, str]:
+    if profile not in SQLITE_PROFILES:
+        raise ValueError(f"Unknown SQLITE_PROFILE {profile!r}, expected one of {', '.join(SQLITE_PROFILES)}")
+    return {**SQLITE_PROFILES[profile], "busy_timeout": str(config.SQLITE_BUSY_TIMEOUT_MS)}
+
+def install_sqlite_pragmas(sync_engine: Engine, pragmas: Dict[str, str]) -> None:
+    """Runs the PRAGMAs on every new DBAPI connection (pass async_engine.sync_engine for async)."""
+    @event.listens_for(sync_engine, "connect")
+    def _set_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        try:
+            for name, value in pragmas.items():
+                cursor.execute(f"PRAGMA {name}={value}")
+        finally:
+            cursor.close()
+
+def create_engines(
+    database_url: str,
+    async_database_url: str,
+    sqlite_profile: Optional[str] = None,
+) -> Tuple[Engine, AsyncEngine]:
+    if database_url.startswith("sqlite"):
+        pragmas = sqlite_pragmas(sqlite_profile or config.SQLITE_PROFILE)
+        sync_engine = create_engine(database_url, connect_args={"check_same_thread": False})
+        async_engine = create_async_engine(async_database_url)
+        install_sqlite_pragmas(sync_engine, pragmas)
+        install_sqlite_pragmas(async_engine.sync_engine, pragmas)
+        return sync_engine, async_engine
+
+    pool = {
+        "pool_pre_ping": True,
+        "pool_size": config.DB_POOL_SIZE,
+        "max_overflow": config.DB_MAX_OVERFLOW,
+        "pool_timeout": config.DB_POOL_TIMEOUT,
+        "pool_recycle": config.DB_POOL_RECYCLE,
+    }
+    return create_engine(database_url, **pool), create_async_engine(async_database_url, **pool)
+
+# the blocking engine is kept for migrations and command line tools;
+# request handlers go through async_engine
+engine, async_engine = create_engines(DATABASE_URL, ASYNC_DATABASE_URL)
+
+# query counts and SQL time per request (app/services/metrics.py)
+instrument_engine(engine)
+instrument_engine(async_engine.sync_engine)
+
+SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+# expire_on_commit=False so handlers can return rows after commit without
+# triggering implicit (and in async, illegal) lazy reloads
+AsyncSessionLocal = async_sessionmaker(
+    async_engine, class_=AsyncSession, autoflush=False, expire_on_commit=False,
+)
+
+def dialect_insert(db: Session):
+    # INSERT .. ON CONFLICT support lives in the dialect-specific insert()
+    if db.get_bind().dialect.name == "postgresql":
+        return postgresql.insert
+    return sqlite.insert
@@ -1,27 +1,55 @@
-from typing import Generator
+from typing import AsyncGenerator
 
 from fastapi import Depends, HTTPException, status
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 
-from .db import SessionLocal
+from .db import AsyncSessionLocal
 from . import models
 from .security import decode_access_token, TokenPayload
+from .services.metrics import timed
+from .services.user_cache import get_user_cache, user_from_cache, user_to_cache
+from .shards import get_shard_router
 
-def get_db() -> Generator[Session, None, None]:
-    db = SessionLocal()
-    try:
+async def get_directory_db() -> AsyncGenerator[AsyncSession, None]:
+    """DATABASE_URL: the only database, or the shard directory (app/shards.py)."""
+    async with AsyncSessionLocal() as db:
         yield db
-    finally:
-        db.close()
 
-def get_current_user(
-    db: Session = Depends(get_db),
+async def get_db(
     token: TokenPayload = Depends(decode_access_token),
-):
-    user = db.query(models.User).filter(models.User.id == token.sub).first()
-    if not user:
+    directory: AsyncSession = Depends(get_directory_db),
+) -> AsyncGenerator[AsyncSession, None]:
+    """The database holding the authenticated user's data."""
+    router = get_shard_router()
+    if not router.enabled:
+        yield directory
+        return
+    shard = await router.shard_for(directory, token.sub)
+    # don't hold a directory connection (or SQLite read snapshot) for the request
+    await directory.close()
+    if shard is None:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="User not found"
         )
-    return user
\ No newline at end of file
+    async with router.async_sessionmakers[shard]() as db:
+        yield db
+
+async def get_current_user(
+    db: AsyncSession = Depends(get_db),
+    token: TokenPayload = Depends(decode_access_token),
+):
+    with timed("auth"):
+        cache = get_user_cache()
+        cached = cache.get(token.sub)
+        if cached is not None:
+            return user_from_cache(cached)
+
+        user = await db.get(models.User, token.sub)
+        if not user:
+            raise HTTPException(
+                status_code=status.HTTP_401_UNAUTHORIZED,
+                detail="User not found"
+            )
+        cache.set(user.id, user_to_cache(user))
+        return user
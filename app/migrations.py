@@ -0,0 +1,133 @@
+"""
+Minimal, ordered schema migrations for SQLite and Postgres.
+
+Each step runs once per database and is recorded in ``schema_migrations``.
+Run them with ``python -m app.migrations`` once per deployment, before the
+workers start; workers only check that nothing is pending.
+"""
+from typing import Callable, List, Tuple
+
+from sqlalchemy import Column, DateTime, MetaData, String, Table, func, inspect, select, text
+from sqlalchemy.engine import Connection, Engine
+from sqlalchemy.orm import Session
+
+from app import models
+from app.services.rollups import rebuild_all_rollups
+
+migration_metadata = MetaData()
+
+schema_migrations = Table(
+    "schema_migrations",
+    migration_metadata,
+    Column("version", String, primary_key=True),
+    Column("applied_at", DateTime(timezone=True), server_default=func.now()),
+)
+
+def _create_missing_tables(conn: Connection) -> None:
+    models.Base.metadata.create_all(bind=conn)
+
+def _dedupe_habit_logs_and_add_indexes(conn: Connection) -> None:
+    duplicated_habit_ids = [
+        row[0] for row in conn.execute(text(
+            "SELECT DISTINCT habit_id FROM habit_logs "
+            "GROUP BY habit_id, date HAVING COUNT(*) > 1"
+        ))
+    ]
+    if duplicated_habit_ids:
+        conn.execute(text(
+            "DELETE FROM habit_logs WHERE id NOT IN ("
+            "SELECT keep_id FROM (SELECT MIN(id) AS keep_id FROM habit_logs GROUP BY habit_id, date) AS keep"
+            ")"
+        ))
+        # streak states counted the duplicates; the dashboard rebuilds missing ones
+        conn.execute(
+            models.HabitStreakState.__table__.delete().where(
+                models.HabitStreakState.habit_id.in_(duplicated_habit_ids)
+            )
+        )
+
+    for index in models.HabitLog.__table__.indexes:
+        index.create(bind=conn, checkfirst=True)
+
+def _add_habit_keyset_index(conn: Connection) -> None:
+    for index in models.Habit.__table__.indexes:
+        index.create(bind=conn, checkfirst=True)
+
+def _add_completion_bitmaps(conn: Connection) -> None:
+    # rows are filled in lazily by the dashboard, or all at once by rebuild_bitmap
+    models.HabitCompletionBitmap.__table__.create(bind=conn, checkfirst=True)
+
+def _add_user_data_version(conn: Connection) -> None:
+    # databases created after this column existed already have it from 0001
+    columns = {c["name"] for c in inspect(conn).get_columns("users")}
+    if "data_version" not in columns:
+        conn.execute(text("ALTER TABLE users ADD COLUMN data_version INTEGER NOT NULL DEFAULT 0"))
+
+def _add_habit_rollups(conn: Connection) -> None:
+    models.HabitRollup.__table__.create(bind=conn, checkfirst=True)
+    # unlike the bitmaps nothing fills these in lazily, so backfill now
+    with Session(bind=conn, join_transaction_mode="create_savepoint") as session:
+        rebuild_all_rollups(session)
+
+def _add_user_shards(conn: Connection) -> None:
+    # only the directory database fills this in; on shards it stays empty
+    models.UserShard.__table__.create(bind=conn, checkfirst=True)
+
+def _add_id_blocks(conn: Connection) -> None:
+    # like user_shards, only used in the directory
+    models.IdBlock.__table__.create(bind=conn, checkfirst=True)
+
+def _add_dashboard_snapshots(conn: Connection) -> None:
+    models.DashboardSnapshot.__table__.create(bind=conn, checkfirst=True)
+
+def _add_scheduler_leases(conn: Connection) -> None:
+    # only the directory's is used
+    models.SchedulerLease.__table__.create(bind=conn, checkfirst=True)
+
+MIGRATIONS: List[Tuple[str, Callable[[Connection], None]]] = [
+    ("0001_baseline", _create_missing_tables),
+    ("0002_habit_logs_unique_and_indexes", _dedupe_habit_logs_and_add_indexes),
+    ("0003_habits_keyset_index", _add_habit_keyset_index),
+    ("0004_habit_completion_bitmaps", _add_completion_bitmaps),
+    ("0005_users_data_version", _add_user_data_version),
+    ("0006_habit_rollups", _add_habit_rollups),
+    ("0007_user_shards", _add_user_shards),
+    ("0008_id_blocks", _add_id_blocks),
+    ("0009_dashboard_snapshots", _add_dashboard_snapshots),
+    ("0010_scheduler_leases", _add_scheduler_leases),
+]
+
+def pending_migrations(engine: Engine) -> List[str]:
+    """Read-only check, cheap enough for every worker to run at startup."""
+    with engine.connect() as conn:
+        if not inspect(conn).has_table(schema_migrations.name):
+            return [version for version, _ in MIGRATIONS]
+        applied = set(conn.execute(select(schema_migrations.c.version)).scalars())
+    return [version for version, _ in MIGRATIONS if version not in applied]
+
+def run_migrations(engine: Engine) -> List[str]:
+    applied_now: List[str] = []
+    with engine.begin() as conn:
+        migration_metadata.create_all(bind=conn)
+        applied = set(conn.execute(select(schema_migrations.c.version)).scalars())
+
+    for version, step in MIGRATIONS:
+        if version in applied:
+            continue
+        with engine.begin() as conn:
+            step(conn)
+            conn.execute(schema_migrations.insert().values(version=version))
+        applied_now.append(version)
+    return applied_now
+
+if __name__ == "__main__":
+    from app.db import engine
+    from app.shards import get_shard_router
+
+    # the directory (or only) database, then every shard
+    for name, target in [("database", engine), *get_shard_router().named_engines()]:
+        applied = run_migrations(target)
+        if applied:
+            print(f"{name}: applied migrations:", ", ".join(applied))
+        else:
+            print(f"{name}: schema is up to date.")
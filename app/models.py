@@ -1,9 +1,19 @@
-from sqlalchemy import Column, Integer, String, Boolean, Date, DateTime, ForeignKey, func
+from sqlalchemy import Column, Integer, String, Boolean, Date, DateTime, Float, ForeignKey, Index, LargeBinary, PrimaryKeyConstraint, Text, func
+from sqlalchemy.dialects import sqlite
 from sqlalchemy.orm import relationship, as_declarative
 from sqlalchemy.ext.declarative import declarative_base
 
 Base = declarative_base()
 
+# SQLite's CURRENT_TIMESTAMP has whole seconds; binding values in the same
+# format keeps equality on server-generated timestamps exact (keyset paging)
+ServerTimestamp = DateTime(timezone=True).with_variant(
+    sqlite.DATETIME(
+        storage_format="%(year)04d-%(month)02d-%(day)02d %(hour)02d:%(minute)02d:%(second)02d"
+    ),
+    "sqlite",
+)
+
 class User(Base):
     __tablename__ = "users"
 
@@ -13,12 +23,17 @@ class User(Base):
     username = Column(String, nullable=False)
     timezone = Column(String, default="UTC")
     created_at = Column(DateTime(timezone=True), server_default=func.now())
+    # bumped on every habit or log write; see app/services/data_version.py
+    data_version = Column(Integer, nullable=False, default=0, server_default="0")
 
     habits = relationship("Habit", back_populates="user", cascade="all, delete-orphan")
     logs = relationship("HabitLog", back_populates="user", cascade="all, delete-orphan")
 
 class Habit(Base):
     __tablename__ = "habits"
+    __table_args__ = (
+        Index("ix_habits_user_created_id", "user_id", "created_at", "id"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     user_id = Column(Integer, ForeignKey("users.id",ondelete="CASCADE"), nullable=False)
@@ -28,12 +43,23 @@ class Habit(Base):
     target_per_period = Column(Integer, default=1)
     start_date = Column(Date, nullable=False)
     is_archived = Column(Boolean, default=False)
-    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    created_at = Column(ServerTimestamp, server_default=func.now())
 
     user = relationship("User", back_populates="habits")
     logs = relationship("HabitLog", back_populates="habit", cascade="all, delete-orphan")
+    streak_state = relationship(
+        "HabitStreakState", back_populates="habit", uselist=False, cascade="all, delete-orphan"
+    )
+    completion_bitmap = relationship(
+        "HabitCompletionBitmap", back_populates="habit", uselist=False, cascade="all, delete-orphan"
+    )
+
 class HabitLog(Base):
     __tablename__ = "habit_logs"
+    __table_args__ = (
+        Index("uq_habit_logs_habit_date", "habit_id", "date", unique=True),
+        Index("ix_habit_logs_user_habit_date", "user_id", "habit_id", "date"),
+    )
 
     id = Column(Integer, primary_key=True)
     habit_id = Column(Integer, ForeignKey("habits.id", ondelete="CASCADE"), nullable=False)
@@ -43,4 +69,86 @@ class HabitLog(Base):
     created_at = Column(DateTime(timezone=True), server_default=func.now())
 
     habit = relationship("Habit", back_populates="logs")
-    user = relationship("User", back_populates="logs")
\ No newline at end of file
+    user = relationship("User", back_populates="logs")
+
+class HabitStreakState(Base):
+    __tablename__ = "habit_streak_states"
+
+    habit_id = Column(Integer, ForeignKey("habits.id", ondelete="CASCADE"), primary_key=True)
+    goal_type = Column(String, nullable=False)
+    target_per_period = Column(Integer, nullable=False, default=1)
+    # day (DAILY) or week start (X_PER_WEEK) of the most recent logged period
+    last_period = Column(Date, nullable=True)
+    period_count = Column(Integer, nullable=False, default=0)
+    current_run = Column(Integer, nullable=False, default=0)
+    best_run = Column(Integer, nullable=False, default=0)
+    last_log_date = Column(Date, nullable=True)
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
+
+    habit = relationship("Habit", back_populates="streak_state")
+
+class HabitCompletionBitmap(Base):
+    __tablename__ = "habit_completion_bitmaps"
+
+    habit_id = Column(Integer, ForeignKey("habits.id", ondelete="CASCADE"), primary_key=True)
+    # always a Monday, so bit 7*w .. 7*w+6 is ISO week w counted from here
+    origin = Column(Date, nullable=False)
+    # little-endian; bit i is set when there is a log on origin + i days
+    bits = Column(LargeBinary, nullable=False, default=b"")
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
+
+    habit = relationship("Habit", back_populates="completion_bitmap")
+
+class HabitRollup(Base):
+    """Per-habit totals for one calendar week (Monday start) or month."""
+    __tablename__ = "habit_rollups"
+    __table_args__ = (
+        PrimaryKeyConstraint("habit_id", "period", "period_start"),
+        Index("ix_habit_rollups_user_period_start", "user_id", "period", "period_start"),
+    )
+
+    habit_id = Column(Integer, ForeignKey("habits.id", ondelete="CASCADE"), nullable=False)
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False)
+    # "week" or "month"
+    period = Column(String, nullable=False)
+    period_start = Column(Date, nullable=False)
+    log_count = Column(Integer, nullable=False, default=0)
+    value_sum = Column(Integer, nullable=False, default=0)
+    # logs needed for the period to count as met, from the habit's goal
+    target = Column(Integer, nullable=False)
+    met = Column(Boolean, nullable=False, default=False)
+
+class UserShard(Base):
+    """Directory entry: which shard database holds a user's data (app/shards.py)."""
+    __tablename__ = "user_shards"
+
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), primary_key=True)
+    shard = Column(Integer, nullable=False, index=True)
+
+class IdBlock(Base):
+    """Directory entry: the next habit or log id not yet handed to any shard (app/shards.py)."""
+    __tablename__ = "id_blocks"
+
+    # the table the ids are for
+    name = Column(String, primary_key=True)
+    next_id = Column(Integer, nullable=False)
+
+class DashboardSnapshot(Base):
+    """A precomputed GET /dashboard/today body, shared by every worker (app/services/rollover.py)."""
+    __tablename__ = "dashboard_snapshots"
+
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), primary_key=True)
+    # only served for this local date and data_version, like a DashboardStore entry
+    date = Column(Date, nullable=False)
+    data_version = Column(Integer, nullable=False)
+    # the response body as JSON
+    payload = Column(Text, nullable=False)
+
+class SchedulerLease(Base):
+    """Directory entry: the worker that runs a once-per-deployment job until ``expires_at``."""
+    __tablename__ = "scheduler_leases"
+
+    name = Column(String, primary_key=True)
+    holder = Column(String, nullable=False)
+    # time.time() seconds
+    expires_at = Column(Float, nullable=False)
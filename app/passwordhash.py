@@ -1,6 +1,10 @@
 import hashlib
+from typing import Optional
+
 import bcrypt
 
+from app import config
+
 MAX_BCRYPT_BYTES = 72
 
 def _normalize(password: str) -> bytes:
@@ -15,11 +19,23 @@ def _normalize(password: str) -> bytes:
 
 class Hash:
     @staticmethod
-    def bcrypt(password: str) -> str:
+    def bcrypt(password: str, rounds: Optional[int] = None) -> str:
         normalized = _normalize(password)
-        return bcrypt.hashpw(normalized, bcrypt.gensalt()).decode()
+        return bcrypt.hashpw(normalized, bcrypt.gensalt(rounds or config.BCRYPT_ROUNDS)).decode()
 
     @staticmethod
     def verify(plain_password: str, hashed_password: str) -> bool:
         normalized = _normalize(plain_password)
-        return bcrypt.checkpw(normalized, hashed_password.encode())
\ No newline at end of file
+        return bcrypt.checkpw(normalized, hashed_password.encode())
+
+    @staticmethod
+    def cost(hashed_password: str) -> Optional[int]:
+        # modular crypt format: $2b$<cost>$<salt+hash>
+        parts = hashed_password.split("$")
+        if len(parts) < 4 or not parts[2].isdigit():
+            return None
+        return int(parts[2])
+
+    @staticmethod
+    def needs_rehash(hashed_password: str, rounds: Optional[int] = None) -> bool:
+        return Hash.cost(hashed_password) != (rounds or config.BCRYPT_ROUNDS)
@@ -0,0 +1,50 @@
+from datetime import date, timedelta
+from typing import List, Optional
+
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response, status
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app import models, schemas
+from app.dependencies import get_current_user, get_db
+from app.services.dashboard import user_today
+from app.services.data_version import conditional_response, make_etag, read_data_version
+from app.services.rollups import period_start
+
+router = APIRouter(prefix="/analytics", tags=["analytics"])
+
+@router.get("/rollups", response_model=schemas.AnalyticsResponse)
+async def get_rollups(
+    request: Request,
+    response: Response,
+    period: schemas.RollupPeriod = Query(schemas.RollupPeriod.WEEK),
+    from_date: Optional[date] = Query(None, alias="from"),
+    to_date: Optional[date] = Query(None, alias="to"),
+    habit_id: Optional[List[int]] = Query(None),
+    db: AsyncSession = Depends(get_db),
+    current_user: models.User = Depends(get_current_user),
+):
+    """
+    Weekly or monthly totals for any range, defaulting to the last year, read
+    from habit_rollups in one query on (user_id, period, period_start).
+    """
+    today = user_today(current_user)
+    end = to_date or today
+    start = period_start(period.value, from_date or end - timedelta(days=365))
+    if start > end:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="'from' must not be after 'to'")
+
+    data_version = await read_data_version(db, current_user.id)
+    not_modified = conditional_response(request, response, make_etag(request, current_user.id, data_version, today))
+    if not_modified is not None:
+        return not_modified
+
+    q = select(models.HabitRollup).where(
+        models.HabitRollup.user_id == current_user.id,
+        models.HabitRollup.period == period.value,
+        models.HabitRollup.period_start.between(start, end),
+    )
+    if habit_id:
+        q = q.where(models.HabitRollup.habit_id.in_(habit_id))
+    rollups = (await db.scalars(q.order_by(models.HabitRollup.habit_id, models.HabitRollup.period_start))).all()
+    return schemas.AnalyticsResponse(period=period, start=start, end=end, rollups=rollups)
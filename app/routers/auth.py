@@ -1,15 +1,17 @@
 from fastapi import APIRouter, Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordRequestForm
-from sqlalchemy.orm import Session
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 
 from app import models, schemas
-from app.dependencies import get_db, get_current_user
-from app.security import get_password_hash, verify_password, create_access_token
+from app.dependencies import get_current_user, get_directory_db
+from app.shards import get_shard_router
+from app.security import get_password_hash, verify_password, create_access_token, password_needs_rehash
 
 router = APIRouter(prefix="/auth", tags=["auth"])
 
 @router.post("/register", response_model=schemas.UserRead, status_code=status.HTTP_201_CREATED)
-def register(user_in: schemas.UserCreate, db: Session = Depends(get_db)):
+async def register(user_in: schemas.UserCreate, db: AsyncSession = Depends(get_directory_db)):
     if len(user_in.email) == 0:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
@@ -21,7 +23,7 @@ def register(user_in: schemas.UserCreate, db: Session = Depends(get_db)):
             detail="An email address must have an @ sign",
         )
     # Check email
-    existing_email = db.query(models.User).filter(models.User.email == user_in.email).first()
+    existing_email = await db.scalar(select(models.User).where(models.User.email == user_in.email))
     if existing_email:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
@@ -33,7 +35,7 @@ def register(user_in: schemas.UserCreate, db: Session = Depends(get_db)):
             detail="Include a username",
         )
     # Check username
-    existing_username = db.query(models.User).filter(models.User.username == user_in.username).first()
+    existing_username = await db.scalar(select(models.User).where(models.User.username == user_in.username))
     if existing_username:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
@@ -48,26 +50,39 @@ def register(user_in: schemas.UserCreate, db: Session = Depends(get_db)):
         email=user_in.email,
         username=user_in.username,
         timezone=user_in.timezone,
-        password_hash=get_password_hash(user_in.password),
+        password_hash=await get_password_hash(user_in.password),
     )
     db.add(user)
-    db.commit()
-    db.refresh(user)
+    await db.commit()
+    await db.refresh(user)
+    shards = get_shard_router()
+    if shards.enabled:
+        await shards.add_user(db, user)
     return user
 
 @router.post("/login", response_model=schemas.Token)
-def login(form_data: OAuth2PasswordRequestForm = Depends(), db: Session = Depends(get_db)):
-    user = db.query(models.User).filter(models.User.username==form_data.username).first()
-    if not user or not verify_password(form_data.password, user.password_hash):
+async def login(form_data: OAuth2PasswordRequestForm = Depends(), db: AsyncSession = Depends(get_directory_db)):
+    user = await db.scalar(select(models.User).where(models.User.username==form_data.username))
+    if not user or not await verify_password(form_data.password, user.password_hash):
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Incorrect email or password"
         )
+
+    if password_needs_rehash(user.password_hash):
+        # the work factor changed since this hash was made; the plain password
+        # is only available now, so upgrade it in place
+        try:
+            user.password_hash = await get_password_hash(form_data.password)
+            await db.commit()
+        except HTTPException:
+            # pool is saturated: skip the upgrade, the next login retries it
+            pass
     
     access_token = create_access_token(user_id=user.id)
     return schemas.Token(access_token=access_token)
 
 @router.get("/me", response_model=schemas.UserRead)
-def read_me(current_user: models.User = Depends(get_current_user)):
+async def read_me(current_user: models.User = Depends(get_current_user)):
     return current_user
 
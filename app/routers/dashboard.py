@@ -1,82 +1,124 @@
-from datetime import datetime
-from typing import List, Dict
+from datetime import date, timedelta
+from typing import Optional
 
-from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
-from zoneinfo import ZoneInfo
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response, status
+from fastapi.responses import StreamingResponse
+from sqlalchemy.ext.asyncio import AsyncSession
 
-from app import models, schemas
+from app import config, models, schemas
 from app.dependencies import get_db, get_current_user
-from app.services.streaks import compute_streaks_for_daily, compute_streaks_for_x_per_week
+from app.services.checkin import HabitNotFound, toggle_today
+from app.services.dashboard import build_range_payload, build_today_payload, user_today
+from app.services.dashboard_events import dashboard_stream, get_dashboard_events
+from app.services.dashboard_store import get_dashboard_store, load_snapshot
+from app.services.data_version import conditional_response, make_etag, read_data_version
+from app.services.serialization import fast_response
 
 router = APIRouter(prefix="/dashboard", tags=["dashboard"])
 
+# a leap year's worth of days per /dashboard/range call
+MAX_RANGE_DAYS = 366
+
 @router.get("/today", response_model=schemas.DashboardTodayResponse)
-def get_today_dashboard(
-    db: Session = Depends(get_db),
+async def get_today_dashboard(
+    request: Request,
+    response: Response,
+    db: AsyncSession = Depends(get_db),
     current_user: models.User = Depends(get_current_user)
 ):
-    try:
-        user_tz = ZoneInfo(current_user.timezone or "UTC")
-    except Exception:
-        user_tz = ZoneInfo("UTC")
-    
-    now_user_tz = datetime.now(user_tz)
-    today = now_user_tz.date()
+    today = user_today(current_user)
 
-    habits: List[models.Habit] = (
-        db.query(models.Habit)
-        .filter(
-            models.Habit.user_id == current_user.id,
-            models.Habit.is_archived == False,
-            models.Habit.start_date <= today,
-        )
-        .order_by(models.Habit.created_at)
-        .all()
-    )
+    # read the version before the habits, so a write in between can only
+    # make the ETag (and the stored payload's version) older than the body,
+    # never newer
+    data_version = await read_data_version(db, current_user.id)
+    not_modified = conditional_response(request, response, make_etag(request, current_user.id, data_version, today))
+    if not_modified is not None:
+        return not_modified
 
-    if not habits:
-        return schemas.DashboardTodayResponse(date=today, habits=[])
-    
-    habit_ids = [h.id for h in habits]
+    store = get_dashboard_store()
+    payload = store.get(current_user.id, today, data_version)
+    if payload is None:
+        if config.DASHBOARD_PRECOMPUTE:
+            # built at the user's midnight by whichever worker leads the precompute
+            payload = await load_snapshot(db, current_user.id, today, data_version)
+        if payload is None:
+            payload = await db.run_sync(build_today_payload, current_user, today)
+        store.set(current_user.id, today, data_version, payload)
 
-    logs: List[models.HabitLog] = (
-        db.query(models.HabitLog)
-        .filter(
-            models.HabitLog.user_id == current_user.id,
-            models.HabitLog.habit_id.in_(habit_ids),
-            models.HabitLog.date <= today,
-        )
-        .all()
-    )
+    if config.FAST_SERIALIZATION:
+        return fast_response(response, payload)
+    return schemas.DashboardTodayResponse.model_validate(payload)
 
-    logs_by_habit: Dict[int, List[models.HabitLog]] = {hid: [] for hid in habit_ids}
-    for log in logs:
-        logs_by_habit[log.habit_id].append(log)
-    
-    items: List[schemas.TodayHabitItem] = []
+@router.post("/today/checkin", response_model=schemas.DashboardTodayResponse)
+async def check_in_today(
+    checkin: schemas.CheckinRequest,
+    response: Response,
+    db: AsyncSession = Depends(get_db),
+    current_user: models.User = Depends(get_current_user)
+):
+    """
+    Toggles today's log for every habit in ``habit_ids`` in one transaction,
+    returning the recomputed items for those habits only.
+    """
+    habit_ids = list(dict.fromkeys(checkin.habit_ids))
+    today = user_today(current_user)
+    try:
+        payload, changed = await db.run_sync(toggle_today, current_user, habit_ids, today)
+    except HabitNotFound:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Habit not found")
+    if changed:
+        get_dashboard_events().publish(current_user.id, changed)
 
-    for habit in habits:
-        habit_logs = logs_by_habit.get(habit.id,[])
+    if config.FAST_SERIALIZATION:
+        return fast_response(response, payload)
+    return schemas.DashboardTodayResponse.model_validate(payload)
 
-        completed_today = any(log.date == today for log in habit_logs)
+@router.get("/stream")
+async def stream_today_dashboard(
+    db: AsyncSession = Depends(get_db),
+    current_user: models.User = Depends(get_current_user)
+):
+    """
+    Server-Sent Events instead of polling /dashboard/today: a snapshot, then
+    only the TodayHabitItems that change (see app/services/dashboard_events.py).
+    """
+    return StreamingResponse(
+        dashboard_stream(db, current_user, config.SSE_HEARTBEAT_SECONDS),
+        media_type="text/event-stream",
+        # X-Accel-Buffering stops nginx from holding events back
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
 
-        log_dates = [log.date for log in habit_logs]
-        if habit.goal_type == "DAILY":
-            current_streak, best_streak = compute_streaks_for_daily(log_dates, today)
-        elif habit.goal_type == "X_PER_WEEK":
-            current_streak, best_streak = compute_streaks_for_x_per_week(log_dates, today, habit.target_per_period)
-        else:
-            current_streak, best_streak = 0, 0
-        
-        items.append(
-            schemas.TodayHabitItem(
-                habit=schemas.HabitRead.model_validate(habit),
-                is_completed=completed_today,
-                current_streak=current_streak,
-                best_streak=best_streak
-            )
+@router.get("/range", response_model=schemas.DashboardRangeResponse)
+async def get_range_dashboard(
+    request: Request,
+    response: Response,
+    from_date: Optional[date] = Query(None, alias="from"),
+    to_date: Optional[date] = Query(None, alias="to"),
+    db: AsyncSession = Depends(get_db),
+    current_user: models.User = Depends(get_current_user)
+):
+    """
+    Completion matrix for calendar views, defaulting to the current month:
+    every habit's days in one response instead of a logs call per habit.
+    """
+    today = user_today(current_user)
+    end = to_date or today
+    start = from_date or end.replace(day=1)
+    if start > end:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="'from' must not be after 'to'")
+    if end - start >= timedelta(days=MAX_RANGE_DAYS):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST, detail=f"Range is limited to {MAX_RANGE_DAYS} days",
         )
 
-    return schemas.DashboardTodayResponse(date=today, habits=items)
-    
\ No newline at end of file
+    data_version = await read_data_version(db, current_user.id)
+    not_modified = conditional_response(request, response, make_etag(request, current_user.id, data_version, today))
+    if not_modified is not None:
+        return not_modified
+
+    payload = await db.run_sync(build_range_payload, current_user, start, end)
+    if config.FAST_SERIALIZATION:
+        return fast_response(response, payload)
+    return schemas.DashboardRangeResponse.model_validate(payload)
@@ -0,0 +1,143 @@
+import csv
+import io
+import json
+import zlib
+from enum import Enum
+from typing import AsyncIterator, Iterable, List, Optional
+
+from fastapi import APIRouter, Depends, Query
+from fastapi.responses import StreamingResponse
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app import models
+from app.dependencies import get_current_user, get_db
+
+router = APIRouter(prefix="/export", tags=["export"])
+
+# rows fetched per round trip and rows written per chunk of output
+EXPORT_BATCH_SIZE = 1000
+
+CSV_COLUMNS = [
+    "habit_id", "habit_name", "goal_type", "target_per_period", "start_date", "is_archived",
+    "log_id", "log_date", "value", "logged_at",
+]
+
+class ExportFormat(str, Enum):
+    CSV = "csv"
+    NDJSON = "ndjson"
+
+def _iso(value) -> Optional[str]:
+    return value.isoformat() if value is not None else None
+
+def _habit_record(habit: models.Habit) -> dict:
+    return {
+        "type": "habit",
+        "id": habit.id,
+        "name": habit.name,
+        "description": habit.description,
+        "goal_type": habit.goal_type,
+        "target_per_period": habit.target_per_period,
+        "start_date": _iso(habit.start_date),
+        "is_archived": habit.is_archived,
+        "created_at": _iso(habit.created_at),
+    }
+
+def _log_record(log: models.HabitLog) -> dict:
+    return {
+        "type": "log",
+        "id": log.id,
+        "habit_id": log.habit_id,
+        "date": _iso(log.date),
+        "value": log.value,
+        "created_at": _iso(log.created_at),
+    }
+
+async def _ndjson_chunks(db: AsyncSession, user_id: int) -> AsyncIterator[str]:
+    habits = await db.stream_scalars(
+        select(models.Habit)
+        .where(models.Habit.user_id == user_id)
+        .order_by(models.Habit.id)
+        .execution_options(yield_per=EXPORT_BATCH_SIZE)
+    )
+    async for batch in habits.partitions():
+        yield "".join(json.dumps(_habit_record(h)) + "\n" for h in batch)
+
+    logs = await db.stream_scalars(
+        select(models.HabitLog)
+        .where(models.HabitLog.user_id == user_id)
+        .order_by(models.HabitLog.habit_id, models.HabitLog.date)
+        .execution_options(yield_per=EXPORT_BATCH_SIZE)
+    )
+    async for batch in logs.partitions():
+        yield "".join(json.dumps(_log_record(log)) + "\n" for log in batch)
+
+def _csv_text(rows: Iterable[List]) -> str:
+    buffer = io.StringIO()
+    csv.writer(buffer).writerows(rows)
+    return buffer.getvalue()
+
+async def _csv_chunks(db: AsyncSession, user_id: int) -> AsyncIterator[str]:
+    yield _csv_text([CSV_COLUMNS])
+    # one row per log; habits without logs still get a row with empty log columns
+    result = await db.stream(
+        select(
+            models.Habit.id, models.Habit.name, models.Habit.goal_type, models.Habit.target_per_period,
+            models.Habit.start_date, models.Habit.is_archived,
+            models.HabitLog.id, models.HabitLog.date, models.HabitLog.value, models.HabitLog.created_at,
+        )
+        .outerjoin(models.HabitLog, models.HabitLog.habit_id == models.Habit.id)
+        .where(models.Habit.user_id == user_id)
+        .order_by(models.Habit.id, models.HabitLog.date)
+        .execution_options(yield_per=EXPORT_BATCH_SIZE)
+    )
+    async for batch in result.partitions():
+        yield _csv_text(
+            [_iso(v) if hasattr(v, "isoformat") else v for v in row]
+            for row in batch
+        )
+
+async def _encode(db: AsyncSession, chunks: AsyncIterator[str], gzip: bool) -> AsyncIterator[bytes]:
+    compressor = zlib.compressobj(wbits=31) if gzip else None
+    try:
+        async for chunk in chunks:
+            data = chunk.encode("utf-8")
+            if compressor is not None:
+                data = compressor.compress(data)
+            if data:
+                yield data
+        if compressor is not None:
+            yield compressor.flush()
+    finally:
+        # the body outlives the handler, so release the cursor and connection
+        # here rather than relying on get_db's teardown
+        await db.close()
+
+@router.get("")
+async def export_data(
+    format: ExportFormat = Query(ExportFormat.NDJSON),
+    gzip: bool = Query(False),
+    db: AsyncSession = Depends(get_db),
+    current_user: models.User = Depends(get_current_user),
+):
+    """
+    Streams every habit and log the user owns. Rows are read in batches of
+    EXPORT_BATCH_SIZE through a server-side cursor, so memory stays flat no
+    matter how long the history is.
+    """
+    if format == ExportFormat.CSV:
+        chunks = _csv_chunks(db, current_user.id)
+        media_type = "text/csv"
+    else:
+        chunks = _ndjson_chunks(db, current_user.id)
+        media_type = "application/x-ndjson"
+
+    filename = f"habit-tracker-export.{format.value}"
+    if gzip:
+        # a .gz file rather than Content-Encoding, which clients would undo
+        # on the fly and save plain text under the .gz name
+        filename += ".gz"
+        media_type = "application/gzip"
+    headers = {"Content-Disposition": f'attachment; filename="{filename}"'}
+
+    return StreamingResponse(_encode(db, chunks, gzip), media_type=media_type, headers=headers)
@@ -1,186 +1,289 @@
-from datetime import date
-from typing import List, Optional
+from datetime import date, datetime
+from typing import List, Optional, Union
 
-from fastapi import APIRouter, Depends, HTTPException, Query, status
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response, status
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import selectinload
 
-from app import models, schemas
+from app import config, models, schemas
+from app.db import dialect_insert
 from app.dependencies import get_current_user, get_db
+from app.services.pagination import (
+    DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE, build_page, decode_cursor, keyset_after,
+)
+from app.services.log_ingest import (
+    NDJSON_CONTENT_TYPES, BulkTooLarge, ingest_logs, parse_json_array, parse_ndjson_stream, read_bulk_body,
+)
+from app.services.dashboard import user_today
+from app.services.dashboard_events import get_dashboard_events
+from app.services.data_version import (
+    bump_data_version, conditional_response, make_etag, read_data_version,
+)
+from app.services.group_commit import DuplicateLog, GroupCommitSaturated, group_commit_writer
+from app.services.log_writes import goal_changed, init_habit_tracking, logs_added
+from app.services.serialization import fast_response, habit_to_dict, log_to_dict, page_to_dict
 
 router = APIRouter(prefix="/habits", tags=["habits"])
 
+async def _get_owned_habit(
+    db: AsyncSession,
+    habit_id: int,
+    current_user: models.User,
+    with_tracking: bool = False,
+) -> models.Habit:
+    q = select(models.Habit).where(models.Habit.id == habit_id, models.Habit.user_id == current_user.id)
+    if with_tracking:
+        q = q.options(
+            selectinload(models.Habit.streak_state),
+            selectinload(models.Habit.completion_bitmap),
+        )
+    habit = await db.scalar(q)
+    if not habit:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Habit not found")
+    return habit
+
+def _decode_cursor(cursor: str, parsers):
+    try:
+        return decode_cursor(cursor, parsers)
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+
 # ----------------- HABIT CRUD ----------------------
 
-@router.get("/", response_model=List[schemas.HabitRead])
-def list_habits(
+@router.get("/", response_model=Union[List[schemas.HabitRead], schemas.HabitPage])
+async def list_habits(
+    request: Request,
+    response: Response,
     include_archived: bool = Query(False),
-    db: Session = Depends(get_db),
+    limit: Optional[int] = Query(None, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = Query(None),
+    db: AsyncSession = Depends(get_db),
     current_user: models.User = Depends(get_current_user)
 ):
-    q = db.query(models.Habit).filter(models.Habit.user_id == current_user.id)
-    
+    """
+    Without ``limit`` or ``cursor`` this returns the full list as before. With
+    either one it returns a page plus a ``next_cursor`` for the next request.
+    """
+    data_version = await read_data_version(db, current_user.id)
+    etag = make_etag(request, current_user.id, data_version, user_today(current_user))
+    not_modified = conditional_response(request, response, etag)
+    if not_modified is not None:
+        return not_modified
+
+    q = select(models.Habit).where(models.Habit.user_id == current_user.id)
+
     if not include_archived:
-        q = q.filter(models.Habit.is_archived == False)
+        q = q.where(models.Habit.is_archived == False)
 
-    habits = q.order_by(models.Habit.created_at).all()
+    if limit is None and cursor is None:
+        habits = (await db.scalars(q.order_by(models.Habit.created_at, models.Habit.id))).all()
+        if config.FAST_SERIALIZATION:
+            return fast_response(response, [habit_to_dict(h) for h in habits])
+        return habits
 
-    return habits
+    sort_key = (models.Habit.created_at, models.Habit.id)
+    if cursor:
+        q = q.where(keyset_after(sort_key, _decode_cursor(cursor, (datetime.fromisoformat, int))))
+    page_size = limit or DEFAULT_PAGE_SIZE
+    habits = (await db.scalars(q.order_by(*sort_key).limit(page_size + 1))).all()
+    items, next_cursor = build_page(list(habits), page_size, lambda h: (h.created_at, h.id))
+    if config.FAST_SERIALIZATION:
+        return fast_response(response, page_to_dict([habit_to_dict(h) for h in items], next_cursor))
+    return schemas.HabitPage(items=items, next_cursor=next_cursor)
 
 @router.post("/", response_model=schemas.HabitRead, status_code=status.HTTP_201_CREATED)
-def create_habit(
+async def create_habit(
     habit_in: schemas.HabitCreate,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
     current_user: models.User = Depends(get_current_user),
 ):
     habit = models.Habit(
         user_id=current_user.id,
         **habit_in.model_dump()
     )
+    init_habit_tracking(habit)
     db.add(habit)
-    db.commit()
-    db.refresh(habit)
+    await db.run_sync(bump_data_version, current_user.id)
+    await db.commit()
+    await db.refresh(habit)
+    get_dashboard_events().publish(current_user.id, [habit.id])
     return habit
 
 @router.get("/{habit_id}", response_model=schemas.HabitRead)
-def get_habit(
+async def get_habit(
     habit_id: int,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
     current_user: models.User = Depends(get_current_user),
 ):
-    habit = (
-        db.query(models.Habit)
-        .filter(models.Habit.id == habit_id, models.Habit.user_id == current_user.id)
-        .first()
-    )
-    if not habit:
-        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Habit not found")
-    return habit
+    return await _get_owned_habit(db, habit_id, current_user)
 
 @router.patch("/{habit_id}", response_model=schemas.HabitRead)
-def update_habit(
+async def update_habit(
     habit_id: int,
     habit_in: schemas.HabitUpdate,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
     current_user: models.User = Depends(get_current_user),
 ):
-    habit = (
-        db.query(models.Habit)
-        .filter(models.Habit.id == habit_id, models.Habit.user_id == current_user.id)
-        .first()
-    )
-    if not habit:
-        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Habit not found")
-    
+    habit = await _get_owned_habit(db, habit_id, current_user, with_tracking=True)
+
     update_data = habit_in.model_dump(exclude_unset=True)
     for field, value in update_data.items():
         setattr(habit, field, value)
-    
-    db.commit()
-    db.refresh(habit)
+
+    if "goal_type" in update_data or "target_per_period" in update_data:
+        await db.run_sync(goal_changed, habit)
+
+    await db.run_sync(bump_data_version, current_user.id)
+    await db.commit()
+    await db.refresh(habit)
+    get_dashboard_events().publish(current_user.id, [habit.id])
     return habit
 
 @router.patch("/{habit_id}/restore", response_model=schemas.HabitRead)
-def restore_habit(
+async def restore_habit(
     habit_id: int,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
     current_user: models.User = Depends(get_current_user),
 ):
-    habit = (
-        db.query(models.Habit)
-        .filter(models.Habit.id == habit_id, models.Habit.user_id == current_user.id)
-        .first()
-    )
-    if not habit:
-        raise HTTPException(status_cod=404, detail="Habit not found")
-    
+    habit = await _get_owned_habit(db, habit_id, current_user)
+
     habit.is_archived = False
-    db.commit()
-    db.refresh(habit)
+    await db.run_sync(bump_data_version, current_user.id)
+    await db.commit()
+    await db.refresh(habit)
+    get_dashboard_events().publish(current_user.id, [habit.id])
     return habit
 
 @router.delete("/{habit_id}", status_code=status.HTTP_204_NO_CONTENT)
-def delete_habit(
+async def delete_habit(
     habit_id: int,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
     current_user: models.User = Depends(get_current_user)
 ):
-    habit = (
-        db.query(models.Habit)
-        .filter(models.Habit.id == habit_id, models.Habit.user_id == current_user.id)
-        .first()
-    )
-    if not habit:
-        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Habit not found")
-    
+    habit = await _get_owned_habit(db, habit_id, current_user)
+
     habit.is_archived = True
-    db.commit()
+    await db.run_sync(bump_data_version, current_user.id)
+    await db.commit()
+    get_dashboard_events().publish(current_user.id, [habit_id])
     return
 
 # ------------------- HABIT LOGS ---------------------------
-@ router.get("/{habit_id}/logs", response_model=List[schemas.HabitLogRead])
-def get_habit_logs(
+@router.post("/logs/bulk", response_model=schemas.HabitLogBulkResponse)
+async def bulk_create_habit_logs(
+    request: Request,
+    db: AsyncSession = Depends(get_db),
+    current_user: models.User = Depends(get_current_user)
+):
+    """
+    Accepts a JSON array of logs, or NDJSON (one log per line) when sent with
+    an application/x-ndjson content type. Items for unknown habits, invalid
+    items and duplicates are skipped and reported per item.
+    """
+    content_type = request.headers.get("content-type", "").split(";")[0].strip()
+    try:
+        if content_type in NDJSON_CONTENT_TYPES:
+            items = await parse_ndjson_stream(request.stream())
+        else:
+            body = await read_bulk_body(request.stream(), request.headers.get("content-length"))
+            items = parse_json_array(body)
+    except BulkTooLarge as e:
+        raise HTTPException(status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE, detail=str(e))
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+
+    result = await db.run_sync(ingest_logs, current_user, items)
+    get_dashboard_events().publish(current_user.id, {
+        r.habit_id for r in result.results if r.status == schemas.BulkItemStatus.CREATED
+    })
+    return result
+
+@router.get("/{habit_id}/logs", response_model=Union[List[schemas.HabitLogRead], schemas.HabitLogPage])
+async def get_habit_logs(
     habit_id: int,
+    response: Response,
     from_date: Optional[date] = Query(None, alias="from"),
     to_date: Optional[date] = Query(None, alias="to"),
-    db: Session = Depends(get_db),
+    limit: Optional[int] = Query(None, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = Query(None),
+    db: AsyncSession = Depends(get_db),
     current_user: models.User = Depends(get_current_user)
 ):
-    habit = (
-        db.query(models.Habit)
-        .filter(models.Habit.id == habit_id,)
-    )
-    if not habit:
-        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Habit not found")
-    
-    q = db.query(models.HabitLog).filter(
+    """Paged by (date, id) when ``limit`` or ``cursor`` is given, like list_habits."""
+    await _get_owned_habit(db, habit_id, current_user)
+
+    q = select(models.HabitLog).where(
         models.HabitLog.habit_id == habit_id,
         models.HabitLog.user_id == current_user.id,
     )
 
     if from_date:
-        q = q.filter(models.HabitLog.date>= from_date)
+        q = q.where(models.HabitLog.date>= from_date)
     if to_date:
-        q = q.filter(models.HabitLog.date<= to_date)
+        q = q.where(models.HabitLog.date<= to_date)
+
+    if limit is None and cursor is None:
+        logs = (await db.scalars(q.order_by(models.HabitLog.date, models.HabitLog.id))).all()
+        if config.FAST_SERIALIZATION:
+            return fast_response(response, [log_to_dict(log) for log in logs])
+        return logs
 
-    logs = q.order_by(models.HabitLog.date).all()
-    return logs 
+    sort_key = (models.HabitLog.date, models.HabitLog.id)
+    if cursor:
+        q = q.where(keyset_after(sort_key, _decode_cursor(cursor, (date.fromisoformat, int))))
+    page_size = limit or DEFAULT_PAGE_SIZE
+    logs = (await db.scalars(q.order_by(*sort_key).limit(page_size + 1))).all()
+    items, next_cursor = build_page(list(logs), page_size, lambda log: (log.date, log.id))
+    if config.FAST_SERIALIZATION:
+        return fast_response(response, page_to_dict([log_to_dict(log) for log in items], next_cursor))
+    return schemas.HabitLogPage(items=items, next_cursor=next_cursor)
 
 @router.post("/{habit_id}/logs", response_model=schemas.HabitLogRead, status_code=status.HTTP_201_CREATED)
-def create_habit_log(
+async def create_habit_log(
     habit_id: int,
     log_in: schemas.HabitLogCreate,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
     current_user: models.User = Depends(get_current_user)
 ):
-    habit = (
-        db.query(models.Habit)
-        .filter(models.Habit.id == habit_id, models.Habit.user_id == current_user.id)
-        .first()
-    )
-    if not habit:
-        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Habit not found")
-    
-    existing = (
-        db.query(models.HabitLog)
-        .filter(
-            models.HabitLog.habit_id == habit_id,
-            models.HabitLog.user_id == current_user.id,
-            models.HabitLog.created_at == log_in.date,
-        )
-        .first()
+    if config.GROUP_COMMIT:
+        await _get_owned_habit(db, habit_id, current_user)
+        writer = group_commit_writer(db.bind)
+        # don't hold a connection while the batch fills up
+        await db.close()
+        try:
+            log = await writer.submit(habit_id, current_user.id, log_in.model_dump())
+        except DuplicateLog:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Log already exists for this date."
+            )
+        except GroupCommitSaturated:
+            raise HTTPException(
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                detail="Too many check-ins waiting to be saved, try again shortly",
+                headers={"Retry-After": "1"},
+            )
+        get_dashboard_events().publish(current_user.id, [habit_id])
+        return log
+
+    habit = await _get_owned_habit(db, habit_id, current_user, with_tracking=True)
+
+    # the unique (habit_id, date) index does the duplicate check in the same statement
+    stmt = (
+        dialect_insert(db)(models.HabitLog)
+        .values(habit_id=habit_id, user_id=current_user.id, **log_in.model_dump())
+        .on_conflict_do_nothing(index_elements=["habit_id", "date"])
+        .returning(models.HabitLog)
     )
-    if existing:
+    log = (await db.scalars(stmt)).first()
+    if log is None:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Log already exists for this date."
         )
-
-    log = models.HabitLog(
-        habit_id=habit_id,
-        user_id=current_user.id,
-        **log_in.model_dump(),
-    )
-    db.add(log)
-    db.commit()
-    db.refresh(log)
-    return log
\ No newline at end of file
+    await db.run_sync(logs_added, habit, [(log.date, log.value)])
+    await db.run_sync(bump_data_version, current_user.id)
+    await db.commit()
+    get_dashboard_events().publish(current_user.id, [habit_id])
+    return log
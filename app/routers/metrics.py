@@ -0,0 +1,16 @@
+from fastapi import APIRouter
+from fastapi.responses import PlainTextResponse
+
+from app.security import token_cache_stats
+from app.services.metrics import render_metrics
+from app.services.user_cache import get_user_cache
+
+router = APIRouter(tags=["metrics"])
+
+@router.get("/metrics", response_class=PlainTextResponse, include_in_schema=False)
+def metrics():
+    body = render_metrics({
+        "token_cache": token_cache_stats(),
+        "user_cache": get_user_cache().stats(),
+    })
+    return PlainTextResponse(body, media_type="text/plain; version=0.0.4")
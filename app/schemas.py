@@ -67,6 +67,10 @@ class HabitRead(BaseModel):
     is_archived: bool
     created_at: datetime
 
+class HabitPage(BaseModel):
+    items: List[HabitRead]
+    next_cursor: Optional[str] = None
+
 # ------------------ HABIT LOG SCHEMAS --------------------------
 class HabitLogBase(BaseModel):
     date: date
@@ -85,6 +89,30 @@ class HabitLogRead(BaseModel):
     value: int
     created_at: datetime
 
+class HabitLogPage(BaseModel):
+    items: List[HabitLogRead]
+    next_cursor: Optional[str] = None
+
+class HabitLogBulkItem(HabitLogBase):
+    habit_id: int
+
+class BulkItemStatus(str, Enum):
+    CREATED = "created"
+    DUPLICATE = "duplicate"
+    NOT_FOUND = "not_found"
+    INVALID = "invalid"
+
+class HabitLogBulkItemResult(BaseModel):
+    index: int
+    status: BulkItemStatus
+    habit_id: Optional[int] = None
+    detail: Optional[str] = None
+
+class HabitLogBulkResponse(BaseModel):
+    created: int
+    skipped: int
+    results: List[HabitLogBulkItemResult]
+
 class Token(BaseModel):
     access_token: str
     token_type: str = "bearer"
@@ -104,4 +132,50 @@ class TodayHabitItem(BaseModel):
 class DashboardTodayResponse(BaseModel):
     date: date
     habits: List[TodayHabitItem]
-    
\ No newline at end of file
+
+class CheckinRequest(BaseModel):
+    habit_ids: List[int] = Field(min_length=1, max_length=100)
+
+class DashboardDelta(BaseModel):
+    """A "habits" event on GET /dashboard/stream: only the habits that changed."""
+    date: date
+    habits: List[TodayHabitItem]
+    # habits that left the dashboard (archived, or moved to a later start date)
+    removed: List[int]
+
+class RangeHabitItem(BaseModel):
+    habit: HabitRead
+    # one character per day from start to end: "1" logged, "0" not
+    days: str
+    # share of the range's days since the habit's start_date that have a log
+    completion_rate: float
+    current_streak: int
+    best_streak: int
+
+class DashboardRangeResponse(BaseModel):
+    start: date
+    end: date
+    habits: List[RangeHabitItem]
+
+# -------------- ANALYTICS SCHEMAS --------------------
+
+class RollupPeriod(str, Enum):
+    WEEK = "week"
+    MONTH = "month"
+
+class HabitRollupRead(BaseModel):
+    model_config = ConfigDict(from_attributes=True)
+
+    habit_id: int
+    period_start: date
+    log_count: int
+    value_sum: int
+    target: int
+    met: bool
+
+class AnalyticsResponse(BaseModel):
+    period: RollupPeriod
+    start: date
+    end: date
+    # only periods with at least one log; missing ones had none
+    rollups: List[HabitRollupRead]
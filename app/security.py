@@ -1,19 +1,22 @@
+import hashlib
+import os
+import threading
+import time
+from collections import OrderedDict
 from datetime import datetime, timedelta, timezone
-from typing import Optional
+from typing import Dict, Optional
 
 from fastapi import Depends, HTTPException, status
+from fastapi.security import OAuth2PasswordBearer
 from jose import JWTError, jwt
 from jose.exceptions import ExpiredSignatureError
-from passlib.context import CryptContext
 from pydantic import BaseModel, ConfigDict
+from app import config
 from app.passwordhash import Hash
+from app.services.hash_pool import HashPoolSaturated, hash_pool
+from app.services.metrics import timed
 
-# used to load the secret key from .env
-from dotenv import load_dotenv
-import os
-
-load_dotenv()
-
+# app.config has already loaded .env
 SECRET_KEY = os.getenv("SECRET_KEY")
 if not SECRET_KEY:
     raise RuntimeError("SECRET_KEY is not set. Define it in .env or env vars.")
@@ -21,17 +24,26 @@ if not SECRET_KEY:
 ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = 60*24
 
-# pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/auth/login")
 
-from fastapi.security import OAuth2PasswordBearer
+async def _run_hash(fn, *args):
+    try:
+        return await hash_pool.run(fn, *args)
+    except HashPoolSaturated:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Too many sign-in attempts in progress, try again shortly",
+            headers={"Retry-After": "1"},
+        )
 
-oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/auth/login")
+async def get_password_hash(password: str) -> str:
+    return await _run_hash(Hash.bcrypt, password, config.BCRYPT_ROUNDS)
 
-def get_password_hash(password: str) -> str:
-    return Hash.bcrypt(password)
+async def verify_password(plain_password: str, password_hash: str) -> bool:
+    return await _run_hash(Hash.verify, plain_password, password_hash)
 
-def verify_password(plain_password: str, password_hash: str) -> bool:
-    return Hash.verify(plain_password, password_hash)
+def password_needs_rehash(password_hash: str) -> bool:
+    return Hash.needs_rehash(password_hash, config.BCRYPT_ROUNDS)
 
 class TokenPayload(BaseModel):
     model_config = ConfigDict(from_attributes=True)
@@ -48,11 +60,69 @@ def create_access_token(user_id: int, expires_delta: Optional[timedelta] = None)
     token = jwt.encode(payload, SECRET_KEY, algorithm=ALGORITHM)
     return token
     
-def decode_access_token(token: str = Depends(oauth2_scheme)) -> TokenPayload:
+class VerifiedTokenCache:
+    """
+    Bounded LRU of already verified tokens keyed by a digest of the raw token.
+    An entry is only served until the token's own ``exp``. SECRET_KEY is fixed
+    for the life of the process, so a rotated key takes a restart, which also
+    empties the cache.
+    """
+
+    def __init__(self, maxsize: int):
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._entries: "OrderedDict[bytes, TokenPayload]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def key(token: str) -> bytes:
+        return hashlib.blake2b(token.encode(), digest_size=16).digest()
+
+    def get(self, key: bytes, now: float) -> Optional[TokenPayload]:
+        with self._lock:
+            payload = self._entries.get(key)
+            if payload is None:
+                self.misses += 1
+                return None
+            if payload.exp <= now:
+                del self._entries[key]
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return payload
+
+    def put(self, key: bytes, payload: TokenPayload) -> None:
+        if self.maxsize <= 0:
+            return
+        with self._lock:
+            self._entries[key] = payload
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict[str, int]:
+        return {"hits": self.hits, "misses": self.misses, "size": len(self._entries), "maxsize": self.maxsize}
+
+token_cache = VerifiedTokenCache(config.TOKEN_CACHE_SIZE)
+
+def token_cache_stats() -> Dict[str, int]:
+    return token_cache.stats()
+
+async def decode_access_token(token: str = Depends(oauth2_scheme)) -> TokenPayload:
+    cache_key = VerifiedTokenCache.key(token)
+    cached = token_cache.get(cache_key, time.time())
+    if cached is not None:
+        return cached
+
     try:
-        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
-        token_data = TokenPayload(**payload)
-        return token_data
+        with timed("auth"):
+            payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+            token_data = TokenPayload(**payload)
     except ExpiredSignatureError:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
@@ -63,4 +133,6 @@ def decode_access_token(token: str = Depends(oauth2_scheme)) -> TokenPayload:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Could not validate credentials"
-        )
\ No newline at end of file
+        )
+    token_cache.put(cache_key, token_data)
+    return token_data
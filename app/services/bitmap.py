@@ -0,0 +1,189 @@
+"""
+Per-habit completion history as a bitmap: bit i is set when the habit has a
+log on ``origin + i`` days. Three years of history is ~140 bytes, and the
+streak and rate questions become a handful of shifts and masks on one
+Python int instead of a scan over HabitLog rows.
+
+The origin is always a Monday, so ISO week w is bits 7*w .. 7*w+6.
+"""
+from datetime import date
+from typing import Iterable, Optional, Tuple
+
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from app import models
+from app.services.streaks import _week_start
+
+_WEEK = 7
+
+def _to_int(raw: Optional[bytes]) -> int:
+    return int.from_bytes(raw or b"", "little")
+
+def _to_bytes(bits: int) -> bytes:
+    return bits.to_bytes((bits.bit_length() + 7) // 8, "little")
+
+def _lanes(count: int, stride: int = _WEEK) -> int:
+    """Bit 0 of ``count`` consecutive ``stride``-bit lanes (week lanes by default)."""
+    return int(("0" * (stride - 1) + "1") * count, 2) if count > 0 else 0
+
+def _longest_run(bits: int, stride: int = 1) -> int:
+    """
+    Longest run of set bits spaced ``stride`` apart, by doubling: level k has
+    bit i set when bits i, i+stride, ..., i+(k-1)*stride are all set, so the
+    answer is assembled from O(log n) whole-int ANDs.
+    """
+    if not bits:
+        return 0
+    levels = [(1, bits)]
+    while True:
+        k, run = levels[-1]
+        longer = run & (run >> (k * stride))
+        if not longer:
+            break
+        levels.append((2 * k, longer))
+
+    length, starts = 0, -1
+    for k, run in reversed(levels):
+        candidate = starts & (run >> (length * stride))
+        if candidate:
+            starts = candidate
+            length += k
+    return length
+
+def _run_ending_at(bits: int, position: int, stride: int = 1) -> int:
+    """Length of the run of set bits (``stride`` apart) ending at ``position``."""
+    if position < 0 or not (bits >> position) & 1:
+        return 0
+    below = (1 << position) - 1
+    if stride > 1:
+        # only the positions in ``position``'s own lane can extend the run
+        below &= _lanes(position // stride + 1, stride) << (position % stride)
+    gaps = ~bits & below
+    if not gaps:
+        return position // stride + 1
+    return (position - (gaps.bit_length() - 1)) // stride
+
+def _offset(origin: date, d: date) -> int:
+    return (d - origin).days
+
+def _masked(bits: int, origin: date, today: date) -> int:
+    """Drop bits for days after ``today``."""
+    offset = _offset(origin, today)
+    if offset < 0:
+        return 0
+    return bits & ((1 << (offset + 1)) - 1)
+
+def new_bitmap(habit: models.Habit) -> models.HabitCompletionBitmap:
+    bitmap = models.HabitCompletionBitmap(origin=_week_start(habit.start_date), bits=b"")
+    habit.completion_bitmap = bitmap
+    return bitmap
+
+def set_days(bitmap: models.HabitCompletionBitmap, days: Iterable[date]) -> None:
+    days = list(days)
+    if not days:
+        return
+    bits = _to_int(bitmap.bits)
+    origin = bitmap.origin
+    earliest = _week_start(min(days))
+    if earliest < origin:
+        bits <<= _offset(earliest, origin)
+        origin = earliest
+    for d in days:
+        bits |= 1 << _offset(origin, d)
+    bitmap.origin = origin
+    bitmap.bits = _to_bytes(bits)
+
+def clear_days(bitmap: models.HabitCompletionBitmap, days: Iterable[date]) -> None:
+    bits = _to_int(bitmap.bits)
+    for d in days:
+        offset = _offset(bitmap.origin, d)
+        if offset >= 0:
+            bits &= ~(1 << offset)
+    bitmap.bits = _to_bytes(bits)
+
+def rebuild_bitmap(db: Session, habit: models.Habit) -> models.HabitCompletionBitmap:
+    bitmap = habit.completion_bitmap
+    if bitmap is None:
+        bitmap = new_bitmap(habit)
+    bitmap.origin = _week_start(habit.start_date)
+    bitmap.bits = b""
+    set_days(bitmap, db.scalars(select(models.HabitLog.date).where(models.HabitLog.habit_id == habit.id)))
+    return bitmap
+
+def days_to_bits(days: Iterable[date], origin: date) -> int:
+    bits = 0
+    for d in days:
+        bits |= 1 << _offset(origin, d)
+    return bits
+
+def day_string(bits: int, origin: date, start: date, end: date) -> str:
+    """'0'/'1' per day from ``start`` to ``end``; character i is ``start + i`` days."""
+    length = (end - start).days + 1
+    if length <= 0:
+        return ""
+    shift = _offset(origin, start)
+    window = bits >> shift if shift >= 0 else bits << -shift
+    window &= (1 << length) - 1
+    return format(window, f"0{length}b")[::-1]
+
+def is_set(bitmap: models.HabitCompletionBitmap, d: date) -> bool:
+    offset = _offset(bitmap.origin, d)
+    return offset >= 0 and bool((_to_int(bitmap.bits) >> offset) & 1)
+
+def completion_rate(bits: int, origin: date, start: date, end: date) -> float:
+    """Share of days in [start, end] with a log: one popcount over the masked window."""
+    if end < start:
+        return 0.0
+    first = max(_offset(origin, start), 0)
+    last = _offset(origin, end)
+    if last < 0:
+        return 0.0
+    window = (bits >> first) & ((1 << (last - first + 1)) - 1)
+    return window.bit_count() / ((end - start).days + 1)
+
+def daily_streaks(bits: int, origin: date, today: date) -> Tuple[int, int]:
+    """Same answer as compute_streaks_for_daily over the logs up to ``today``."""
+    bits = _masked(bits, origin, today)
+    return _run_ending_at(bits, _offset(origin, today)), _longest_run(bits)
+
+def weekly_met(bits: int, target: int) -> int:
+    """
+    Bit 7*w is set when week w has at least ``target`` logs. The seven days of
+    every week are summed into their lane in parallel (a lane holds at most 7,
+    so sums never carry into the next lane), then ``8 - target`` is added so
+    that bit 3 of the lane flips exactly when the sum reaches the target.
+    """
+    if target <= 0 or target > _WEEK:
+        return 0
+    lanes = _lanes(bits.bit_length() // _WEEK + 1)
+    counts = sum((bits >> day) & lanes for day in range(_WEEK))
+    return ((counts + (8 - target) * lanes) >> 3) & lanes
+
+def weekly_streaks(bits: int, origin: date, today: date, target: int) -> Tuple[int, int]:
+    """Same answer as compute_streaks_for_x_per_week over the logs up to ``today``."""
+    if target <= 0:
+        return 0, 0
+    met = weekly_met(_masked(bits, origin, today), target)
+    this_week = _offset(origin, today) // _WEEK * _WEEK
+    current = _run_ending_at(met, this_week, _WEEK) or _run_ending_at(met, this_week - _WEEK, _WEEK)
+    return current, _longest_run(met, _WEEK)
+
+def read_bitmap_streaks(
+        bitmap: models.HabitCompletionBitmap,
+        goal_type: str,
+        target_per_period: Optional[int],
+        today: date,
+) -> Tuple[bool, int, int]:
+    """(completed_today, current_streak, best_streak), like read_streaks."""
+    bits = _to_int(bitmap.bits)
+    offset = _offset(bitmap.origin, today)
+    completed_today = offset >= 0 and bool((bits >> offset) & 1)
+    if goal_type == "DAILY":
+        current, best = daily_streaks(bits, bitmap.origin, today)
+    elif goal_type == "X_PER_WEEK":
+        target = 1 if target_per_period is None else target_per_period
+        current, best = weekly_streaks(bits, bitmap.origin, today, target)
+    else:
+        current, best = 0, 0
+    return completed_today, current, best
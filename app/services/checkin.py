@@ -0,0 +1,83 @@
+"""
+POST /dashboard/today/checkin: flip today's completion for several habits in
+one transaction and answer with just those habits' TodayHabitItems, instead
+of one log request per habit followed by a full dashboard reload.
+"""
+from datetime import date
+from typing import Any, Dict, List, Tuple
+
+from sqlalchemy import delete, select
+from sqlalchemy.orm import Session, selectinload
+
+from app import models
+from app.db import dialect_insert
+from app.services.dashboard import build_today_payload
+from app.services.data_version import bump_data_version
+from app.services.log_writes import logs_added, logs_removed
+
+class HabitNotFound(Exception):
+    pass
+
+def toggle_today(
+        db: Session,
+        user: models.User,
+        habit_ids: List[int],
+        today: date,
+) -> Tuple[Dict[str, Any], List[int]]:
+    """
+    Removes today's log from habits that have one and adds one to the rest,
+    then returns the build_today_payload of only those habits and the ids
+    whose log this call actually added or removed. Raises
+    HabitNotFound, before writing anything, if any id isn't one of the user's
+    habits on today's dashboard (archived or not started yet).
+    """
+    habits = db.scalars(
+        select(models.Habit)
+        .options(selectinload(models.Habit.streak_state), selectinload(models.Habit.completion_bitmap))
+        .where(
+            models.Habit.user_id == user.id,
+            models.Habit.id.in_(habit_ids),
+            models.Habit.is_archived == False,
+            models.Habit.start_date <= today,
+        )
+    ).all()
+    if len(habits) != len(set(habit_ids)):
+        raise HabitNotFound(sorted(set(habit_ids) - {h.id for h in habits}))
+
+    logged = set(db.scalars(
+        select(models.HabitLog.habit_id)
+        .where(models.HabitLog.habit_id.in_(habit_ids), models.HabitLog.date == today)
+    ))
+    by_id = {h.id: h for h in habits}
+
+    # RETURNING tells us what this transaction actually changed, so a
+    # concurrent check-in of the same habit is never counted twice
+    removed = []
+    if logged:
+        removed = db.execute(
+            delete(models.HabitLog)
+            .where(models.HabitLog.habit_id.in_(logged), models.HabitLog.date == today)
+            .returning(models.HabitLog.habit_id, models.HabitLog.value)
+            .execution_options(synchronize_session=False)
+        ).all()
+    added = []
+    to_add = [h for h in habits if h.id not in logged]
+    if to_add:
+        added = db.execute(
+            dialect_insert(db)(models.HabitLog)
+            .on_conflict_do_nothing(index_elements=["habit_id", "date"])
+            .returning(models.HabitLog.habit_id, models.HabitLog.value),
+            [{"habit_id": h.id, "user_id": user.id, "date": today, "value": 1} for h in to_add],
+        ).all()
+    for habit_id, value in removed:
+        logs_removed(db, by_id[habit_id], [(today, value)])
+    for habit_id, value in added:
+        logs_added(db, by_id[habit_id], [(today, value)])
+    changed = sorted({habit_id for habit_id, _ in removed + added})
+    # a check-in that lost every row to concurrent ones leaves ETags and
+    # stored dashboards valid
+    if changed:
+        bump_data_version(db, user.id)
+    db.commit()
+
+    return build_today_payload(db, user, today, habit_ids), changed
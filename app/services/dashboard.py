@@ -0,0 +1,216 @@
+from datetime import date, datetime
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy import select
+from sqlalchemy.orm import Session, selectinload
+from zoneinfo import ZoneInfo
+
+from app import config, models
+from app.services.bitmap import (
+    completion_rate, daily_streaks, day_string, days_to_bits, read_bitmap_streaks, rebuild_bitmap, weekly_streaks,
+)
+from app.services.metrics import timed
+from app.services.serialization import range_item_to_dict, today_item_to_dict
+from app.services.streaks import _week_start, compute_streaks_for_daily, compute_streaks_for_x_per_week
+from app.services.streaks_sql import compute_streaks_sql
+from app.services.streak_state import _goal_value, is_stale, read_streaks, rebuild_streak_state
+
+# (completed_today, current_streak, best_streak) per habit id
+TodayStreaks = Dict[int, Tuple[bool, int, int]]
+
+def user_zone(timezone: str) -> ZoneInfo:
+    try:
+        return ZoneInfo(timezone or "UTC")
+    except Exception:
+        return ZoneInfo("UTC")
+
+def user_today(user: models.User) -> date:
+    return datetime.now(user_zone(user.timezone)).date()
+
+def habit_load_options() -> list:
+    """Eager loads the configured backend reads from each habit."""
+    if config.STREAK_BACKEND == "state":
+        return [selectinload(models.Habit.streak_state)]
+    if config.STREAK_BACKEND == "bitmap":
+        return [selectinload(models.Habit.completion_bitmap)]
+    return []
+
+def build_today_payload(
+        db: Session,
+        current_user: models.User,
+        today: date,
+        habit_ids: Optional[Iterable[int]] = None,
+) -> Dict[str, Any]:
+    """
+    The GET /dashboard/today body as plain dicts (see app.services.serialization).
+    With ``habit_ids`` only those habits are loaded and have their streaks
+    computed; ids that are archived or not started yet are simply left out.
+    """
+    q = (
+        select(models.Habit)
+        .options(*habit_load_options())
+        .where(
+            models.Habit.user_id == current_user.id,
+            models.Habit.is_archived == False,
+            models.Habit.start_date <= today,
+        )
+        .order_by(models.Habit.created_at)
+    )
+    if habit_ids is not None:
+        q = q.where(models.Habit.id.in_(list(habit_ids)))
+    habits: List[models.Habit] = db.scalars(q).all()
+    streaks = compute_today_streaks(db, current_user, habits, today) if habits else {}
+    return {
+        "date": today,
+        "habits": [today_item_to_dict(habit, *streaks[habit.id]) for habit in habits],
+    }
+
+def build_range_payload(db: Session, current_user: models.User, start: date, end: date) -> Dict[str, Any]:
+    """
+    GET /dashboard/range: a '0'/'1' day string per habit for [start, end],
+    its completion rate over the days of that range since the habit started,
+    and the streaks as of ``end``. Every log date up to ``end`` comes back in
+    one (habit_id, date) query and is folded into a bitmap per habit, which
+    all three answers come from.
+    """
+    habits: List[models.Habit] = db.scalars(
+        select(models.Habit)
+        .where(
+            models.Habit.user_id == current_user.id,
+            models.Habit.is_archived == False,
+            models.Habit.start_date <= end,
+        )
+        .order_by(models.Habit.created_at)
+    ).all()
+
+    dates_by_habit: Dict[int, List[date]] = {h.id: [] for h in habits}
+    if habits:
+        rows = db.execute(
+            select(models.HabitLog.habit_id, models.HabitLog.date)
+            .where(
+                models.HabitLog.user_id == current_user.id,
+                models.HabitLog.habit_id.in_(dates_by_habit),
+                models.HabitLog.date <= end,
+            )
+        )
+        for habit_id, day in rows:
+            dates_by_habit[habit_id].append(day)
+
+    items = []
+    for habit in habits:
+        days = dates_by_habit[habit.id]
+        # a Monday origin, as the streak helpers in app.services.bitmap expect
+        origin = _week_start(min([habit.start_date, *days]))
+        bits = days_to_bits(days, origin)
+        goal_type = _goal_value(habit.goal_type)
+        if goal_type == "DAILY":
+            current, best = daily_streaks(bits, origin, end)
+        elif goal_type == "X_PER_WEEK":
+            target = 1 if habit.target_per_period is None else habit.target_per_period
+            current, best = weekly_streaks(bits, origin, end, target)
+        else:
+            current, best = 0, 0
+        rate = completion_rate(bits, origin, max(start, habit.start_date), end)
+        items.append(range_item_to_dict(habit, day_string(bits, origin, start, end), rate, current, best))
+    return {"start": start, "end": end, "habits": items}
+
+def compute_today_streaks(
+    db: Session,
+    current_user: models.User,
+    habits: List[models.Habit],
+    today: date,
+) -> TodayStreaks:
+    habit_ids = [h.id for h in habits]
+    with timed("streaks"):
+        if config.STREAK_BACKEND == "sql":
+            return compute_streaks_sql(db, habit_ids, today)
+        if config.STREAK_BACKEND == "python":
+            return compute_streaks_from_logs(db, current_user, habits, habit_ids, today)
+        if config.STREAK_BACKEND == "bitmap":
+            return compute_streaks_from_bitmaps(db, habits, today)
+        return compute_streaks_from_state(db, current_user, habits, today)
+
+def compute_streaks_from_state(
+    db: Session,
+    current_user: models.User,
+    habits: List[models.Habit],
+    today: date,
+) -> TodayStreaks:
+    # habits without a usable streak state get one rebuilt from their logs;
+    # anything the state still can't answer falls back to a scan of its logs
+    streaks: TodayStreaks = {}
+    rebuilt = False
+    for habit in habits:
+        state = habit.streak_state
+        if state is None or is_stale(state, habit):
+            state = rebuild_streak_state(db, habit)
+            rebuilt = True
+        result = read_streaks(state, today)
+        if result is not None:
+            streaks[habit.id] = result
+    if rebuilt:
+        db.commit()
+
+    fallback_ids = [h.id for h in habits if h.id not in streaks]
+    if fallback_ids:
+        streaks.update(compute_streaks_from_logs(db, current_user, habits, fallback_ids, today))
+    return streaks
+
+def compute_streaks_from_bitmaps(
+    db: Session,
+    habits: List[models.Habit],
+    today: date,
+) -> TodayStreaks:
+    streaks: TodayStreaks = {}
+    rebuilt = False
+    for habit in habits:
+        bitmap = habit.completion_bitmap
+        if bitmap is None:
+            bitmap = rebuild_bitmap(db, habit)
+            rebuilt = True
+        streaks[habit.id] = read_bitmap_streaks(
+            bitmap, _goal_value(habit.goal_type), habit.target_per_period, today,
+        )
+    if rebuilt:
+        db.commit()
+    return streaks
+
+def compute_streaks_from_logs(
+    db: Session,
+    current_user: models.User,
+    habits: List[models.Habit],
+    habit_ids: List[int],
+    today: date,
+) -> TodayStreaks:
+    logs: List[models.HabitLog] = (
+        db.query(models.HabitLog)
+        .filter(
+            models.HabitLog.user_id == current_user.id,
+            models.HabitLog.habit_id.in_(habit_ids),
+            models.HabitLog.date <= today,
+        )
+        .all()
+    )
+
+    logs_by_habit: Dict[int, List[models.HabitLog]] = {hid: [] for hid in habit_ids}
+    for log in logs:
+        logs_by_habit[log.habit_id].append(log)
+
+    results: TodayStreaks = {}
+    for habit in habits:
+        if habit.id not in logs_by_habit:
+            continue
+        habit_logs = logs_by_habit[habit.id]
+
+        completed_today = any(log.date == today for log in habit_logs)
+
+        log_dates = [log.date for log in habit_logs]
+        if habit.goal_type == "DAILY":
+            current_streak, best_streak = compute_streaks_for_daily(log_dates, today)
+        elif habit.goal_type == "X_PER_WEEK":
+            current_streak, best_streak = compute_streaks_for_x_per_week(log_dates, today, habit.target_per_period)
+        else:
+            current_streak, best_streak = 0, 0
+
+        results[habit.id] = (completed_today, current_streak, best_streak)
+    return results
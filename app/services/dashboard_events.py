@@ -0,0 +1,125 @@
+"""
+Push updates for open dashboards (GET /dashboard/stream, Server-Sent Events).
+
+Write endpoints publish the ids of the habits they changed to an in-process
+pub/sub; each open stream recomputes just those habits and sends them as a
+delta. An idle stream is a suspended generator waiting on an asyncio.Event,
+holding no database connection, so a worker can keep thousands open.
+
+Subscribers only hear about writes made by the same worker process; with
+several workers, clients still catch up on the next day rollover or
+reconnect.
+"""
+import asyncio
+from collections import defaultdict
+from datetime import datetime, time, timedelta
+from typing import AsyncIterator, Dict, Iterable, Set
+
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app import models, schemas
+from app.services.dashboard import build_today_payload, user_today, user_zone
+
+class Subscription:
+    def __init__(self, user_id: int):
+        self.user_id = user_id
+        # changes coalesce here until the stream gets to them, so a slow
+        # client never queues more than one pending set of ids
+        self.changed: Set[int] = set()
+        self.wakeup = asyncio.Event()
+
+class DashboardEvents:
+    def __init__(self):
+        self._subscriptions: Dict[int, Set[Subscription]] = defaultdict(set)
+
+    def subscribe(self, user_id: int) -> Subscription:
+        subscription = Subscription(user_id)
+        self._subscriptions[user_id].add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription) -> None:
+        subscriptions = self._subscriptions.get(subscription.user_id)
+        if subscriptions is not None:
+            subscriptions.discard(subscription)
+            if not subscriptions:
+                del self._subscriptions[subscription.user_id]
+
+    def publish(self, user_id: int, habit_ids: Iterable[int]) -> None:
+        """Call after the write has committed, from the event loop."""
+        subscriptions = self._subscriptions.get(user_id)
+        if not subscriptions:
+            return
+        habit_ids = set(habit_ids)
+        for subscription in subscriptions:
+            subscription.changed |= habit_ids
+            subscription.wakeup.set()
+
+    def subscriber_count(self) -> int:
+        return sum(len(s) for s in self._subscriptions.values())
+
+_events = DashboardEvents()
+
+def get_dashboard_events() -> DashboardEvents:
+    return _events
+
+def _sse(event: str, data: str) -> str:
+    return f"event: {event}\ndata: {data}\n\n"
+
+def _seconds_until_midnight(user: models.User) -> float:
+    now = datetime.now(user_zone(user.timezone))
+    midnight = datetime.combine(now.date() + timedelta(days=1), time(), tzinfo=now.tzinfo)
+    return max((midnight - now).total_seconds(), 0.0)
+
+async def _snapshot(db: AsyncSession, user: models.User) -> str:
+    today = user_today(user)
+    payload = await db.run_sync(build_today_payload, user, today)
+    # give the connection back while the stream idles
+    await db.close()
+    return _sse("snapshot", schemas.DashboardTodayResponse.model_validate(payload).model_dump_json())
+
+async def _delta(db: AsyncSession, user: models.User, habit_ids: Set[int]) -> str:
+    today = user_today(user)
+    payload = await db.run_sync(build_today_payload, user, today, habit_ids)
+    await db.close()
+    present = {item["habit"]["id"] for item in payload["habits"]}
+    delta = schemas.DashboardDelta(date=today, habits=payload["habits"], removed=sorted(habit_ids - present))
+    return _sse("habits", delta.model_dump_json())
+
+async def dashboard_stream(db: AsyncSession, user: models.User, heartbeat_seconds: float) -> AsyncIterator[str]:
+    """
+    A "snapshot" event with the whole dashboard, then a "habits" event
+    (schemas.DashboardDelta) whenever the user's habits or logs change, a new
+    snapshot when their local day rolls over, and a comment line every
+    ``heartbeat_seconds`` in between.
+    """
+    events = get_dashboard_events()
+    subscription = events.subscribe(user.id)
+    try:
+        today = user_today(user)
+        yield await _snapshot(db, user)
+        while True:
+            try:
+                await asyncio.wait_for(
+                    subscription.wakeup.wait(),
+                    min(heartbeat_seconds, _seconds_until_midnight(user) + 0.001),
+                )
+            except asyncio.TimeoutError:
+                pass
+
+            if user_today(user) != today:
+                # every item's is_completed and streaks may have changed
+                today = user_today(user)
+                subscription.wakeup.clear()
+                subscription.changed.clear()
+                yield await _snapshot(db, user)
+                continue
+            if not subscription.wakeup.is_set():
+                yield ": ping\n\n"
+                continue
+
+            subscription.wakeup.clear()
+            habit_ids, subscription.changed = subscription.changed, set()
+            if habit_ids:
+                yield await _delta(db, user, habit_ids)
+    finally:
+        events.unsubscribe(subscription)
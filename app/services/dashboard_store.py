@@ -0,0 +1,93 @@
+"""
+Precomputed GET /dashboard/today payloads, one per user. An entry is only
+served for the local date and data_version it was built for, so any habit or
+log write, and the day rolling over, turn it into a miss.
+
+DashboardStore is each worker's own LRU; ``dashboard_snapshots`` holds what
+the rollover precompute built, for every worker to read on a miss.
+"""
+import json
+import threading
+from collections import OrderedDict
+from datetime import date
+from typing import Any, Dict, Iterable, Optional, Tuple
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from app import config, models, schemas
+from app.db import dialect_insert
+
+class DashboardStore:
+    """Bounded LRU of (date, data_version, payload) per user id."""
+
+    def __init__(self, maxsize: int):
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._entries: "OrderedDict[int, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, user_id: int, today: date, data_version: int) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            entry = self._entries.get(user_id)
+            if entry is None or entry[0] != today or entry[1] != data_version:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(user_id)
+            self.hits += 1
+            return entry[2]
+
+    def set(self, user_id: int, today: date, data_version: int, payload: Dict[str, Any]) -> None:
+        if self.maxsize <= 0:
+            return
+        with self._lock:
+            current = self._entries.get(user_id)
+            # a slow precompute must not replace what a request stored since
+            if current is not None and (current[0], current[1]) > (today, data_version):
+                return
+            self._entries[user_id] = (today, data_version, payload)
+            self._entries.move_to_end(user_id)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict[str, int]:
+        return {"hits": self.hits, "misses": self.misses, "size": len(self._entries), "maxsize": self.maxsize}
+
+_store = DashboardStore(config.DASHBOARD_STORE_SIZE)
+
+def get_dashboard_store() -> DashboardStore:
+    return _store
+
+def save_snapshots(db: Session, entries: Iterable[Tuple[int, date, int, Dict[str, Any]]]) -> None:
+    """Upserts (user_id, date, data_version, payload) rows; the caller commits."""
+    rows = [
+        {
+            "user_id": user_id,
+            "date": day,
+            "data_version": version,
+            "payload": schemas.DashboardTodayResponse.model_validate(payload).model_dump_json(),
+        }
+        for user_id, day, version, payload in entries
+    ]
+    if not rows:
+        return
+    stmt = dialect_insert(db)(models.DashboardSnapshot)
+    db.execute(
+        stmt.on_conflict_do_update(
+            index_elements=["user_id"],
+            set_={"date": stmt.excluded.date, "data_version": stmt.excluded.data_version, "payload": stmt.excluded.payload},
+        ),
+        rows,
+    )
+
+async def load_snapshot(db: AsyncSession, user_id: int, today: date, data_version: int) -> Optional[Dict[str, Any]]:
+    row = await db.scalar(select(models.DashboardSnapshot).where(models.DashboardSnapshot.user_id == user_id))
+    if row is None or row.date != today or row.data_version != data_version:
+        return None
+    return json.loads(row.payload)
@@ -0,0 +1,58 @@
+"""
+users.data_version goes up on every habit or log write, so a response built
+from (user, data_version, local date) can be revalidated with a single
+primary-key read instead of the habit and log queries behind it.
+"""
+import hashlib
+from datetime import date
+from typing import Optional
+
+from fastapi import Request, Response, status
+from sqlalchemy import select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from app import models
+
+def bump_data_version(db: Session, user_id: int) -> None:
+    # a single UPDATE, so concurrent writers never lose an increment
+    db.execute(
+        update(models.User)
+        .where(models.User.id == user_id)
+        .values(data_version=models.User.data_version + 1)
+        .execution_options(synchronize_session=False)
+    )
+
+async def read_data_version(db: AsyncSession, user_id: int) -> int:
+    # read fresh rather than from the user cache, which other workers
+    # do not invalidate
+    return await db.scalar(select(models.User.data_version).where(models.User.id == user_id)) or 0
+
+def make_etag(request: Request, user_id: int, data_version: int, today: date) -> str:
+    """
+    Strong ETag for one representation. The query string is part of it, since
+    e.g. /habits/?include_archived=true is a different body; the local date
+    makes it roll over at the user's midnight.
+    """
+    key = f"{request.url.path}?{request.url.query}|{user_id}|{data_version}|{today.isoformat()}"
+    return '"' + hashlib.blake2b(key.encode(), digest_size=12).hexdigest() + '"'
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    # If-None-Match uses the weak comparison, so a W/ prefix added by a proxy still matches
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    candidates = (c.strip() for c in if_none_match.split(","))
+    return any(c.removeprefix("W/") == etag for c in candidates)
+
+def conditional_response(request: Request, response: Response, etag: str) -> Optional[Response]:
+    """
+    Puts the validators on ``response`` and returns a bare 304 to send
+    instead when the client's cached copy is still current.
+    """
+    headers = {"ETag": etag, "Cache-Control": "private, no-cache"}
+    if etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+    response.headers.update(headers)
+    return None
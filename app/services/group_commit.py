@@ -0,0 +1,181 @@
+"""
+Group commit for single log inserts (config.GROUP_COMMIT). Requests put
+their log on a queue and wait; a writer task per database drains it into one
+transaction every GROUP_COMMIT_WINDOW_MS (or GROUP_COMMIT_MAX_ROWS rows),
+so a burst of check-ins costs one commit, and on SQLite one fsync, instead
+of one each. A request is only answered after its batch has committed.
+At most GROUP_COMMIT_MAX_PENDING logs wait per writer; beyond that callers
+get GroupCommitSaturated.
+
+If a batch fails, its entries are retried one transaction each, so one bad
+row only fails its own request.
+"""
+import asyncio
+import contextvars
+import logging
+from collections import defaultdict
+from typing import Any, Dict, List, Optional, Tuple
+
+from sqlalchemy import select, text
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, async_sessionmaker
+from sqlalchemy.orm import Session, selectinload
+
+from app import config, models
+from app.db import dialect_insert
+from app.services.data_version import bump_data_version
+from app.services.log_writes import logs_added
+
+logger = logging.getLogger(__name__)
+
+DURABILITY_LEVELS = ("commit", "full")
+
+class DuplicateLog(Exception):
+    pass
+
+class GroupCommitSaturated(Exception):
+    pass
+
+def check_durability(durability: str) -> None:
+    if durability not in DURABILITY_LEVELS:
+        raise ValueError(f"Unknown GROUP_COMMIT_DURABILITY {durability!r}, expected one of {', '.join(DURABILITY_LEVELS)}")
+
+# (habit_id, user_id, HabitLogCreate fields)
+PendingLog = Tuple[int, int, Dict[str, Any]]
+
+def write_logs(db: Session, pending: List[PendingLog]) -> List[Optional[models.HabitLog]]:
+    """Inserts the logs in order; None where (habit_id, date) already had one."""
+    insert = dialect_insert(db)
+    rows: List[Optional[models.HabitLog]] = []
+    for habit_id, user_id, values in pending:
+        stmt = (
+            insert(models.HabitLog)
+            .values(habit_id=habit_id, user_id=user_id, **values)
+            .on_conflict_do_nothing(index_elements=["habit_id", "date"])
+            .returning(models.HabitLog)
+        )
+        rows.append(db.scalars(stmt).first())
+
+    inserted = [row for row in rows if row is not None]
+    by_habit: Dict[int, List[Tuple]] = defaultdict(list)
+    for row in inserted:
+        by_habit[row.habit_id].append((row.date, row.value))
+    if by_habit:
+        habits = db.scalars(
+            select(models.Habit)
+            .options(selectinload(models.Habit.streak_state), selectinload(models.Habit.completion_bitmap))
+            .where(models.Habit.id.in_(by_habit))
+        ).all()
+        for habit in habits:
+            logs_added(db, habit, by_habit[habit.id])
+    for user_id in sorted({row.user_id for row in inserted}):
+        bump_data_version(db, user_id)
+    return rows
+
+class GroupCommitWriter:
+    def __init__(
+            self,
+            bind: AsyncEngine,
+            window_ms: float,
+            max_rows: int,
+            durability: str = "commit",
+            max_pending: int = 0,
+    ):
+        check_durability(durability)
+        self.window = window_ms / 1000
+        self.max_rows = max_rows
+        self.durability = durability
+        self.batches = 0
+        self.rows = 0
+        self._sessions = async_sessionmaker(bind, class_=AsyncSession, autoflush=False, expire_on_commit=False)
+        self._queue: "asyncio.Queue[Tuple[PendingLog, asyncio.Future]]" = asyncio.Queue(max_pending)
+        # a fresh context, so batch SQL is not timed as part of whichever
+        # request happened to start the writer
+        self._task = contextvars.Context().run(asyncio.get_running_loop().create_task, self._run())
+
+    async def submit(self, habit_id: int, user_id: int, values: Dict[str, Any]) -> models.HabitLog:
+        future = asyncio.get_running_loop().create_future()
+        try:
+            self._queue.put_nowait(((habit_id, user_id, values), future))
+        except asyncio.QueueFull:
+            raise GroupCommitSaturated()
+        return await future
+
+    async def _run(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await self._queue.get()]
+            deadline = loop.time() + self.window
+            while len(batch) < self.max_rows:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self._queue.get(), timeout))
+                except asyncio.TimeoutError:
+                    break
+            await self._flush(batch)
+
+    async def _flush(self, batch: List[Tuple[PendingLog, asyncio.Future]]) -> None:
+        try:
+            async with self._sessions() as db:
+                previous_sync = None
+                if self.durability == "full" and db.bind.dialect.name == "sqlite":
+                    previous_sync = await db.scalar(text("PRAGMA synchronous"))
+                    await db.execute(text("PRAGMA synchronous=FULL"))
+                try:
+                    rows = await db.run_sync(write_logs, [pending for pending, _ in batch])
+                    await db.commit()
+                finally:
+                    if previous_sync is not None:
+                        # the connection goes back to the pool with its profile's setting
+                        await db.execute(text(f"PRAGMA synchronous={int(previous_sync)}"))
+        except Exception as e:
+            if len(batch) > 1:
+                logger.warning("group commit of %d logs failed, retrying one by one", len(batch))
+                for entry in batch:
+                    await self._flush([entry])
+                return
+            if not batch[0][1].done():
+                batch[0][1].set_exception(e)
+            return
+
+        self.batches += 1
+        self.rows += len(batch)
+        for (_, future), row in zip(batch, rows):
+            if future.done():
+                # the request went away while it waited; its log is still saved
+                continue
+            if row is None:
+                future.set_exception(DuplicateLog())
+            else:
+                future.set_result(row)
+
+    async def close(self) -> None:
+        """Commits whatever is queued, then stops."""
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        pending = []
+        while not self._queue.empty():
+            pending.append(self._queue.get_nowait())
+        if pending:
+            await self._flush(pending)
+
+_writers: Dict[AsyncEngine, GroupCommitWriter] = {}
+
+def group_commit_writer(bind: AsyncEngine) -> GroupCommitWriter:
+    """The writer for ``bind`` (one per database, so per shard), started on first use."""
+    writer = _writers.get(bind)
+    if writer is None:
+        writer = _writers[bind] = GroupCommitWriter(
+            bind, config.GROUP_COMMIT_WINDOW_MS, config.GROUP_COMMIT_MAX_ROWS, config.GROUP_COMMIT_DURABILITY,
+            config.GROUP_COMMIT_MAX_PENDING,
+        )
+    return writer
+
+async def close_group_commit_writers() -> None:
+    while _writers:
+        _, writer = _writers.popitem()
+        await writer.close()
@@ -0,0 +1,48 @@
+import asyncio
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Callable, Optional
+
+from fastapi.concurrency import run_in_threadpool
+
+from app import config
+
+class HashPoolSaturated(Exception):
+    pass
+
+class PasswordHashPool:
+    """
+    Runs bcrypt work in a dedicated process pool so login storms cannot take
+    over the request threadpool or the event loop. At most ``max_pending``
+    jobs may be running or queued; beyond that callers get HashPoolSaturated.
+    """
+
+    def __init__(self, workers: int, max_pending: int):
+        self.workers = workers
+        self.max_pending = max_pending
+        self.pending = 0
+        self._executor: Optional[ProcessPoolExecutor] = None
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(max_workers=self.workers)
+        return self._executor
+
+    async def run(self, fn: Callable[..., Any], *args: Any) -> Any:
+        # only touched from the event loop thread, so a plain counter is enough
+        if self.pending >= self.max_pending:
+            raise HashPoolSaturated()
+        self.pending += 1
+        try:
+            if self.workers <= 0:
+                return await run_in_threadpool(fn, *args)
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(self._get_executor(), fn, *args)
+        finally:
+            self.pending -= 1
+
+    def shutdown(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+hash_pool = PasswordHashPool(config.PASSWORD_HASH_WORKERS, config.PASSWORD_HASH_MAX_PENDING)
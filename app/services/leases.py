@@ -0,0 +1,40 @@
+"""
+Leases in the directory database (``scheduler_leases``), so a job that every
+worker process starts, like the dashboard precompute, only runs in one of
+them. The holder renews its lease well before it expires; when it stops or
+dies, another worker takes over once the lease has run out.
+"""
+import time
+from typing import Optional
+
+from sqlalchemy import delete, or_, update
+from sqlalchemy.orm import Session
+
+from app import models
+from app.db import dialect_insert
+
+def hold_lease(db: Session, name: str, holder: str, ttl: float, now: Optional[float] = None) -> bool:
+    """Takes or renews ``name`` for ``holder`` unless someone else's lease is still valid; commits."""
+    now = time.time() if now is None else now
+    db.execute(
+        dialect_insert(db)(models.SchedulerLease)
+        .values(name=name, holder=holder, expires_at=now + ttl)
+        .on_conflict_do_nothing(index_elements=["name"])
+    )
+    taken = db.execute(
+        update(models.SchedulerLease)
+        .where(
+            models.SchedulerLease.name == name,
+            or_(models.SchedulerLease.holder == holder, models.SchedulerLease.expires_at < now),
+        )
+        .values(holder=holder, expires_at=now + ttl)
+    ).rowcount
+    db.commit()
+    return taken == 1
+
+def release_lease(db: Session, name: str, holder: str) -> None:
+    db.execute(
+        delete(models.SchedulerLease)
+        .where(models.SchedulerLease.name == name, models.SchedulerLease.holder == holder)
+    )
+    db.commit()
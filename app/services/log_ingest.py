@@ -0,0 +1,181 @@
+import json
+from datetime import date
+from typing import AsyncIterator, Dict, List, Optional, Set, Tuple, Union
+
+from pydantic import TypeAdapter, ValidationError
+from sqlalchemy import select
+from sqlalchemy.orm import Session, selectinload
+
+from app import models, schemas
+from app.db import dialect_insert
+from app.services.data_version import bump_data_version
+from app.services.log_writes import logs_added
+
+MAX_BULK_ITEMS = 10_000
+# a JSON array body is read whole before its items are counted, so cap its
+# size too; an item is well under 512 bytes
+MAX_BULK_BYTES = MAX_BULK_ITEMS * 512
+
+NDJSON_CONTENT_TYPES = ("application/x-ndjson", "application/ndjson", "application/jsonl")
+
+_item_adapter = TypeAdapter(schemas.HabitLogBulkItem)
+
+# an item is either a validated log or the reason it was rejected
+ParsedItem = Union[schemas.HabitLogBulkItem, str]
+
+class BulkTooLarge(Exception):
+    pass
+
+def _parse_item(raw) -> ParsedItem:
+    try:
+        return _item_adapter.validate_python(raw)
+    except ValidationError as e:
+        return "; ".join(err["msg"] for err in e.errors())
+
+def _check_size(count: int) -> None:
+    if count > MAX_BULK_ITEMS:
+        raise BulkTooLarge(f"At most {MAX_BULK_ITEMS} logs can be sent per request")
+
+async def read_bulk_body(chunks: AsyncIterator[bytes], content_length: Optional[str]) -> bytes:
+    """
+    The request body, refused with BulkTooLarge as soon as it is known to
+    exceed MAX_BULK_BYTES: from Content-Length before reading anything, or
+    once that many bytes have arrived.
+    """
+    too_large = BulkTooLarge(f"At most {MAX_BULK_BYTES} bytes can be sent per request")
+    if content_length is not None and content_length.isdigit() and int(content_length) > MAX_BULK_BYTES:
+        raise too_large
+    body = bytearray()
+    async for chunk in chunks:
+        body += chunk
+        if len(body) > MAX_BULK_BYTES:
+            raise too_large
+    return bytes(body)
+
+def parse_json_array(body: bytes) -> List[ParsedItem]:
+    try:
+        raw_items = json.loads(body)
+    except ValueError:
+        raise ValueError("Body is not valid JSON")
+    if not isinstance(raw_items, list):
+        raise ValueError("Body must be a JSON array of logs")
+    _check_size(len(raw_items))
+    return [_parse_item(raw) for raw in raw_items]
+
+async def parse_ndjson_stream(chunks: AsyncIterator[bytes]) -> List[ParsedItem]:
+    items: List[ParsedItem] = []
+    buffer = b""
+
+    def take(line: bytes) -> None:
+        line = line.strip()
+        if not line:
+            return
+        _check_size(len(items) + 1)
+        try:
+            items.append(_parse_item(json.loads(line)))
+        except ValueError:
+            items.append("Line is not valid JSON")
+
+    async for chunk in chunks:
+        buffer += chunk
+        *lines, buffer = buffer.split(b"\n")
+        for line in lines:
+            take(line)
+    take(buffer)
+    return items
+
+def ingest_logs(
+    db: Session,
+    user: models.User,
+    items: List[ParsedItem],
+) -> schemas.HabitLogBulkResponse:
+    Status = schemas.BulkItemStatus
+    results: List[schemas.HabitLogBulkItemResult] = []
+    valid: List[Tuple[int, schemas.HabitLogBulkItem]] = []
+
+    for index, item in enumerate(items):
+        if isinstance(item, str):
+            results.append(schemas.HabitLogBulkItemResult(index=index, status=Status.INVALID, detail=item))
+        else:
+            valid.append((index, item))
+
+    habit_ids = {item.habit_id for _, item in valid}
+    habits: Dict[int, models.Habit] = {}
+    if habit_ids:
+        habits = {
+            h.id: h for h in db.scalars(
+                select(models.Habit)
+                .options(
+                    selectinload(models.Habit.streak_state),
+                    selectinload(models.Habit.completion_bitmap),
+                )
+                .where(models.Habit.user_id == user.id, models.Habit.id.in_(habit_ids))
+            )
+        }
+
+    existing: Set[Tuple[int, date]] = set()
+    owned = [(index, item) for index, item in valid if item.habit_id in habits]
+    if owned:
+        dates = [item.date for _, item in owned]
+        existing = {
+            (habit_id, log_date) for habit_id, log_date in db.execute(
+                select(models.HabitLog.habit_id, models.HabitLog.date).where(
+                    models.HabitLog.habit_id.in_(habits.keys()),
+                    models.HabitLog.date.between(min(dates), max(dates)),
+                )
+            )
+        }
+
+    rows = []
+    candidates: List[Tuple[int, schemas.HabitLogBulkItem]] = []
+    for index, item in valid:
+        if item.habit_id not in habits:
+            results.append(schemas.HabitLogBulkItemResult(
+                index=index, status=Status.NOT_FOUND, habit_id=item.habit_id, detail="Habit not found",
+            ))
+            continue
+        key = (item.habit_id, item.date)
+        if key in existing:
+            results.append(schemas.HabitLogBulkItemResult(
+                index=index, status=Status.DUPLICATE, habit_id=item.habit_id,
+                detail="Log already exists for this date.",
+            ))
+            continue
+        existing.add(key)
+        rows.append({"habit_id": item.habit_id, "user_id": user.id, "date": item.date, "value": item.value})
+        candidates.append((index, item))
+
+    inserted: Set[Tuple[int, date]] = set()
+    if rows:
+        # executemany; the conflict clause only guards against concurrent
+        # writers, and RETURNING says which rows they beat us to
+        new_logs: Dict[int, List[Tuple[date, int]]] = {}
+        for habit_id, log_date, value in db.execute(
+            dialect_insert(db)(models.HabitLog)
+            .on_conflict_do_nothing(index_elements=["habit_id", "date"])
+            .returning(models.HabitLog.habit_id, models.HabitLog.date, models.HabitLog.value),
+            rows,
+        ):
+            inserted.add((habit_id, log_date))
+            new_logs.setdefault(habit_id, []).append((log_date, value))
+        for habit_id, logs in new_logs.items():
+            logs_added(db, habits[habit_id], logs)
+        if inserted:
+            bump_data_version(db, user.id)
+        db.commit()
+
+    for index, item in candidates:
+        if (item.habit_id, item.date) in inserted:
+            results.append(schemas.HabitLogBulkItemResult(index=index, status=Status.CREATED, habit_id=item.habit_id))
+        else:
+            results.append(schemas.HabitLogBulkItemResult(
+                index=index, status=Status.DUPLICATE, habit_id=item.habit_id,
+                detail="Log already exists for this date.",
+            ))
+
+    results.sort(key=lambda r: r.index)
+    return schemas.HabitLogBulkResponse(
+        created=len(inserted),
+        skipped=len(results) - len(inserted),
+        results=results,
+    )
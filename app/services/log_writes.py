@@ -0,0 +1,47 @@
+"""
+Everything derived from habit_logs is kept in step from here, so the routers
+and the bulk importer only have one call to make after writing logs.
+"""
+from typing import Sequence
+
+from sqlalchemy.orm import Session
+
+from app import models
+from app.services.bitmap import clear_days, new_bitmap, rebuild_bitmap, set_days
+from app.services.rollups import LogEntry, add_logs, rebuild_rollups, remove_logs
+from app.services.streak_state import init_streak_state, rebuild_streak_state, record_logs
+
+def init_habit_tracking(habit: models.Habit) -> None:
+    init_streak_state(habit)
+    new_bitmap(habit)
+
+def logs_added(db: Session, habit: models.Habit, logs: Sequence[LogEntry]) -> None:
+    """
+    ``logs`` are (date, value) of the newly inserted rows. Call after they are
+    flushed; a fallback rebuild reads them back.
+    """
+    log_dates = [d for d, _ in logs]
+    record_logs(db, habit, log_dates)
+    add_logs(db, habit, logs)
+    if habit.completion_bitmap is None:
+        rebuild_bitmap(db, habit)
+    else:
+        set_days(habit.completion_bitmap, log_dates)
+
+def logs_removed(db: Session, habit: models.Habit, logs: Sequence[LogEntry]) -> None:
+    """
+    ``logs`` are (date, value) of the deleted rows. Call after the delete is
+    flushed: streak runs can't be taken apart incrementally, so the state is
+    rebuilt from what is left.
+    """
+    rebuild_streak_state(db, habit)
+    remove_logs(db, habit, logs)
+    if habit.completion_bitmap is None:
+        rebuild_bitmap(db, habit)
+    else:
+        clear_days(habit.completion_bitmap, [d for d, _ in logs])
+
+def goal_changed(db: Session, habit: models.Habit) -> None:
+    # the bitmap only records days, so it is unaffected by the goal
+    rebuild_streak_state(db, habit)
+    rebuild_rollups(db, [habit])
@@ -0,0 +1,213 @@
+"""
+Per-request timings and Prometheus histograms, cheap enough to leave on.
+
+MetricsMiddleware puts a RequestTimings in a context variable for each
+request. The SQLAlchemy cursor hooks and ``timed()`` blocks add to it; the
+context variable is visible from the greenlets AsyncSession runs sync code
+in, so run_sync'd service code is covered too. The totals go out in a
+Server-Timing header and into the histograms rendered at /metrics.
+"""
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_COUNT_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100, 200)
+
+class RequestTimings:
+    __slots__ = ("started", "queries", "sql_seconds", "phases")
+
+    def __init__(self) -> None:
+        self.started = time.perf_counter()
+        self.queries = 0
+        self.sql_seconds = 0.0
+        # named sections, e.g. "auth" or "streaks", in seconds
+        self.phases: Dict[str, float] = {}
+
+    def add(self, name: str, seconds: float) -> None:
+        self.phases[name] = self.phases.get(name, 0.0) + seconds
+
+    def server_timing(self, total_seconds: float) -> str:
+        parts = [f'db;desc="{self.queries} queries";dur={self.sql_seconds * 1000:.2f}']
+        parts += [f"{name};dur={seconds * 1000:.2f}" for name, seconds in self.phases.items()]
+        parts.append(f"total;dur={total_seconds * 1000:.2f}")
+        return ", ".join(parts)
+
+_current: ContextVar[Optional[RequestTimings]] = ContextVar("request_timings", default=None)
+
+def current_timings() -> Optional[RequestTimings]:
+    return _current.get()
+
+@contextmanager
+def timed(name: str) -> Iterator[None]:
+    """Adds the block's wall time to the current request's ``name`` phase, if any."""
+    timings = _current.get()
+    if timings is None:
+        yield
+        return
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        timings.add(name, time.perf_counter() - started)
+
+# ------------- SQL hooks -------------
+_QUERY_STARTED = "metrics_query_started"
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany) -> None:
+    if _current.get() is not None:
+        conn.info.setdefault(_QUERY_STARTED, []).append(time.perf_counter())
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany) -> None:
+    timings = _current.get()
+    started = conn.info.get(_QUERY_STARTED)
+    if timings is None or not started:
+        return
+    timings.queries += 1
+    timings.sql_seconds += time.perf_counter() - started.pop()
+
+def _handle_error(context) -> None:
+    # after_cursor_execute never runs for a failed statement; without this
+    # its start time would stay on the pooled connection
+    conn = context.connection
+    if conn is None or not conn.info.get(_QUERY_STARTED):
+        return
+    started = conn.info[_QUERY_STARTED].pop()
+    timings = _current.get()
+    if timings is not None:
+        timings.queries += 1
+        timings.sql_seconds += time.perf_counter() - started
+
+def instrument_engine(engine: Engine) -> None:
+    """Pass ``async_engine.sync_engine`` for an async engine."""
+    if not event.contains(engine, "before_cursor_execute", _before_cursor_execute):
+        event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+        event.listen(engine, "after_cursor_execute", _after_cursor_execute)
+        event.listen(engine, "handle_error", _handle_error)
+
+# ------------- histograms -------------
+class Histogram:
+    """A labelled Prometheus histogram; buckets are cumulative only when rendered."""
+
+    def __init__(self, name: str, help_text: str, label_names: Sequence[str], buckets: Sequence[float]):
+        self.name = name
+        self.help_text = help_text
+        self.label_names = tuple(label_names)
+        self.buckets = tuple(buckets)
+        # labels -> [count per bucket (+Inf last), sum]
+        self._series: Dict[Tuple[str, ...], Tuple[List[int], List[float]]] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, labels: Tuple[str, ...], value: float) -> None:
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                series = self._series[labels] = ([0] * (len(self.buckets) + 1), [0.0])
+            series[0][index] += 1
+            series[1][0] += value
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            series = [(labels, list(counts), total[0]) for labels, (counts, total) in self._series.items()]
+        for labels, counts, total in sorted(series):
+            label_text = ",".join(f'{k}="{_escape(v)}"' for k, v in zip(self.label_names, labels))
+            prefix = label_text + "," if label_text else ""
+            cumulative = 0
+            for bound, count in zip(self.buckets, counts):
+                cumulative += count
+                lines.append(f'{self.name}_bucket{{{prefix}le="{bound:g}"}} {cumulative}')
+            cumulative += counts[-1]
+            lines.append(f'{self.name}_bucket{{{prefix}le="+Inf"}} {cumulative}')
+            lines.append(f"{self.name}_sum{{{label_text}}} {total}")
+            lines.append(f"{self.name}_count{{{label_text}}} {cumulative}")
+        return lines
+
+    def clear(self) -> None:
+        with self._lock:
+            self._series.clear()
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+_LABELS = ("method", "route")
+request_seconds = Histogram(
+    "http_request_duration_seconds", "Time from request to response start.", _LABELS, LATENCY_BUCKETS,
+)
+request_sql_seconds = Histogram(
+    "http_request_sql_duration_seconds", "Time spent in SQL per request.", _LABELS, LATENCY_BUCKETS,
+)
+request_queries = Histogram(
+    "http_request_sql_queries", "SQL statements executed per request.", _LABELS, QUERY_COUNT_BUCKETS,
+)
+request_phase_seconds = Histogram(
+    "http_request_phase_duration_seconds", "Time in named sections (auth, streaks) per request.",
+    _LABELS + ("phase",), LATENCY_BUCKETS,
+)
+HISTOGRAMS = (request_seconds, request_sql_seconds, request_queries, request_phase_seconds)
+
+def record_request(method: str, route: str, timings: RequestTimings, total_seconds: float) -> None:
+    labels = (method, route)
+    request_seconds.observe(labels, total_seconds)
+    request_sql_seconds.observe(labels, timings.sql_seconds)
+    request_queries.observe(labels, timings.queries)
+    for name, seconds in timings.phases.items():
+        request_phase_seconds.observe(labels + (name,), seconds)
+
+def render_metrics(gauges: Dict[str, Dict[str, int]]) -> str:
+    """Prometheus text format; ``gauges`` are extra stats such as cache hit counts."""
+    lines: List[str] = []
+    for histogram in HISTOGRAMS:
+        lines += histogram.render()
+    for name, values in gauges.items():
+        lines.append(f"# TYPE {name} gauge")
+        for key, value in values.items():
+            lines.append(f'{name}{{stat="{_escape(key)}"}} {value}')
+    return "\n".join(lines) + "\n"
+
+# ------------- middleware -------------
+class MetricsMiddleware:
+    """
+    Plain ASGI rather than BaseHTTPMiddleware: no extra task per request, and
+    the header can be added when the response starts.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        timings = RequestTimings()
+        token = _current.set(timings)
+        total = None
+
+        async def send_with_timing(message):
+            nonlocal total
+            if message["type"] == "http.response.start":
+                total = time.perf_counter() - timings.started
+                headers = list(message.get("headers", []))
+                headers.append((b"server-timing", timings.server_timing(total).encode("latin-1")))
+                message = {**message, "headers": headers}
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            _current.reset(token)
+            # the router puts the matched route in the scope; the template
+            # keeps label cardinality bounded, unlike the raw path
+            route = scope.get("route")
+            route_path = getattr(route, "path", None) or "<unmatched>"
+            if total is None:
+                total = time.perf_counter() - timings.started
+            record_request(scope["method"], route_path, timings, total)
@@ -0,0 +1,59 @@
+"""
+Opaque keyset (seek) cursors. A cursor is the sort key of the last row on
+the previous page; the next page starts strictly after it, so every page
+costs one index range scan however deep the client has paged.
+"""
+import base64
+import json
+from datetime import date, datetime
+from typing import Any, Callable, List, Optional, Sequence, Tuple, TypeVar
+
+from sqlalchemy import and_, or_
+from sqlalchemy.sql.elements import ColumnElement
+
+DEFAULT_PAGE_SIZE = 100
+MAX_PAGE_SIZE = 500
+
+T = TypeVar("T")
+
+def _dump(value: Any) -> Any:
+    if isinstance(value, (date, datetime)):
+        return value.isoformat()
+    return value
+
+def encode_cursor(values: Sequence[Any]) -> str:
+    raw = json.dumps([_dump(v) for v in values], separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).rstrip(b"=").decode()
+
+def decode_cursor(cursor: str, parsers: Sequence[Callable[[Any], Any]]) -> Tuple[Any, ...]:
+    """Raises ValueError for anything that is not a cursor we issued."""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded.encode()))
+    except (ValueError, TypeError):
+        raise ValueError("Invalid cursor")
+    if not isinstance(values, list) or len(values) != len(parsers):
+        raise ValueError("Invalid cursor")
+    try:
+        return tuple(parse(v) for parse, v in zip(parsers, values))
+    except (ValueError, TypeError):
+        raise ValueError("Invalid cursor")
+
+def keyset_after(columns: Sequence[ColumnElement], values: Sequence[Any]) -> ColumnElement:
+    """(c1, c2, ...) > (v1, v2, ...) spelled out so any backend can use the index."""
+    clauses = []
+    for i, (column, value) in enumerate(zip(columns, values)):
+        equal_prefix = [c == v for c, v in zip(columns[:i], values[:i])]
+        clauses.append(and_(*equal_prefix, column > value))
+    return or_(*clauses)
+
+def build_page(
+    rows: List[T],
+    page_size: int,
+    key: Callable[[T], Sequence[Any]],
+) -> Tuple[List[T], Optional[str]]:
+    """Callers fetch page_size + 1 rows; the extra one only signals a next page."""
+    if len(rows) <= page_size:
+        return rows, None
+    items = rows[:page_size]
+    return items, encode_cursor(key(items[-1]))
@@ -0,0 +1,209 @@
+"""
+Precomputes every user's GET /dashboard/today payload when their timezone's
+day rolls over, so the first request of the day is served from
+``dashboard_snapshots`` instead of recomputing streaks. Users are grouped by
+timezone; at each group's local midnight its users are split into chunks
+and built in a process pool, each worker with its own database connections.
+
+Every worker process starts a scheduler, but only the one holding the
+"dashboard_precompute" lease (app/services/leases.py) builds anything; the
+snapshots are in the database, so all workers serve them. A snapshot is
+checked against data_version, so a precompute racing a write is simply a
+miss.
+"""
+import asyncio
+import logging
+import os
+import socket
+import uuid
+from concurrent.futures import ProcessPoolExecutor
+from datetime import date, datetime, time, timedelta, timezone
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from app import config, models
+from app.services.dashboard import build_today_payload, user_zone
+from app.services.dashboard_store import save_snapshots
+from app.services.leases import hold_lease, release_lease
+
+logger = logging.getLogger(__name__)
+
+CHUNK_SIZE = 500
+# timezones are re-read at least this often, to pick up new users
+RESCAN_SECONDS = 15 * 60
+LEASE_NAME = "dashboard_precompute"
+# renewed at least every RESCAN_SECONDS, so only a dead holder lets it lapse
+LEASE_SECONDS = 2 * RESCAN_SECONDS
+
+# (user_id, date, data_version, payload)
+Precomputed = Tuple[int, date, int, dict]
+
+def users_by_timezone(db: Session) -> Dict[str, List[int]]:
+    groups: Dict[str, List[int]] = {}
+    for user_id, tz in db.execute(select(models.User.id, models.User.timezone)):
+        groups.setdefault(user_zone(tz).key, []).append(user_id)
+    return groups
+
+def next_rollover(zones: Iterable[str], now: datetime) -> Tuple[datetime, List[str]]:
+    """The next local midnight (in UTC) among ``zones`` and every zone reaching it then."""
+    midnights: Dict[datetime, List[str]] = {}
+    for key in zones:
+        tz = user_zone(key)
+        tomorrow = now.astimezone(tz).date() + timedelta(days=1)
+        at = datetime.combine(tomorrow, time(), tzinfo=tz).astimezone(timezone.utc)
+        midnights.setdefault(at, []).append(key)
+    when = min(midnights)
+    return when, midnights[when]
+
+def overdue_zones(done: Dict[str, date], now: datetime) -> Dict[str, date]:
+    """Zones whose local date has moved past the day last precomputed for them, with that new date."""
+    overdue = {}
+    for key, day in done.items():
+        today = now.astimezone(user_zone(key)).date()
+        if today > day:
+            overdue[key] = today
+    return overdue
+
+def precompute_dashboards(db: Session, user_ids: List[int], today: date) -> List[Precomputed]:
+    """Builds and saves each user's snapshot for ``today``."""
+    results: List[Precomputed] = []
+    for user in db.scalars(select(models.User).where(models.User.id.in_(user_ids))):
+        # version first, as the endpoint does
+        version = user.data_version
+        results.append((user.id, today, version, build_today_payload(db, user, today)))
+        db.commit()
+    save_snapshots(db, results)
+    db.commit()
+    return results
+
+def _init_worker() -> None:
+    # connections inherited over fork belong to the parent
+    from app.db import engine
+    from app.shards import get_shard_router
+
+    engine.dispose(close=False)
+    for shard_engine in get_shard_router().engines:
+        shard_engine.dispose(close=False)
+
+def _precompute_chunk(shard: int, user_ids: List[int], today: date) -> int:
+    from app.shards import data_sessionmakers
+
+    with data_sessionmakers()[shard]() as db:
+        # the payloads stay in the database rather than crossing back to the parent
+        return len(precompute_dashboards(db, user_ids, today))
+
+class RolloverScheduler:
+    def __init__(self, workers: int):
+        self.workers = workers
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._task: Optional[asyncio.Task] = None
+        # zone -> the local date its dashboards were last precomputed for
+        self._done: Dict[str, date] = {}
+        self.holder = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(max_workers=self.workers, initializer=_init_worker)
+        return self._executor
+
+    async def precompute(self, user_ids: List[int], today: date, shard: int = 0) -> int:
+        """``shard`` indexes app.shards.data_sessionmakers(); 0 when unsharded."""
+        chunks = [user_ids[i:i + CHUNK_SIZE] for i in range(0, len(user_ids), CHUNK_SIZE)]
+        if self.workers <= 0:
+            jobs = [run_in_threadpool(_precompute_chunk, shard, chunk, today) for chunk in chunks]
+        else:
+            loop = asyncio.get_running_loop()
+            jobs = [
+                loop.run_in_executor(self._get_executor(), _precompute_chunk, shard, chunk, today)
+                for chunk in chunks
+            ]
+        return sum(await asyncio.gather(*jobs))
+
+    def _lead(self) -> bool:
+        """Takes or renews the lease, so that one worker precomputes for all of them."""
+        from app.db import SessionLocal
+
+        with SessionLocal() as db:
+            return hold_lease(db, LEASE_NAME, self.holder, LEASE_SECONDS)
+
+    def _step_down(self) -> None:
+        from app.db import SessionLocal
+
+        with SessionLocal() as db:
+            release_lease(db, LEASE_NAME, self.holder)
+
+    async def run(self) -> None:
+        from app.shards import data_sessionmakers
+
+        def load_groups() -> List[Dict[str, List[int]]]:
+            # one {timezone: user ids} per database holding user data
+            groups = []
+            for make_session in data_sessionmakers():
+                with make_session() as db:
+                    groups.append(users_by_timezone(db))
+            return groups
+
+        while True:
+            try:
+                if not await run_in_threadpool(self._lead):
+                    # whichever worker leads next starts from its next midnights
+                    self._done.clear()
+                    await asyncio.sleep(RESCAN_SECONDS)
+                    continue
+                groups = await run_in_threadpool(load_groups)
+                all_zones = {key for shard_groups in groups for key in shard_groups}
+                if not all_zones:
+                    await asyncio.sleep(RESCAN_SECONDS)
+                    continue
+                now = datetime.now(timezone.utc)
+                for key in all_zones:
+                    # a zone first seen mid-day waits for its next midnight
+                    self._done.setdefault(key, now.astimezone(user_zone(key)).date())
+                # midnights that passed while earlier groups were being built
+                # are caught up before sleeping again
+                overdue = overdue_zones(self._done, now)
+                if overdue:
+                    for key, today in overdue.items():
+                        if not await run_in_threadpool(self._lead):
+                            break
+                        count = 0
+                        for shard, shard_groups in enumerate(groups):
+                            if key in shard_groups:
+                                count += await self.precompute(shard_groups[key], today, shard)
+                        self._done[key] = today
+                        logger.info("precomputed %d dashboards for %s on %s", count, key, today)
+                    continue
+                when, _ = next_rollover(all_zones, now)
+                await asyncio.sleep(min((when - now).total_seconds(), RESCAN_SECONDS))
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                # a failed night only costs live computation; keep the loop alive
+                logger.exception("dashboard precompute failed")
+                await asyncio.sleep(60)
+
+    def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.get_running_loop().create_task(self.run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+            # lets another worker take over without waiting for the lease to run out
+            try:
+                await run_in_threadpool(self._step_down)
+            except Exception:
+                logger.exception("could not release the dashboard precompute lease")
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+rollover_scheduler = RolloverScheduler(config.DASHBOARD_PRECOMPUTE_WORKERS)
@@ -0,0 +1,139 @@
+"""
+Weekly and monthly per-habit rollups (habit_rollups), kept up to date on
+log writes so analytics never have to scan habit_logs.
+
+A period is met when it has at least ``target`` logs. For DAILY habits that
+is every day of the period; X_PER_WEEK and WEEKLY goals are pro-rated, so a
+3-per-week habit needs 3 logs in a week and ceil(3 * 31 / 7) = 14 in a
+31-day month.
+
+Rebuild everything (or some habits) with
+``python -m app.services.rollups [habit_id ...]``.
+"""
+import calendar
+import math
+from collections import defaultdict
+from datetime import date, timedelta
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+from sqlalchemy import delete, select
+from sqlalchemy.orm import Session
+
+from app import models
+from app.db import dialect_insert
+from app.services.streaks import _week_start
+
+PERIODS = ("week", "month")
+REBUILD_BATCH_SIZE = 500
+
+# (date, value) of one log
+LogEntry = Tuple[date, Optional[int]]
+
+def period_start(period: str, d: date) -> date:
+    if period == "week":
+        return _week_start(d)
+    return d.replace(day=1)
+
+def period_days(period: str, start: date) -> int:
+    if period == "week":
+        return 7
+    return calendar.monthrange(start.year, start.month)[1]
+
+def period_end(period: str, start: date) -> date:
+    return start + timedelta(days=period_days(period, start) - 1)
+
+def period_target(habit: models.Habit, period: str, start: date) -> int:
+    days = period_days(period, start)
+    goal_type = getattr(habit.goal_type, "value", habit.goal_type)
+    if goal_type == "DAILY":
+        return days
+    return math.ceil((habit.target_per_period or 1) * days / 7)
+
+def _rows(habit: models.Habit, logs: Iterable[LogEntry], sign: int = 1) -> List[dict]:
+    totals: Dict[Tuple[str, date], List[int]] = defaultdict(lambda: [0, 0])
+    for d, value in logs:
+        for period in PERIODS:
+            total = totals[(period, period_start(period, d))]
+            total[0] += sign
+            total[1] += sign * (value or 0)
+    return [
+        {
+            "habit_id": habit.id, "user_id": habit.user_id, "period": period, "period_start": start,
+            "log_count": count, "value_sum": value_sum,
+            "target": period_target(habit, period, start),
+        }
+        for (period, start), (count, value_sum) in totals.items()
+    ]
+
+def _upsert(db: Session, rows: List[dict]) -> None:
+    """Adds the counts in ``rows`` to existing rollups, creating missing ones."""
+    if not rows:
+        return
+    rollup = models.HabitRollup
+    for row in rows:
+        row["met"] = row["log_count"] >= row["target"]
+    stmt = dialect_insert(db)(rollup)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=["habit_id", "period", "period_start"],
+        set_={
+            "log_count": rollup.log_count + stmt.excluded.log_count,
+            "value_sum": rollup.value_sum + stmt.excluded.value_sum,
+            "target": stmt.excluded.target,
+            "met": rollup.log_count + stmt.excluded.log_count >= stmt.excluded.target,
+        },
+    )
+    db.execute(stmt, rows)
+
+def add_logs(db: Session, habit: models.Habit, logs: Iterable[LogEntry]) -> None:
+    _upsert(db, _rows(habit, logs))
+
+def remove_logs(db: Session, habit: models.Habit, logs: Iterable[LogEntry]) -> None:
+    _upsert(db, _rows(habit, logs, sign=-1))
+    # a rebuild has no rows for periods without logs, so neither do we
+    db.execute(
+        delete(models.HabitRollup)
+        .where(models.HabitRollup.habit_id == habit.id, models.HabitRollup.log_count <= 0)
+        .execution_options(synchronize_session=False)
+    )
+
+def rebuild_rollups(db: Session, habits: Sequence[models.Habit]) -> None:
+    """Recomputes the rollups of ``habits`` from their logs; does not commit."""
+    if not habits:
+        return
+    by_id = {h.id: h for h in habits}
+    db.execute(delete(models.HabitRollup).where(models.HabitRollup.habit_id.in_(by_id)))
+    logs: Dict[int, List[LogEntry]] = defaultdict(list)
+    for habit_id, d, value in db.execute(
+        select(models.HabitLog.habit_id, models.HabitLog.date, models.HabitLog.value)
+        .where(models.HabitLog.habit_id.in_(by_id))
+    ):
+        logs[habit_id].append((d, value))
+    rows = [row for habit_id, entries in logs.items() for row in _rows(by_id[habit_id], entries)]
+    _upsert(db, rows)
+
+def rebuild_all_rollups(db: Session, habit_ids: Optional[Sequence[int]] = None) -> int:
+    """Rebuilds in batches, committing after each; returns the number of habits."""
+    q = select(models.Habit).order_by(models.Habit.id)
+    if habit_ids:
+        q = q.where(models.Habit.id.in_(habit_ids))
+    done = 0
+    last_id = 0
+    while True:
+        batch = db.scalars(q.where(models.Habit.id > last_id).limit(REBUILD_BATCH_SIZE)).all()
+        if not batch:
+            return done
+        rebuild_rollups(db, batch)
+        db.commit()
+        done += len(batch)
+        last_id = batch[-1].id
+
+if __name__ == "__main__":
+    import sys
+
+    from app.shards import data_sessionmakers
+
+    count = 0
+    for make_session in data_sessionmakers():
+        with make_session() as session:
+            count += rebuild_all_rollups(session, [int(arg) for arg in sys.argv[1:]])
+    print(f"Rebuilt rollups for {count} habits.")
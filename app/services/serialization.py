@@ -0,0 +1,74 @@
+"""
+Fast response path (config.FAST_SERIALIZATION): ORM rows are mapped straight
+to dicts with the same keys and values as the Read schemas and written with
+orjson. Nothing is validated on the way out, so these mappings must be kept
+in step with HabitRead/HabitLogRead/TodayHabitItem/RangeHabitItem.
+"""
+from typing import Any, Dict, List, Optional
+
+from fastapi import Response
+from fastapi.responses import JSONResponse
+
+from app import models
+
+class FastJSONResponse(JSONResponse):
+    def render(self, content: Any) -> bytes:
+        # imported here so orjson is only needed when the fast path is on
+        import orjson
+
+        # OPT_UTC_Z writes aware UTC datetimes with "Z", as pydantic does
+        return orjson.dumps(content, option=orjson.OPT_UTC_Z)
+
+def _enum_value(value):
+    return getattr(value, "value", value)
+
+def habit_to_dict(habit: models.Habit) -> Dict[str, Any]:
+    return {
+        "id": habit.id,
+        "user_id": habit.user_id,
+        "name": habit.name,
+        "description": habit.description,
+        "goal_type": _enum_value(habit.goal_type),
+        "target_per_period": habit.target_per_period,
+        "start_date": habit.start_date,
+        "is_archived": habit.is_archived,
+        "created_at": habit.created_at,
+    }
+
+def log_to_dict(log: models.HabitLog) -> Dict[str, Any]:
+    return {
+        "id": log.id,
+        "habit_id": log.habit_id,
+        "user_id": log.user_id,
+        "date": log.date,
+        "value": log.value,
+        "created_at": log.created_at,
+    }
+
+def today_item_to_dict(habit: models.Habit, is_completed: bool, current: int, best: int) -> Dict[str, Any]:
+    return {
+        "habit": habit_to_dict(habit),
+        "is_completed": is_completed,
+        "current_streak": current,
+        "best_streak": best,
+    }
+
+def range_item_to_dict(habit: models.Habit, days: str, rate: float, current: int, best: int) -> Dict[str, Any]:
+    return {
+        "habit": habit_to_dict(habit),
+        "days": days,
+        "completion_rate": rate,
+        "current_streak": current,
+        "best_streak": best,
+    }
+
+def page_to_dict(items: List[Dict[str, Any]], next_cursor: Optional[str]) -> Dict[str, Any]:
+    return {"items": items, "next_cursor": next_cursor}
+
+def fast_response(response: Response, content: Any) -> FastJSONResponse:
+    """
+    Returning a Response skips response_model, and with it the headers set on
+    the injected ``response`` (ETag etc.), so carry those over.
+    """
+    headers = {k: v for k, v in response.headers.items() if k != "content-length"}
+    return FastJSONResponse(content, status_code=response.status_code or 200, headers=headers)
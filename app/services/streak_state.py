@@ -0,0 +1,155 @@
+from datetime import date, timedelta
+from typing import Iterable, Optional, Tuple
+
+from sqlalchemy.orm import Session
+
+from app import models
+from app.services.streaks import _week_start
+
+TRACKED_GOAL_TYPES = ("DAILY", "X_PER_WEEK")
+
+def _goal_value(goal_type) -> str:
+    return getattr(goal_type, "value", goal_type)
+
+def _period_start(goal_type: str, d: date) -> date:
+    if goal_type == "X_PER_WEEK":
+        return _week_start(d)
+    return d
+
+def _period_length(goal_type: str) -> timedelta:
+    if goal_type == "X_PER_WEEK":
+        return timedelta(days=7)
+    return timedelta(days=1)
+
+def _period_target(state: models.HabitStreakState) -> int:
+    if state.goal_type == "X_PER_WEEK":
+        return state.target_per_period
+    return 1
+
+def _reset(state: models.HabitStreakState, habit: models.Habit) -> None:
+    state.goal_type = _goal_value(habit.goal_type)
+    state.target_per_period = habit.target_per_period or 1
+    state.last_period = None
+    state.period_count = 0
+    state.current_run = 0
+    state.best_run = 0
+    state.last_log_date = None
+
+def is_stale(state: models.HabitStreakState, habit: models.Habit) -> bool:
+    return (
+        state.goal_type != _goal_value(habit.goal_type)
+        or state.target_per_period != (habit.target_per_period or 1)
+    )
+
+def apply_log(state: models.HabitStreakState, log_date: date) -> bool:
+    """
+    Fold a single log into the state. Returns False when the log lands in a
+    period before the last counted one, in which case the state must be rebuilt.
+    """
+    if state.last_log_date is None or log_date > state.last_log_date:
+        state.last_log_date = log_date
+
+    if state.goal_type not in TRACKED_GOAL_TYPES:
+        return True
+
+    period = _period_start(state.goal_type, log_date)
+    target = _period_target(state)
+
+    if state.last_period is not None and period < state.last_period:
+        return False
+
+    if state.last_period is not None and period == state.last_period:
+        state.period_count += 1
+        if state.period_count == target:
+            state.current_run += 1
+    else:
+        # current_run only counts the last period once it met its target, so
+        # the run carries over only if that period was both met and adjacent
+        carried = 0
+        if (
+            state.last_period is not None
+            and period - state.last_period == _period_length(state.goal_type)
+            and state.period_count >= target
+        ):
+            carried = state.current_run
+        state.last_period = period
+        state.period_count = 1
+        state.current_run = carried + (1 if target <= 1 else 0)
+
+    state.best_run = max(state.best_run, state.current_run)
+    return True
+
+def init_streak_state(habit: models.Habit) -> models.HabitStreakState:
+    state = models.HabitStreakState()
+    _reset(state, habit)
+    habit.streak_state = state
+    return state
+
+def rebuild_streak_state(db: Session, habit: models.Habit) -> models.HabitStreakState:
+    state = habit.streak_state
+    if state is None:
+        state = models.HabitStreakState(habit_id=habit.id)
+        habit.streak_state = state
+    _reset(state, habit)
+
+    log_dates: Iterable[date] = (
+        d for (d,) in
+        db.query(models.HabitLog.date)
+        .filter(models.HabitLog.habit_id == habit.id)
+        .order_by(models.HabitLog.date)
+    )
+    for d in log_dates:
+        apply_log(state, d)
+    return state
+
+def record_logs(
+        db: Session,
+        habit: models.Habit,
+        log_dates: Iterable[date],
+) -> models.HabitStreakState:
+    state = habit.streak_state
+    if state is not None and not is_stale(state, habit):
+        for d in sorted(log_dates):
+            if not apply_log(state, d):
+                break
+        else:
+            return state
+    # a back-dated log (or a missing/stale state) rebuilds from the log table,
+    # which must already contain the new rows
+    return rebuild_streak_state(db, habit)
+
+def record_log(db: Session, habit: models.Habit, log_date: date) -> models.HabitStreakState:
+    return record_logs(db, habit, [log_date])
+
+def read_streaks(
+        state: Optional[models.HabitStreakState],
+        today: date,
+) -> Optional[Tuple[bool, int, int]]:
+    """
+    Returns (completed_today, current_streak, best_streak) as of ``today``, or
+    None when the state cannot answer (missing, or logs dated after today).
+    """
+    if state is None:
+        return None
+    if state.last_log_date is not None and state.last_log_date > today:
+        return None
+
+    completed_today = state.last_log_date == today
+
+    if state.goal_type not in TRACKED_GOAL_TYPES or state.last_period is None:
+        return completed_today, 0, 0
+
+    current_period = _period_start(state.goal_type, today)
+    if state.last_period == current_period:
+        current = state.current_run
+    elif (
+        state.goal_type == "X_PER_WEEK"
+        and current_period - state.last_period == _period_length(state.goal_type)
+        and state.period_count >= _period_target(state)
+    ):
+        # this week has no logs yet, so the streak still runs through last week
+        current = state.current_run
+    else:
+        current = 0
+
+    return completed_today, current, state.best_run
@@ -1,5 +1,5 @@
 from datetime import date, timedelta
-from typing import Iterable, Tuple, Dict
+from typing import Iterable, Sequence, Tuple, Dict
 
 def _week_start(d: date) -> date:
     return d - timedelta(days=d.weekday())
@@ -70,4 +70,101 @@ def compute_streaks_for_daily(log_dates: Iterable[date], today: date) -> Tuple[i
         current_streak += 1
         day = day - timedelta(days=1)
     
-    return current_streak, best_streak
\ No newline at end of file
+    return current_streak, best_streak
+
+def compute_streaks_batch(
+        habit_ids: Sequence[int],
+        day_ordinals: Sequence[int],
+        goal_habit_ids: Sequence[int],
+        goal_types: Sequence[str],
+        targets: Sequence[int],
+        today: date,
+):
+    """
+    Streaks for many habits in one vectorised pass.
+
+    ``habit_ids``/``day_ordinals`` are parallel flat arrays with one entry per
+    log (``date.toordinal()``); ``goal_habit_ids``/``goal_types``/``targets``
+    describe each habit. Returns ``(current, best)`` int64 arrays aligned with
+    ``goal_habit_ids``, equal to compute_streaks_for_daily for DAILY and to
+    compute_streaks_for_x_per_week with ``target`` for X_PER_WEEK and WEEKLY.
+    Logs for habits missing from ``goal_habit_ids`` are ignored.
+    """
+    # numpy is only needed by batch/reporting jobs, keep it off the request path
+    import numpy as np
+
+    goal_habit_ids = np.asarray(goal_habit_ids, dtype=np.int64)
+    n_goals = len(goal_habit_ids)
+    current = np.zeros(n_goals, dtype=np.int64)
+    best = np.zeros(n_goals, dtype=np.int64)
+
+    goal_types = np.asarray(goal_types)
+    targets = np.asarray(targets, dtype=np.int64)
+    # 0 = daily periods, 1 = ISO week periods, -1 = no streaks
+    kind = np.full(n_goals, -1, dtype=np.int8)
+    kind[goal_types == "DAILY"] = 0
+    kind[((goal_types == "X_PER_WEEK") | (goal_types == "WEEKLY")) & (targets > 0)] = 1
+    need = np.where(kind == 1, targets, 1)
+
+    habit_ids = np.asarray(habit_ids, dtype=np.int64)
+    ordinals = np.asarray(day_ordinals, dtype=np.int64)
+    if n_goals == 0 or len(habit_ids) == 0:
+        return current, best
+
+    # map every log onto the index of its habit in goal_habit_ids
+    order = np.argsort(goal_habit_ids, kind="stable")
+    sorted_ids = goal_habit_ids[order]
+    pos = np.minimum(np.searchsorted(sorted_ids, habit_ids), n_goals - 1)
+    known = sorted_ids[pos] == habit_ids
+    goal_index = order[pos[known]]
+    ordinals = ordinals[known]
+
+    tracked = kind[goal_index] >= 0
+    goal_index = goal_index[tracked]
+    ordinals = ordinals[tracked]
+    if len(goal_index) == 0:
+        return current, best
+
+    # ordinal 1 (0001-01-01) is a Monday, so (ordinal - 1) // 7 numbers ISO weeks
+    periods = np.where(kind[goal_index] == 1, (ordinals - 1) // 7, ordinals)
+
+    # count logs per (habit, period); keys sort by habit, then period
+    low = periods.min()
+    span = periods.max() - low + 2
+    keys, counts = np.unique(goal_index * span + (periods - low), return_counts=True)
+    key_goal = keys // span
+    key_period = keys % span + low
+
+    met = counts >= need[key_goal]
+    met_goal = key_goal[met]
+    met_period = key_period[met]
+    if len(met_goal) == 0:
+        return current, best
+
+    # runs of consecutive met periods within the same habit
+    run_break = np.ones(len(met_goal), dtype=bool)
+    run_break[1:] = (met_goal[1:] != met_goal[:-1]) | (met_period[1:] != met_period[:-1] + 1)
+    run_first = np.flatnonzero(run_break)
+    run_last = np.append(run_first[1:] - 1, len(met_goal) - 1)
+    run_goal = met_goal[run_first]
+    run_start = met_period[run_first]
+    run_end = met_period[run_last]
+    run_length = run_end - run_start + 1
+
+    habit_first = np.flatnonzero(np.append(True, run_goal[1:] != run_goal[:-1]))
+    best[run_goal[habit_first]] = np.maximum.reduceat(run_length, habit_first)
+
+    # the current streak counts back from today (daily) or from this week,
+    # falling back to last week while this week has not met its target yet
+    today_day = today.toordinal()
+    this_week = (today_day - 1) // 7
+    weekly = kind[run_goal] == 1
+    anchor = np.where(weekly, this_week, today_day)
+    run_current = np.where((run_start <= anchor) & (anchor <= run_end), anchor - run_start + 1, 0)
+    last_week = weekly & (run_current == 0) & (run_start <= this_week - 1) & (this_week - 1 <= run_end)
+    run_current = np.where(last_week, this_week - run_start, run_current)
+
+    # at most one run per habit can hold the anchor
+    has_current = run_current > 0
+    current[run_goal[has_current]] = run_current[has_current]
+    return current, best
@@ -0,0 +1,102 @@
+from datetime import date
+from typing import Dict, Iterable, Tuple
+
+from sqlalchemy import Date, bindparam, text
+from sqlalchemy.orm import Session
+
+# proleptic Gregorian ordinal of habit_logs.date, matching date.toordinal();
+# ordinal 1 (0001-01-01) is a Monday, so (ordinal - 1) / 7 numbers ISO weeks
+_ORDINAL_SQL = {
+    "sqlite": "CAST(julianday(l.date) - 1721424.5 AS INTEGER)",
+    "postgresql": "(l.date - DATE '0001-01-01' + 1)",
+}
+
+_STREAKS_SQL = """
+WITH goals AS (
+    SELECT id AS habit_id,
+           goal_type,
+           CASE WHEN goal_type = 'X_PER_WEEK' THEN target_per_period ELSE 1 END AS target
+    FROM habits
+    WHERE id IN :habit_ids
+),
+periods AS (
+    SELECT l.habit_id,
+           g.goal_type,
+           CASE WHEN g.goal_type = 'X_PER_WEEK' THEN ({ordinal} - 1) / 7 ELSE {ordinal} END AS period,
+           COUNT(*) AS logs,
+           MAX(g.target) AS target
+    FROM habit_logs l
+    JOIN goals g ON g.habit_id = l.habit_id
+    WHERE l.date <= :today
+      AND g.goal_type IN ('DAILY', 'X_PER_WEEK')
+    GROUP BY l.habit_id, g.goal_type,
+             CASE WHEN g.goal_type = 'X_PER_WEEK' THEN ({ordinal} - 1) / 7 ELSE {ordinal} END
+),
+met AS (
+    SELECT habit_id,
+           goal_type,
+           period,
+           period - ROW_NUMBER() OVER (PARTITION BY habit_id ORDER BY period) AS island
+    FROM periods
+    WHERE logs >= target
+),
+islands AS (
+    SELECT habit_id, goal_type, COUNT(*) AS length, MAX(period) AS last_period
+    FROM met
+    GROUP BY habit_id, goal_type, island
+),
+streaks AS (
+    SELECT habit_id,
+           MAX(CASE
+                   WHEN goal_type = 'DAILY' AND last_period = :today_day THEN length
+                   WHEN goal_type = 'X_PER_WEEK' AND last_period IN (:today_week, :today_week - 1) THEN length
+                   ELSE 0
+               END) AS current_streak,
+           MAX(length) AS best_streak
+    FROM islands
+    GROUP BY habit_id
+)
+SELECT g.habit_id,
+       CASE WHEN EXISTS (
+           SELECT 1 FROM habit_logs t WHERE t.habit_id = g.habit_id AND t.date = :today
+       ) THEN 1 ELSE 0 END AS completed_today,
+       COALESCE(s.current_streak, 0) AS current_streak,
+       COALESCE(s.best_streak, 0) AS best_streak
+FROM goals g
+LEFT JOIN streaks s ON s.habit_id = g.habit_id
+"""
+
+def compute_streaks_sql(
+        db: Session,
+        habit_ids: Iterable[int],
+        today: date,
+) -> Dict[int, Tuple[bool, int, int]]:
+    """
+    Same results as compute_streaks_for_daily / compute_streaks_for_x_per_week
+    over logs dated up to ``today``, computed with one gaps-and-islands query
+    that returns a single (completed_today, current, best) row per habit.
+    """
+    habit_ids = list(habit_ids)
+    if not habit_ids:
+        return {}
+
+    dialect = db.get_bind().dialect.name
+    ordinal = _ORDINAL_SQL.get(dialect)
+    if ordinal is None:
+        raise NotImplementedError(f"SQL streaks are not supported on {dialect}")
+
+    stmt = text(_STREAKS_SQL.format(ordinal=ordinal)).bindparams(
+        bindparam("habit_ids", expanding=True),
+        bindparam("today", type_=Date),
+    )
+    today_day = today.toordinal()
+    rows = db.execute(stmt, {
+        "habit_ids": habit_ids,
+        "today": today,
+        "today_day": today_day,
+        "today_week": (today_day - 1) // 7,
+    })
+    return {
+        habit_id: (bool(completed), current, best)
+        for habit_id, completed, current, best in rows
+    }
@@ -0,0 +1,151 @@
+"""
+Cache of authenticated user rows keyed by the token subject (the user id).
+
+The default backend lives in-process. Anything implementing UserCacheBackend
+can be installed with set_user_cache(), e.g. SharedUserCache over a Redis
+client when several workers must see the same invalidations.
+"""
+import json
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime
+from typing import Any, Dict, Optional, Protocol, Set
+
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+from app import config, models
+
+CACHED_USER_FIELDS = ("id", "email", "username", "timezone", "created_at")
+
+class UserCacheBackend(Protocol):
+    def get(self, user_id: int) -> Optional[Dict[str, Any]]: ...
+    def set(self, user_id: int, data: Dict[str, Any]) -> None: ...
+    def delete(self, user_id: int) -> None: ...
+    def clear(self) -> None: ...
+    def stats(self) -> Dict[str, int]: ...
+
+class InProcessUserCache:
+    """Bounded LRU with a per-entry TTL."""
+
+    def __init__(self, maxsize: int, ttl_seconds: float):
+        self.maxsize = maxsize
+        self.ttl_seconds = ttl_seconds
+        self.hits = 0
+        self.misses = 0
+        self._entries: "OrderedDict[int, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, user_id: int) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            entry = self._entries.get(user_id)
+            if entry is None or entry[0] < time.monotonic():
+                if entry is not None:
+                    del self._entries[user_id]
+                self.misses += 1
+                return None
+            self._entries.move_to_end(user_id)
+            self.hits += 1
+            return entry[1]
+
+    def set(self, user_id: int, data: Dict[str, Any]) -> None:
+        if self.maxsize <= 0:
+            return
+        with self._lock:
+            self._entries[user_id] = (time.monotonic() + self.ttl_seconds, data)
+            self._entries.move_to_end(user_id)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def delete(self, user_id: int) -> None:
+        with self._lock:
+            self._entries.pop(user_id, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict[str, int]:
+        return {"hits": self.hits, "misses": self.misses, "size": len(self._entries), "maxsize": self.maxsize}
+
+class SharedUserCache:
+    """
+    Backend over a Redis-style client exposing get(key), set(key, value, ex=)
+    and delete(key). Rows are stored as JSON so every worker can read them.
+    """
+
+    def __init__(self, client, ttl_seconds: float, prefix: str = "habit-tracker:user:"):
+        self.client = client
+        self.ttl_seconds = ttl_seconds
+        self.prefix = prefix
+        self.hits = 0
+        self.misses = 0
+
+    def _key(self, user_id: int) -> str:
+        return f"{self.prefix}{user_id}"
+
+    def get(self, user_id: int) -> Optional[Dict[str, Any]]:
+        raw = self.client.get(self._key(user_id))
+        if raw is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        data = json.loads(raw)
+        data["created_at"] = datetime.fromisoformat(data["created_at"]) if data["created_at"] else None
+        return data
+
+    def set(self, user_id: int, data: Dict[str, Any]) -> None:
+        created_at = data["created_at"]
+        payload = {**data, "created_at": created_at.isoformat() if created_at else None}
+        self.client.set(self._key(user_id), json.dumps(payload), ex=max(1, int(self.ttl_seconds)))
+
+    def delete(self, user_id: int) -> None:
+        self.client.delete(self._key(user_id))
+
+    def clear(self) -> None:
+        # entries expire on their own; a shared keyspace is not ours to flush
+        pass
+
+    def stats(self) -> Dict[str, int]:
+        return {"hits": self.hits, "misses": self.misses}
+
+_backend: UserCacheBackend = InProcessUserCache(config.USER_CACHE_SIZE, config.USER_CACHE_TTL_SECONDS)
+
+def get_user_cache() -> UserCacheBackend:
+    return _backend
+
+def set_user_cache(backend: UserCacheBackend) -> None:
+    global _backend
+    _backend = backend
+
+def user_to_cache(user: models.User) -> Dict[str, Any]:
+    return {field: getattr(user, field) for field in CACHED_USER_FIELDS}
+
+def user_from_cache(data: Dict[str, Any]) -> models.User:
+    # a transient, session-less row: fine for reading id/timezone or returning
+    # it as UserRead, never to be added to a session
+    return models.User(**data)
+
+# ------------- invalidation -------------
+_PENDING_KEY = "user_cache_invalidate"
+
+@event.listens_for(models.User, "after_update")
+@event.listens_for(models.User, "after_delete")
+def _invalidate_on_write(mapper, connection, target: models.User) -> None:
+    get_user_cache().delete(target.id)
+    session = Session.object_session(target)
+    if session is not None:
+        session.info.setdefault(_PENDING_KEY, set()).add(target.id)
+
+@event.listens_for(Session, "after_commit")
+def _invalidate_after_commit(session: Session) -> None:
+    # evict again once the change is visible, in case a concurrent request
+    # re-cached the old row between the flush and the commit
+    pending: Set[int] = session.info.pop(_PENDING_KEY, set())
+    for user_id in pending:
+        get_user_cache().delete(user_id)
+
+@event.listens_for(Session, "after_rollback")
+def _forget_pending(session: Session) -> None:
+    session.info.pop(_PENDING_KEY, None)
@@ -0,0 +1,386 @@
+"""
+User-sharded storage across several databases (config.SHARD_DATABASE_URLS).
+
+No request ever reads another user's rows, so each user, with their habits,
+logs and derived tables, lives in exactly one shard and SQLite shards stop
+sharing a single writer lock. DATABASE_URL becomes the directory: it keeps
+the users table used by register/login and ``user_shards``, the user -> shard
+map. Each shard keeps a copy of its users' rows (without the password hash)
+for foreign keys, ``data_version`` and GET /auth/me.
+
+With no shard URLs configured the router is disabled and everything stays in
+DATABASE_URL.
+
+Habit and log ids are handed out from the directory (``id_blocks``), so they
+are unique across shards and a user keeps theirs when moved; clients have
+them in URLs and offline bulk syncs.
+
+Moving data between databases:
+
+    python -m app.shards status
+    python -m app.shards migrate           # place users still kept in the directory
+    python -m app.shards move USER_ID SHARD
+    python -m app.shards rebalance         # even out the user counts
+
+Workers cache the mapping for SHARD_MAP_TTL seconds, so run ``move`` and
+``rebalance`` with the API stopped (or its writes paused).
+"""
+import threading
+import time
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from sqlalchemy import Table, delete, event, func, insert, select, text, update
+from sqlalchemy.engine import Engine
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, async_sessionmaker
+from sqlalchemy.orm import Session, sessionmaker
+from sqlalchemy.sql.dml import Insert
+
+from app import config, models
+from app.db import SessionLocal, create_engines, dialect_insert, engine, to_async_url
+from app.services.metrics import instrument_engine
+
+# parents first; deletes walk it backwards
+USER_TABLES: Tuple[Table, ...] = (
+    models.User.__table__,
+    models.Habit.__table__,
+    models.HabitLog.__table__,
+    models.HabitStreakState.__table__,
+    models.HabitCompletionBitmap.__table__,
+    models.HabitRollup.__table__,
+    models.DashboardSnapshot.__table__,
+)
+
+# tables whose ids clients see, so they must not change when a user moves
+ID_TABLES: Tuple[Table, ...] = (models.Habit.__table__, models.HabitLog.__table__)
+
+class ShardIdAllocator:
+    """
+    Hands out habit and log ids unique across every shard. Each process
+    reserves ``block_size`` ids at a time from the directory's ``id_blocks``
+    and gives them to INSERTs on the shard engines, so a shard never numbers
+    rows itself (a moved-in row would otherwise push its own sequence, or
+    SQLite's max(id) + 1, into ids another shard is still using).
+    """
+
+    def __init__(self, directory: Engine, shards: Sequence[Engine], block_size: int):
+        self.directory = directory
+        # the router's own list, filled in as its engines are created
+        self.shards = shards
+        self.block_size = block_size
+        # table name -> (next id, end of the reserved block)
+        self._blocks: Dict[str, Tuple[int, int]] = {}
+        self._lock = threading.Lock()
+
+    def take(self, table: str, count: int) -> List[int]:
+        ids: List[int] = []
+        with self._lock:
+            while len(ids) < count:
+                next_id, end = self._blocks.get(table, (0, 0))
+                if next_id >= end:
+                    next_id, end = self._reserve(table, max(self.block_size, count - len(ids)))
+                taken = min(count - len(ids), end - next_id)
+                ids.extend(range(next_id, next_id + taken))
+                self._blocks[table] = (next_id + taken, end)
+        return ids
+
+    def _reserve(self, table: str, size: int) -> Tuple[int, int]:
+        bump = (
+            update(models.IdBlock)
+            .where(models.IdBlock.name == table)
+            .values(next_id=models.IdBlock.next_id + size)
+            .returning(models.IdBlock.next_id)
+        )
+        with Session(bind=self.directory) as db:
+            end = db.scalar(bump)
+            if end is None:
+                # first use: start above every id already in any database
+                db.execute(
+                    dialect_insert(db)(models.IdBlock)
+                    .values(name=table, next_id=self._highest_id(table) + 1)
+                    .on_conflict_do_nothing(index_elements=["name"])
+                )
+                end = db.scalar(bump)
+            db.commit()
+        return end - size, end
+
+    def _highest_id(self, table: str) -> int:
+        query = text(f"SELECT MAX(id) FROM {table}")
+        highest = 0
+        for target in [self.directory, *self.shards]:
+            with target.connect() as conn:
+                highest = max(highest, conn.scalar(query) or 0)
+        return highest
+
+    def assign_ids(self, conn, statement, multiparams, params, execution_options) -> Tuple[Any, Any, Any]:
+        """before_execute hook: fills in ``id`` on INSERTs into ID_TABLES that leave it out."""
+        if not isinstance(statement, Insert) or statement.table not in ID_TABLES:
+            return statement, multiparams, params
+        # a parameter would override an id given with .values()
+        if any(getattr(key, "key", key) == "id" for key in statement._values or ()):
+            return statement, multiparams, params
+        table = statement.table.name
+        if multiparams:
+            ids = iter(self.take(table, sum("id" not in row for row in multiparams)))
+            multiparams = [row if "id" in row else {**row, "id": next(ids)} for row in multiparams]
+        elif "id" not in params:
+            params = {**params, "id": self.take(table, 1)[0]}
+        return statement, multiparams, params
+
+class ShardRouter:
+    def __init__(
+            self,
+            urls: Sequence[str],
+            map_ttl: float = 60,
+            directory: Engine = engine,
+            id_block_size: int = 1000,
+    ):
+        self.urls = list(urls)
+        self.map_ttl = map_ttl
+        self.engines: List[Engine] = []
+        self.async_engines: List[AsyncEngine] = []
+        self.sessionmakers: List[sessionmaker] = []
+        self.async_sessionmakers: List[async_sessionmaker] = []
+        self.ids = ShardIdAllocator(directory, self.engines, id_block_size)
+        for url in self.urls:
+            sync_engine, async_engine = create_engines(url, to_async_url(url))
+            instrument_engine(sync_engine)
+            instrument_engine(async_engine.sync_engine)
+            for target in (sync_engine, async_engine.sync_engine):
+                event.listen(target, "before_execute", self.ids.assign_ids, retval=True)
+            self.engines.append(sync_engine)
+            self.async_engines.append(async_engine)
+            self.sessionmakers.append(sessionmaker(autocommit=False, autoflush=False, bind=sync_engine))
+            self.async_sessionmakers.append(async_sessionmaker(
+                async_engine, class_=AsyncSession, autoflush=False, expire_on_commit=False,
+            ))
+        self._cache: Dict[int, Tuple[float, int]] = {}
+        self._lock = threading.Lock()
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self.urls)
+
+    def named_engines(self) -> List[Tuple[str, Engine]]:
+        return [(f"shard {i}", e) for i, e in enumerate(self.engines)]
+
+    def assign(self, user_id: int) -> int:
+        return user_id % len(self.urls)
+
+    async def shard_for(self, directory: AsyncSession, user_id: int) -> Optional[int]:
+        with self._lock:
+            cached = self._cache.get(user_id)
+        if cached is not None and cached[0] > time.monotonic():
+            return cached[1]
+        shard = await directory.scalar(select(models.UserShard.shard).where(models.UserShard.user_id == user_id))
+        if shard is not None:
+            with self._lock:
+                self._cache[user_id] = (time.monotonic() + self.map_ttl, shard)
+        return shard
+
+    def forget(self, user_id: Optional[int] = None) -> None:
+        with self._lock:
+            if user_id is None:
+                self._cache.clear()
+            else:
+                self._cache.pop(user_id, None)
+
+    async def add_user(self, directory: AsyncSession, user: models.User) -> None:
+        """
+        Places a newly registered user. The user is already committed to the
+        directory; if this fails part way, ``python -m app.shards migrate``
+        places them later.
+        """
+        shard = self.assign(user.id)
+        async with self.async_sessionmakers[shard]() as db:
+            await db.merge(shard_user_copy(user))
+            await db.commit()
+        directory.add(models.UserShard(user_id=user.id, shard=shard))
+        await directory.commit()
+
+    async def dispose(self) -> None:
+        for async_engine in self.async_engines:
+            await async_engine.dispose()
+        for sync_engine in self.engines:
+            sync_engine.dispose()
+
+def shard_user_copy(user: models.User) -> models.User:
+    # credentials are only ever read from the directory
+    return models.User(
+        id=user.id,
+        email=user.email,
+        username=user.username,
+        password_hash="",
+        timezone=user.timezone,
+        created_at=user.created_at,
+        data_version=user.data_version or 0,
+    )
+
+_router = ShardRouter(config.SHARD_DATABASE_URLS, config.SHARD_MAP_TTL, id_block_size=config.SHARD_ID_BLOCK_SIZE)
+
+def get_shard_router() -> ShardRouter:
+    return _router
+
+def set_shard_router(router: ShardRouter) -> None:
+    global _router
+    _router = router
+
+def data_sessionmakers() -> List[sessionmaker]:
+    """Sync session factories for every database holding user data."""
+    if _router.enabled:
+        return _router.sessionmakers
+    return [SessionLocal]
+
+# ------------------------------------------------------------- moving users
+
+def _user_filter(table: Table, user_id: int):
+    if table is models.User.__table__:
+        return table.c.id == user_id
+    if "user_id" in table.c:
+        return table.c.user_id == user_id
+    return table.c.habit_id.in_(select(models.Habit.id).where(models.Habit.user_id == user_id))
+
+def delete_user_rows(db: Session, user_id: int, keep_user: bool = False) -> None:
+    for table in reversed(USER_TABLES):
+        if keep_user and table is models.User.__table__:
+            continue
+        db.execute(delete(table).where(_user_filter(table, user_id)))
+
+class IdCollision(Exception):
+    pass
+
+def _check_ids_free(target: Session, table: Table, rows: List[dict]) -> None:
+    # only rows numbered before ids came from the directory can collide
+    taken = sorted(target.scalars(select(table.c.id).where(table.c.id.in_([row["id"] for row in rows]))))
+    if taken:
+        raise IdCollision(f"{table.name} ids already used on the target shard: {taken[:10]}")
+
+def copy_user_rows(source: Session, target: Session, user_id: int) -> int:
+    """
+    Replaces whatever ``target`` has for the user with ``source``'s rows and
+    returns the row count. Every row keeps its id; IdCollision is raised,
+    before anything is committed, if ``target`` already uses one of them.
+    """
+    delete_user_rows(target, user_id)
+    copied = 0
+    for table in USER_TABLES:
+        rows = [dict(row) for row in source.execute(select(table).where(_user_filter(table, user_id))).mappings()]
+        if not rows:
+            continue
+        copied += len(rows)
+        if table is models.User.__table__:
+            for row in rows:
+                row["password_hash"] = ""
+        if table in ID_TABLES:
+            _check_ids_free(target, table, rows)
+        target.execute(insert(table), rows)
+    return copied
+
+def move_user(
+        router: ShardRouter,
+        directory: Session,
+        user_id: int,
+        target_shard: int,
+) -> int:
+    """
+    Copies the user into ``target_shard``, points the directory at it, then
+    deletes the old copy (from the directory itself for users placed by
+    ``migrate``). Each step commits, so an interrupted move can be re-run.
+    """
+    current = directory.scalar(select(models.UserShard.shard).where(models.UserShard.user_id == user_id))
+    if current == target_shard:
+        return 0
+    with router.sessionmakers[target_shard]() as target:
+        if current is None:
+            copied = copy_user_rows(directory, target, user_id)
+        else:
+            with router.sessionmakers[current]() as source:
+                copied = copy_user_rows(source, target, user_id)
+        target.commit()
+
+    directory.merge(models.UserShard(user_id=user_id, shard=target_shard))
+    directory.commit()
+
+    if current is None:
+        delete_user_rows(directory, user_id, keep_user=True)
+        directory.commit()
+    else:
+        with router.sessionmakers[current]() as source:
+            delete_user_rows(source, user_id)
+            source.commit()
+    router.forget(user_id)
+    return copied
+
+def shard_counts(router: ShardRouter, directory: Session) -> Dict[int, int]:
+    counts = {shard: 0 for shard in range(len(router.urls))}
+    counts.update(directory.execute(
+        select(models.UserShard.shard, func.count()).group_by(models.UserShard.shard)
+    ).all())
+    return counts
+
+def unplaced_users(directory: Session) -> List[int]:
+    return list(directory.scalars(
+        select(models.User.id)
+        .outerjoin(models.UserShard, models.UserShard.user_id == models.User.id)
+        .where(models.UserShard.user_id.is_(None))
+        .order_by(models.User.id)
+    ))
+
+def rebalance_moves(counts: Dict[int, int], users_by_shard: Dict[int, List[int]]) -> List[Tuple[int, int]]:
+    """(user_id, target shard) pairs that leave the shard sizes at most one apart."""
+    counts = dict(counts)
+    pools = {shard: list(users) for shard, users in users_by_shard.items()}
+    moves: List[Tuple[int, int]] = []
+    while True:
+        fullest = max(counts, key=lambda s: counts[s])
+        emptiest = min(counts, key=lambda s: counts[s])
+        if counts[fullest] - counts[emptiest] <= 1:
+            return moves
+        moves.append((pools[fullest].pop(), emptiest))
+        counts[fullest] -= 1
+        counts[emptiest] += 1
+
+def main(argv: Optional[Sequence[str]] = None) -> None:
+    import argparse
+
+    parser = argparse.ArgumentParser(prog="python -m app.shards")
+    commands = parser.add_subparsers(dest="command", required=True)
+    commands.add_parser("status")
+    commands.add_parser("migrate")
+    move = commands.add_parser("move")
+    move.add_argument("user_id", type=int)
+    move.add_argument("shard", type=int)
+    commands.add_parser("rebalance")
+    args = parser.parse_args(argv)
+
+    router = get_shard_router()
+    if not router.enabled:
+        parser.error("SHARD_DATABASE_URLS is not set")
+
+    with Session(bind=engine) as directory:
+        if args.command == "migrate":
+            for user_id in unplaced_users(directory):
+                rows = move_user(router, directory, user_id, router.assign(user_id))
+                print(f"user {user_id}: {rows} rows -> shard {router.assign(user_id)}")
+        elif args.command == "move":
+            if not 0 <= args.shard < len(router.urls):
+                parser.error(f"shard must be between 0 and {len(router.urls) - 1}")
+            rows = move_user(router, directory, args.user_id, args.shard)
+            print(f"user {args.user_id}: {rows} rows -> shard {args.shard}")
+        elif args.command == "rebalance":
+            users_by_shard: Dict[int, List[int]] = {shard: [] for shard in range(len(router.urls))}
+            for user_id, shard in directory.execute(
+                select(models.UserShard.user_id, models.UserShard.shard).order_by(models.UserShard.user_id)
+            ):
+                users_by_shard[shard].append(user_id)
+            for user_id, shard in rebalance_moves(shard_counts(router, directory), users_by_shard):
+                rows = move_user(router, directory, user_id, shard)
+                print(f"user {user_id}: {rows} rows -> shard {shard}")
+
+        for shard, count in shard_counts(router, directory).items():
+            print(f"shard {shard}: {count} users  {router.urls[shard]}")
+        unplaced = unplaced_users(directory)
+        if unplaced:
+            print(f"{len(unplaced)} users not placed yet; run `python -m app.shards migrate`")
+
+if __name__ == "__main__":
+    main()
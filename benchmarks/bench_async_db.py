@@ -0,0 +1,188 @@
+"""
+Requests per second for GET /dashboard/today at high concurrency, comparing
+the blocking Session-in-threadpool handler the routers used to have with the
+current async routers on AsyncSession.
+
+    SECRET_KEY=bench python -m benchmarks.bench_async_db --concurrency 200 --requests 4000
+"""
+import argparse
+import asyncio
+import math
+import os
+import statistics
+import tempfile
+import time
+from datetime import date, datetime, timedelta
+from typing import List
+
+os.environ.setdefault("SECRET_KEY", "benchmark-secret")
+os.environ.setdefault("ENV", "test")
+
+import httpx
+from fastapi import Depends, FastAPI, HTTPException
+from sqlalchemy import create_engine, insert
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from sqlalchemy.orm import Session, selectinload, sessionmaker
+from zoneinfo import ZoneInfo
+
+from app import models, schemas
+from app.dependencies import get_directory_db
+from app.security import TokenPayload, create_access_token, decode_access_token
+from app.services.dashboard import compute_today_streaks
+from app.services.streak_state import rebuild_streak_state
+from main import app as async_app
+
+def seed(sync_engine, users: int, habits_per_user: int, days: int) -> List[int]:
+    models.Base.metadata.create_all(bind=sync_engine)
+    today = date.today()
+    user_ids = []
+    with sync_engine.begin() as conn:
+        for u in range(users):
+            user_id = conn.execute(
+                insert(models.User).values(
+                    email=f"bench{u}@example.com", username=f"bench{u}", password_hash="x", timezone="UTC",
+                )
+            ).inserted_primary_key[0]
+            user_ids.append(user_id)
+            for h in range(habits_per_user):
+                habit_id = conn.execute(
+                    insert(models.Habit).values(
+                        user_id=user_id, name=f"habit {h}", description="", is_archived=False,
+                        goal_type="DAILY" if h % 2 else "X_PER_WEEK", target_per_period=3,
+                        start_date=today - timedelta(days=days),
+                    )
+                ).inserted_primary_key[0]
+                conn.execute(insert(models.HabitLog), [
+                    {"habit_id": habit_id, "user_id": user_id, "date": today - timedelta(days=d), "value": 1}
+                    for d in range(days) if (d * 7 + h) % 5
+                ])
+
+    # build streak state up front so the timed requests are read-only
+    with Session(sync_engine) as db:
+        for habit in db.query(models.Habit):
+            rebuild_streak_state(db, habit)
+        db.commit()
+    return user_ids
+
+def build_sync_app(sync_engine) -> FastAPI:
+    """The pre-async shape: sync def handlers on a blocking Session."""
+    SyncSession = sessionmaker(bind=sync_engine, autoflush=False)
+    sync_app = FastAPI()
+
+    def sync_get_db():
+        db = SyncSession()
+        try:
+            yield db
+        finally:
+            db.close()
+
+    def sync_decode(token: TokenPayload = Depends(decode_access_token)) -> TokenPayload:
+        return token
+
+    def sync_current_user(db: Session = Depends(sync_get_db), token: TokenPayload = Depends(sync_decode)):
+        user = db.query(models.User).filter(models.User.id == token.sub).first()
+        if not user:
+            raise HTTPException(status_code=401, detail="User not found")
+        return user
+
+    @sync_app.get("/dashboard/today", response_model=schemas.DashboardTodayResponse)
+    def today_dashboard(db: Session = Depends(sync_get_db), current_user=Depends(sync_current_user)):
+        today = datetime.now(ZoneInfo(current_user.timezone or "UTC")).date()
+        habits = (
+            db.query(models.Habit)
+            .options(selectinload(models.Habit.streak_state))
+            .filter(models.Habit.user_id == current_user.id, models.Habit.is_archived == False)
+            .order_by(models.Habit.created_at)
+            .all()
+        )
+        streaks = compute_today_streaks(db, current_user, habits, today)
+        return schemas.DashboardTodayResponse(date=today, habits=[
+            schemas.TodayHabitItem(
+                habit=schemas.HabitRead.model_validate(h),
+                is_completed=streaks[h.id][0],
+                current_streak=streaks[h.id][1],
+                best_streak=streaks[h.id][2],
+            )
+            for h in habits
+        ])
+
+    return sync_app
+
+async def drive(app: FastAPI, tokens: List[str], concurrency: int, total: int) -> dict:
+    latencies: List[float] = []
+    semaphore = asyncio.Semaphore(concurrency)
+    transport = httpx.ASGITransport(app=app)
+
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        async def one(i: int) -> None:
+            async with semaphore:
+                started = time.perf_counter()
+                res = await client.get(
+                    "/dashboard/today", headers={"Authorization": f"Bearer {tokens[i % len(tokens)]}"},
+                )
+                latencies.append(time.perf_counter() - started)
+                assert res.status_code == 200, res.text
+
+        # warm up caches and connection pools before timing
+        await asyncio.gather(*(one(i) for i in range(min(total, concurrency))))
+        latencies.clear()
+
+        started = time.perf_counter()
+        await asyncio.gather(*(one(i) for i in range(total)))
+        elapsed = time.perf_counter() - started
+
+    latencies.sort()
+    return {
+        "requests_per_second": total / elapsed,
+        "p50_ms": statistics.median(latencies) * 1000,
+        "p95_ms": latencies[max(math.ceil(len(latencies) * 0.95) - 1, 0)] * 1000,
+    }
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--users", type=int, default=50)
+    parser.add_argument("--habits", type=int, default=8)
+    parser.add_argument("--days", type=int, default=365)
+    parser.add_argument("--concurrency", type=int, default=200)
+    parser.add_argument("--requests", type=int, default=4000)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "bench.db")
+        # same pool ceiling for both so only the execution model differs
+        pool = {"pool_size": 20, "max_overflow": args.concurrency}
+        sync_engine = create_engine(f"sqlite:///{path}", connect_args={"check_same_thread": False}, **pool)
+        async_engine = create_async_engine(f"sqlite+aiosqlite:///{path}", **pool)
+        user_ids = seed(sync_engine, args.users, args.habits, args.days)
+        tokens = [create_access_token(user_id) for user_id in user_ids]
+
+        BenchAsyncSession = async_sessionmaker(async_engine, autoflush=False, expire_on_commit=False)
+
+        async def bench_get_db():
+            async with BenchAsyncSession() as db:
+                yield db
+
+        async_app.dependency_overrides[get_directory_db] = bench_get_db
+        try:
+            results = {
+                "before (sync def + Session)": await drive(
+                    build_sync_app(sync_engine), tokens, args.concurrency, args.requests,
+                ),
+                "after (async def + AsyncSession)": await drive(
+                    async_app, tokens, args.concurrency, args.requests,
+                ),
+            }
+        finally:
+            async_app.dependency_overrides.clear()
+            await async_engine.dispose()
+            sync_engine.dispose()
+
+    print(f"GET /dashboard/today, concurrency={args.concurrency}, requests={args.requests}")
+    for name, r in results.items():
+        print(
+            f"  {name:<34} {r['requests_per_second']:8.1f} req/s"
+            f"   p50 {r['p50_ms']:7.1f} ms   p95 {r['p95_ms']:7.1f} ms"
+        )
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,122 @@
+"""
+POST /habits/{id}/logs under concurrent load, committing per request versus
+group commit (config.GROUP_COMMIT), on a file-backed SQLite database. Every
+client checks in its own habit on consecutive days, so no request conflicts.
+
+    python -m benchmarks.bench_group_commit --clients 200 --requests 2000 --profile durable
+"""
+import argparse
+import asyncio
+import math
+import os
+import statistics
+import tempfile
+import time
+from datetime import date, timedelta
+from typing import List
+
+os.environ.setdefault("SECRET_KEY", "benchmark-secret")
+os.environ.setdefault("ENV", "test")
+
+import httpx
+from sqlalchemy import insert
+from sqlalchemy.ext.asyncio import async_sessionmaker
+
+from app import config, models
+from app.db import SQLITE_PROFILES, create_engines
+from app.dependencies import get_directory_db
+from app.security import create_access_token
+from app.services.group_commit import _writers, close_group_commit_writers
+from main import app
+
+async def load(client: httpx.AsyncClient, clients: int, requests: int, day0: date) -> dict:
+    latencies: List[float] = []
+    errors = 0
+
+    async def one_client(i: int) -> None:
+        headers = {"Authorization": f"Bearer {create_access_token(user_id=i + 1)}"}
+        for n in range(requests // clients):
+            nonlocal errors
+            started = time.perf_counter()
+            try:
+                res = await client.post(
+                    f"/habits/{i + 1}/logs", json={"date": str(day0 + timedelta(days=n))}, headers=headers,
+                )
+                ok = res.status_code == 201
+            except Exception:
+                # "database is locked" once a writer waited out busy_timeout
+                ok = False
+            if ok:
+                latencies.append(time.perf_counter() - started)
+            else:
+                errors += 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*(one_client(i) for i in range(clients)))
+    elapsed = time.perf_counter() - started
+    latencies.sort()
+    return {
+        "logs_per_second": len(latencies) / elapsed,
+        "p50_ms": statistics.median(latencies) * 1000,
+        "p99_ms": latencies[max(math.ceil(len(latencies) * 0.99) - 1, 0)] * 1000,
+        "errors": errors,
+    }
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--clients", type=int, default=200)
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--profile", choices=list(SQLITE_PROFILES), default="durable")
+    parser.add_argument("--window-ms", type=float, default=config.GROUP_COMMIT_WINDOW_MS)
+    args = parser.parse_args()
+    config.GROUP_COMMIT_WINDOW_MS = args.window_ms
+
+    modes = [("per-request commit", False, "commit"), ("group commit", True, "commit")]
+    if args.profile == "tuned":
+        modes.append(("group commit, full", True, "full"))
+
+    results = {}
+    for name, group_commit, durability in modes:
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "bench.db")
+            sync_engine, async_engine = create_engines(f"sqlite:///{path}", f"sqlite+aiosqlite:///{path}", args.profile)
+            models.Base.metadata.create_all(bind=sync_engine)
+            with sync_engine.begin() as conn:
+                conn.execute(insert(models.User), [
+                    {"id": i + 1, "email": f"b{i}@example.com", "username": f"b{i}", "password_hash": "x"}
+                    for i in range(args.clients)
+                ])
+                conn.execute(insert(models.Habit), [
+                    {"id": i + 1, "user_id": i + 1, "name": "h", "goal_type": "DAILY", "start_date": date(2024, 1, 1)}
+                    for i in range(args.clients)
+                ])
+            sessions = async_sessionmaker(async_engine, autoflush=False, expire_on_commit=False)
+
+            async def bench_get_db():
+                async with sessions() as db:
+                    yield db
+
+            app.dependency_overrides[get_directory_db] = bench_get_db
+            config.GROUP_COMMIT = group_commit
+            config.GROUP_COMMIT_DURABILITY = durability
+            try:
+                transport = httpx.ASGITransport(app=app)
+                async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+                    results[name] = await load(client, args.clients, args.requests, date(2024, 1, 1))
+                batches = sum(w.batches for w in _writers.values())
+                results[name]["rows_per_commit"] = sum(w.rows for w in _writers.values()) / batches if batches else 1.0
+                await close_group_commit_writers()
+            finally:
+                app.dependency_overrides.clear()
+                await async_engine.dispose()
+                sync_engine.dispose()
+
+    print(
+        f"POST /habits/{{id}}/logs, {args.requests} logs from {args.clients} concurrent clients, "
+        f"SQLITE_PROFILE={args.profile}, window {args.window_ms:g} ms"
+    )
+    for name, r in results.items():
+        print(f"  {name:<20} {r['logs_per_second']:8.0f} logs/s   p50 {r['p50_ms']:7.1f} ms   p99 {r['p99_ms']:7.1f} ms   {r['errors']} failed   {r['rows_per_commit']:5.1f} logs/commit")
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,121 @@
+"""
+Login throughput with bcrypt in the request threadpool versus the dedicated
+process pool, plus the latency other traffic sees while the storm is on.
+
+    python -m benchmarks.bench_login --rounds 12 --logins 200 --concurrency 50
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import tempfile
+import time
+from typing import List
+
+os.environ.setdefault("SECRET_KEY", "benchmark-secret")
+os.environ.setdefault("ENV", "test")
+
+import httpx
+from sqlalchemy import create_engine, insert
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+from app import models, security
+from app.dependencies import get_directory_db
+from app.passwordhash import Hash
+from app.services.hash_pool import PasswordHashPool
+from main import app
+
+PASSWORD = "benchmark-password"
+
+async def storm(client: httpx.AsyncClient, users: int, logins: int, concurrency: int) -> dict:
+    semaphore = asyncio.Semaphore(concurrency)
+    bystander: List[float] = []
+    done = asyncio.Event()
+
+    async def login(i: int) -> None:
+        async with semaphore:
+            res = await client.post(
+                "/auth/login",
+                data={"username": f"bench{i % users}", "password": PASSWORD},
+            )
+            assert res.status_code in (200, 503), res.text
+
+    async def other_traffic() -> None:
+        while not done.is_set():
+            started = time.perf_counter()
+            await client.get("/")
+            bystander.append(time.perf_counter() - started)
+            await asyncio.sleep(0.01)
+
+    watcher = asyncio.create_task(other_traffic())
+    started = time.perf_counter()
+    await asyncio.gather(*(login(i) for i in range(logins)))
+    elapsed = time.perf_counter() - started
+    done.set()
+    await watcher
+
+    bystander.sort()
+    return {
+        "logins_per_second": logins / elapsed,
+        "bystander_p50_ms": statistics.median(bystander) * 1000 if bystander else 0.0,
+        "bystander_max_ms": bystander[-1] * 1000 if bystander else 0.0,
+    }
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rounds", type=int, default=12)
+    parser.add_argument("--users", type=int, default=20)
+    parser.add_argument("--logins", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    args = parser.parse_args()
+
+    os.environ["BCRYPT_ROUNDS"] = str(args.rounds)
+    security.config.BCRYPT_ROUNDS = args.rounds
+    password_hash = Hash.bcrypt(PASSWORD, rounds=args.rounds)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "bench.db")
+        sync_engine = create_engine(f"sqlite:///{path}")
+        models.Base.metadata.create_all(bind=sync_engine)
+        with sync_engine.begin() as conn:
+            conn.execute(insert(models.User), [
+                {"email": f"bench{i}@example.com", "username": f"bench{i}", "password_hash": password_hash}
+                for i in range(args.users)
+            ])
+
+        async_engine = create_async_engine(f"sqlite+aiosqlite:///{path}")
+        BenchAsyncSession = async_sessionmaker(async_engine, autoflush=False, expire_on_commit=False)
+
+        async def bench_get_db():
+            async with BenchAsyncSession() as db:
+                yield db
+
+        app.dependency_overrides[get_directory_db] = bench_get_db
+        results = {}
+        original_pool = security.hash_pool
+        try:
+            for name, pool in (
+                ("threadpool", PasswordHashPool(0, args.logins)),
+                (f"process pool x{args.workers}", PasswordHashPool(args.workers, args.logins)),
+            ):
+                security.hash_pool = pool
+                transport = httpx.ASGITransport(app=app)
+                async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+                    results[name] = await storm(client, args.users, args.logins, args.concurrency)
+                pool.shutdown()
+        finally:
+            security.hash_pool = original_pool
+            app.dependency_overrides.clear()
+            await async_engine.dispose()
+            sync_engine.dispose()
+
+    print(f"POST /auth/login, bcrypt cost {args.rounds}, {args.logins} logins, concurrency={args.concurrency}")
+    for name, r in results.items():
+        print(
+            f"  {name:<20} {r['logins_per_second']:7.1f} logins/s"
+            f"   other requests p50 {r['bystander_p50_ms']:7.1f} ms, max {r['bystander_max_ms']:7.1f} ms"
+        )
+
+if __name__ == "__main__":
+    asyncio.run(main())
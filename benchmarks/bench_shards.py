@@ -0,0 +1,63 @@
+"""
+Write throughput as users are spread over more SQLite shards. A fixed set of
+writer processes, one per user, each insert a log and bump data_version per
+transaction; with N shards writer i writes to shard i % N (what
+ShardRouter.assign does), so writers only contend for the lock of their own
+shard's file.
+
+    python -m benchmarks.bench_shards --writers 8 --shards 1 2 4 8 --seconds 5
+"""
+import argparse
+import multiprocessing
+import os
+import tempfile
+import time
+
+from benchmarks.bench_sqlite_writes import setup, writer
+
+def run(shards: int, writers: int, profile: str, seconds: float) -> dict:
+    with tempfile.TemporaryDirectory() as tmp:
+        paths = [os.path.join(tmp, f"shard{i}.db") for i in range(shards)]
+        for path in paths:
+            setup(path, profile, writers)
+
+        start = multiprocessing.Event()
+        results = multiprocessing.Queue()
+        stop_at = time.time() + 1 + seconds
+        procs = [
+            multiprocessing.Process(target=writer, args=(paths[i % shards], profile, i, start, stop_at, results))
+            for i in range(writers)
+        ]
+        for p in procs:
+            p.start()
+        time.sleep(max(stop_at - seconds - time.time(), 0))
+        start.set()
+        done = locked = 0
+        for _ in procs:
+            _, d, l = results.get()
+            done += d
+            locked += l
+        for p in procs:
+            p.join()
+    return {"writes_per_second": done / seconds, "write_errors": locked}
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--writers", type=int, default=8)
+    parser.add_argument("--shards", type=int, nargs="+", default=[1, 2, 4, 8])
+    parser.add_argument("--profile", default="durable")
+    parser.add_argument("--seconds", type=float, default=5)
+    args = parser.parse_args()
+
+    print(f"{args.writers} writer processes, SQLITE_PROFILE={args.profile}, {os.cpu_count()} CPUs")
+    baseline = None
+    for shards in args.shards:
+        r = run(shards, args.writers, args.profile, args.seconds)
+        baseline = baseline or r["writes_per_second"]
+        print(
+            f"  {shards:>2} shards {r['writes_per_second']:8.0f} writes/s"
+            f"  x{r['writes_per_second'] / baseline:4.2f}  ({r['write_errors']} locked)"
+        )
+
+if __name__ == "__main__":
+    main()
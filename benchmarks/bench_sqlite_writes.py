@@ -0,0 +1,134 @@
+"""
+Sustained write throughput on a file-backed SQLite database under each
+SQLITE_PROFILE. Writer processes each insert a log and bump the owner's
+data_version per transaction (what POST /habits/{id}/logs does), while
+reader processes run dashboard-style SELECTs against the same file.
+
+    python -m benchmarks.bench_sqlite_writes --writers 4 --readers 2 --seconds 5
+"""
+import argparse
+import multiprocessing
+import os
+import tempfile
+import time
+from datetime import date, timedelta
+
+os.environ.setdefault("SECRET_KEY", "benchmark-secret")
+os.environ.setdefault("ENV", "test")
+
+from sqlalchemy import func, insert, select, update
+from sqlalchemy.exc import OperationalError
+
+from app import models
+from app.db import SQLITE_PROFILES, create_engines
+
+def _engine(path: str, profile: str):
+    sync_engine, _ = create_engines(f"sqlite:///{path}", f"sqlite+aiosqlite:///{path}", profile)
+    return sync_engine
+
+def setup(path: str, profile: str, writers: int) -> None:
+    sync_engine = _engine(path, profile)
+    models.Base.metadata.create_all(bind=sync_engine)
+    with sync_engine.begin() as conn:
+        for w in range(writers):
+            conn.execute(insert(models.User).values(
+                id=w + 1, email=f"w{w}@example.com", username=f"w{w}", password_hash="x",
+            ))
+            conn.execute(insert(models.Habit).values(
+                id=w + 1, user_id=w + 1, name="h", description="", goal_type="DAILY",
+                target_per_period=1, start_date=date(2000, 1, 1), is_archived=False,
+            ))
+    sync_engine.dispose()
+
+def writer(path: str, profile: str, index: int, start, stop_at: float, results) -> None:
+    sync_engine = _engine(path, profile)
+    done = locked = 0
+    day = date(2000, 1, 1)
+    start.wait()
+    while time.time() < stop_at:
+        try:
+            with sync_engine.begin() as conn:
+                conn.execute(select(models.Habit.id).where(models.Habit.id == index + 1)).scalar()
+                conn.execute(insert(models.HabitLog).values(
+                    habit_id=index + 1, user_id=index + 1, date=day, value=1,
+                ))
+                conn.execute(
+                    update(models.User).where(models.User.id == index + 1)
+                    .values(data_version=models.User.data_version + 1)
+                )
+            done += 1
+            day += timedelta(days=1)
+        except OperationalError:
+            locked += 1
+    results.put(("writer", done, locked))
+
+def reader(path: str, profile: str, index: int, start, stop_at: float, results) -> None:
+    sync_engine = _engine(path, profile)
+    done = locked = 0
+    start.wait()
+    while time.time() < stop_at:
+        try:
+            with sync_engine.connect() as conn:
+                conn.execute(
+                    select(models.HabitLog.habit_id, func.count())
+                    .where(models.HabitLog.user_id == index % 2 + 1)
+                    .group_by(models.HabitLog.habit_id)
+                ).all()
+            done += 1
+        except OperationalError:
+            locked += 1
+    results.put(("reader", done, locked))
+
+def run_profile(profile: str, writers: int, readers: int, seconds: float) -> dict:
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "bench.db")
+        setup(path, profile, writers)
+
+        start = multiprocessing.Event()
+        results = multiprocessing.Queue()
+        stop_at = time.time() + 1 + seconds
+        procs = [
+            multiprocessing.Process(target=writer, args=(path, profile, i, start, stop_at, results))
+            for i in range(writers)
+        ] + [
+            multiprocessing.Process(target=reader, args=(path, profile, i, start, stop_at, results))
+            for i in range(readers)
+        ]
+        for p in procs:
+            p.start()
+        # give every process time to import and connect before the clock starts
+        time.sleep(max(stop_at - seconds - time.time(), 0))
+        start.set()
+        totals = {"writer": [0, 0], "reader": [0, 0]}
+        for _ in procs:
+            kind, done, locked = results.get()
+            totals[kind][0] += done
+            totals[kind][1] += locked
+        for p in procs:
+            p.join()
+
+    return {
+        "writes_per_second": totals["writer"][0] / seconds,
+        "write_errors": totals["writer"][1],
+        "reads_per_second": totals["reader"][0] / seconds,
+        "read_errors": totals["reader"][1],
+    }
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--writers", type=int, default=4)
+    parser.add_argument("--readers", type=int, default=2)
+    parser.add_argument("--seconds", type=float, default=5)
+    parser.add_argument("--profiles", nargs="+", choices=list(SQLITE_PROFILES), default=["stock", "durable", "tuned"])
+    args = parser.parse_args()
+
+    print(f"{args.writers} writer and {args.readers} reader processes, {args.seconds:g} s per profile")
+    for profile in args.profiles:
+        r = run_profile(profile, args.writers, args.readers, args.seconds)
+        print(
+            f"  {profile:<8} {r['writes_per_second']:8.0f} writes/s ({r['write_errors']} locked)"
+            f"   {r['reads_per_second']:8.0f} reads/s ({r['read_errors']} locked)"
+        )
+
+if __name__ == "__main__":
+    main()
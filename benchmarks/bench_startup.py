@@ -0,0 +1,79 @@
+"""
+Cold start of a worker: a fresh interpreter importing main, running the
+lifespan startup and answering its first request, against a migrated
+file-backed SQLite database. Each run is a new process, so nothing is
+cached in memory between runs (the OS file cache is warm after the first).
+
+    python -m benchmarks.bench_startup --runs 10
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+CHILD = r"""
+import json, sys, time
+marks = {"started": time.time()}
+import asyncio
+import httpx
+marks["tooling_imported"] = time.time()
+import main
+marks["imported"] = time.time()
+
+async def first_response():
+    async with main.app.router.lifespan_context(main.app):
+        marks["startup_done"] = time.time()
+        transport = httpx.ASGITransport(app=main.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+            res = await client.get("/")
+            assert res.status_code == 200
+        marks["first_response"] = time.time()
+
+asyncio.run(first_response())
+print(json.dumps(marks))
+"""
+
+def one_run(env: dict) -> dict:
+    spawned = time.time()
+    out = subprocess.run(
+        [sys.executable, "-c", CHILD], env=env, capture_output=True, text=True, check=True,
+    ).stdout
+    marks = json.loads(out.strip().splitlines()[-1])
+    return {
+        "interpreter_ms": (marks["started"] - spawned) * 1000,
+        "import_main_ms": (marks["imported"] - marks["tooling_imported"]) * 1000,
+        "lifespan_startup_ms": (marks["startup_done"] - marks["imported"]) * 1000,
+        "first_request_ms": (marks["first_response"] - marks["startup_done"]) * 1000,
+        "import_to_first_response_ms": (
+            marks["first_response"] - marks["tooling_imported"]
+        ) * 1000,
+    }
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=10)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        env = {
+            **os.environ,
+            "SECRET_KEY": os.environ.get("SECRET_KEY", "benchmark-secret"),
+            "DATABASE_URL": f"sqlite:///{os.path.join(tmp, 'startup.db')}",
+            "PYTHONPATH": os.getcwd() + os.pathsep + os.environ.get("PYTHONPATH", ""),
+        }
+        env.pop("ENV", None)
+        # migrate once, as a deployment would, so workers only check the schema
+        subprocess.run([sys.executable, "-m", "app.migrations"], env=env, check=True, capture_output=True)
+
+        runs = [one_run(env) for _ in range(args.runs)]
+
+    print(f"worker cold start, median of {args.runs} runs")
+    for key in runs[0]:
+        print(f"  {key:<30} {statistics.median(r[key] for r in runs):8.1f}")
+
+if __name__ == "__main__":
+    main()
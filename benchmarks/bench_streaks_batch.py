@@ -0,0 +1,81 @@
+"""
+Batch streak engine versus calling the scalar functions one habit at a time.
+
+The scalar side is timed on a random sample of habits and scaled up, since
+running it over every habit of a 10M log dataset takes minutes.
+
+    python -m benchmarks.bench_streaks_batch --logs 10000000 --habits 100000
+"""
+import argparse
+import time
+from collections import defaultdict
+from datetime import date
+
+import numpy as np
+
+from app.services.streaks import (
+    compute_streaks_batch, compute_streaks_for_daily, compute_streaks_for_x_per_week,
+)
+
+GOAL_TYPES = np.array(["DAILY", "X_PER_WEEK", "WEEKLY"])
+
+def generate(n_logs: int, n_habits: int, days: int, seed: int):
+    rng = np.random.default_rng(seed)
+    today = date.today()
+    first_day = today.toordinal() - days
+
+    goal_habit_ids = np.arange(1, n_habits + 1, dtype=np.int64)
+    goal_types = GOAL_TYPES[rng.integers(0, len(GOAL_TYPES), n_habits)]
+    targets = rng.integers(1, 5, n_habits)
+
+    habit_ids = rng.integers(1, n_habits + 1, n_logs, dtype=np.int64)
+    # skew towards recent days, like real check-in histories
+    day_ordinals = today.toordinal() - (rng.power(0.6, n_logs) * days).astype(np.int64)
+    day_ordinals = np.maximum(day_ordinals, first_day)
+    return today, habit_ids, day_ordinals, goal_habit_ids, goal_types, targets
+
+def scalar(dates_by_habit, goal_types, targets, today, sample):
+    for i in sample:
+        dates = dates_by_habit.get(i + 1, [])
+        if goal_types[i] == "DAILY":
+            compute_streaks_for_daily(dates, today)
+        else:
+            compute_streaks_for_x_per_week(dates, today, int(targets[i]))
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--logs", type=int, default=10_000_000)
+    parser.add_argument("--habits", type=int, default=100_000)
+    parser.add_argument("--days", type=int, default=3 * 365)
+    parser.add_argument("--scalar-sample", type=int, default=2_000)
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    today, habit_ids, day_ordinals, goal_habit_ids, goal_types, targets = generate(
+        args.logs, args.habits, args.days, args.seed,
+    )
+
+    started = time.perf_counter()
+    compute_streaks_batch(habit_ids, day_ordinals, goal_habit_ids, goal_types, targets, today)
+    batch_seconds = time.perf_counter() - started
+
+    rng = np.random.default_rng(args.seed + 1)
+    sample = rng.choice(args.habits, size=min(args.scalar_sample, args.habits), replace=False)
+    sampled = set((sample + 1).tolist())
+    dates_by_habit = defaultdict(list)
+    in_sample = np.isin(habit_ids, list(sampled))
+    for habit_id, ordinal in zip(habit_ids[in_sample].tolist(), day_ordinals[in_sample].tolist()):
+        dates_by_habit[habit_id].append(date.fromordinal(ordinal))
+
+    started = time.perf_counter()
+    scalar(dates_by_habit, goal_types, targets, today, sample)
+    scalar_seconds = (time.perf_counter() - started) * args.habits / len(sample)
+
+    print(f"{args.logs:,} logs across {args.habits:,} habits")
+    print(f"  batch (numpy)          {batch_seconds:8.2f} s")
+    print(f"  scalar, one by one     {scalar_seconds:8.2f} s  (extrapolated from {len(sample):,} habits,")
+    print("                                     excluding the cost of building per-habit date lists)")
+    print(f"  speedup                {scalar_seconds / batch_seconds:8.1f}x")
+
+if __name__ == "__main__":
+    main()
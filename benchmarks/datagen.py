@@ -0,0 +1,123 @@
+"""
+Seeded synthetic data for the benchmarks: N users with M habits each and
+years of logs. The same seed always produces the same rows.
+
+Histories are not uniform noise. Each habit alternates between "on" and
+"off" spells (a two-state Markov chain, so streaks and gaps have realistic
+lengths), has the odd multi-week break, and follows its goal type: DAILY
+habits try every day, X_PER_WEEK habits aim for a few days a week and
+WEEKLY ones for about one.
+"""
+import random
+from dataclasses import dataclass, field
+from datetime import date, timedelta
+from typing import Dict, List
+
+from sqlalchemy import insert, select
+from sqlalchemy.orm import Session, selectinload
+
+from app import models
+from app.passwordhash import Hash
+from app.services.bitmap import rebuild_bitmap
+from app.services.streak_state import rebuild_streak_state
+
+GOAL_TYPES = ("DAILY", "X_PER_WEEK", "WEEKLY")
+PASSWORD = "benchmark-password"
+
+@dataclass
+class Dataset:
+    today: date
+    user_ids: List[int] = field(default_factory=list)
+    usernames: Dict[int, str] = field(default_factory=dict)
+    habit_ids: Dict[int, List[int]] = field(default_factory=dict)
+    log_count: int = 0
+
+    @property
+    def all_habit_ids(self) -> List[int]:
+        return [h for ids in self.habit_ids.values() for h in ids]
+
+def _history(rng: random.Random, goal_type: str, target: int, start: date, today: date) -> List[date]:
+    if goal_type == "DAILY":
+        daily_chance = rng.uniform(0.6, 0.95)
+    elif goal_type == "X_PER_WEEK":
+        daily_chance = min(target / 7 + rng.uniform(-0.1, 0.15), 0.95)
+    else:
+        daily_chance = rng.uniform(0.12, 0.25)
+    # chance of staying in the current spell; higher means longer streaks and gaps
+    stay_on = rng.uniform(0.85, 0.98)
+    stay_off = rng.uniform(0.5, 0.9)
+
+    dates: List[date] = []
+    on = True
+    d = start
+    while d <= today:
+        if rng.random() < 0.004:
+            # a holiday or illness: one to four weeks without logs
+            d += timedelta(days=rng.randint(7, 28))
+            continue
+        on = rng.random() < (stay_on if on else 1 - stay_off)
+        if on and rng.random() < daily_chance:
+            dates.append(d)
+        d += timedelta(days=1)
+    return dates
+
+def generate(
+    db: Session,
+    users: int,
+    habits_per_user: int,
+    years: float,
+    seed: int = 1,
+    today: date = None,
+) -> Dataset:
+    """
+    Inserts the data through ``db`` and commits. Streak states and bitmaps are
+    built too, so timed reads see the steady state rather than lazy rebuilds.
+    """
+    rng = random.Random(seed)
+    today = today or date.today()
+    dataset = Dataset(today=today)
+    # one real hash at the configured cost, shared by every user
+    password_hash = Hash.bcrypt(PASSWORD)
+    span = int(years * 365)
+
+    for u in range(users):
+        username = f"bench{seed}_{u}"
+        user_id = db.execute(
+            insert(models.User).values(
+                email=f"{username}@example.com", username=username, password_hash=password_hash,
+                timezone=rng.choice(["UTC", "Europe/Berlin", "America/New_York", "Asia/Tokyo"]),
+            )
+        ).inserted_primary_key[0]
+        dataset.user_ids.append(user_id)
+        dataset.usernames[user_id] = username
+        dataset.habit_ids[user_id] = []
+
+        for h in range(habits_per_user):
+            goal_type = GOAL_TYPES[h % len(GOAL_TYPES)] if h < len(GOAL_TYPES) else rng.choice(GOAL_TYPES)
+            target = rng.randint(2, 5) if goal_type == "X_PER_WEEK" else 1
+            start = today - timedelta(days=rng.randint(span // 5, span))
+            habit_id = db.execute(
+                insert(models.Habit).values(
+                    user_id=user_id, name=f"habit {h}", description="", goal_type=goal_type,
+                    target_per_period=target, start_date=start, is_archived=rng.random() < 0.05,
+                )
+            ).inserted_primary_key[0]
+            dataset.habit_ids[user_id].append(habit_id)
+
+            dates = _history(rng, goal_type, target, start, today)
+            if dates:
+                db.execute(insert(models.HabitLog), [
+                    {"habit_id": habit_id, "user_id": user_id, "date": d, "value": 1} for d in dates
+                ])
+            dataset.log_count += len(dates)
+
+    habits = db.scalars(
+        select(models.Habit).options(
+            selectinload(models.Habit.streak_state), selectinload(models.Habit.completion_bitmap),
+        )
+    )
+    for habit in habits:
+        rebuild_streak_state(db, habit)
+        rebuild_bitmap(db, habit)
+    db.commit()
+    return dataset
@@ -0,0 +1,292 @@
+"""
+Benchmark suite: seeds a database with benchmarks.datagen and times the
+streak engines, the dashboard, log listing, login and log creation against
+in-memory and file-backed SQLite. Results are written as JSON; pass an
+earlier file with --compare to flag anything that got slower.
+
+    python -m benchmarks.suite --out before.json
+    python -m benchmarks.suite --out after.json --compare before.json --fail-on-regression
+"""
+import argparse
+import asyncio
+import itertools
+import json
+import math
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Awaitable, Callable, Dict, List
+
+os.environ.setdefault("SECRET_KEY", "benchmark-secret")
+os.environ.setdefault("ENV", "test")
+
+import httpx
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from sqlalchemy.pool import StaticPool
+
+from app import config, models
+from app.dependencies import get_directory_db
+from app.security import create_access_token
+from app.services.dashboard import compute_today_streaks, habit_load_options
+from app.services.streaks import (
+    compute_streaks_batch, compute_streaks_for_daily, compute_streaks_for_x_per_week,
+)
+from benchmarks.datagen import PASSWORD, Dataset, generate
+from main import app
+
+STREAK_BACKENDS = ("state", "sql", "bitmap", "python")
+
+# the number the regression check compares
+METRIC = "p50_ms"
+
+def percentile(sorted_samples: List[float], q: float) -> float:
+    """Nearest-rank percentile: the smallest sample with at least ``q`` of them at or below it."""
+    return sorted_samples[max(math.ceil(q * len(sorted_samples)) - 1, 0)]
+
+async def measure(fn: Callable[[int], Awaitable[None]], iterations: int, warmup: int = 2) -> Dict[str, float]:
+    """Calls ``fn(i)`` ``iterations`` times after a warm-up and summarises the latencies."""
+    for i in range(warmup):
+        await fn(i)
+    samples: List[float] = []
+    for i in range(iterations):
+        started = time.perf_counter()
+        await fn(i)
+        samples.append((time.perf_counter() - started) * 1000)
+    samples.sort()
+    return {
+        "iterations": iterations,
+        "mean_ms": statistics.fmean(samples),
+        "p50_ms": percentile(samples, 0.50),
+        "p95_ms": percentile(samples, 0.95),
+        "min_ms": samples[0],
+    }
+
+async def bench_streak_functions(session_factory, dataset: Dataset, iterations: int) -> Dict[str, dict]:
+    async with session_factory() as db:
+        habits = (await db.scalars(select(models.Habit))).all()
+        rows = (await db.execute(select(models.HabitLog.habit_id, models.HabitLog.date))).all()
+
+    dates_by_habit: Dict[int, list] = {h.id: [] for h in habits}
+    for habit_id, d in rows:
+        dates_by_habit[habit_id].append(d)
+    today = dataset.today
+
+    async def scalar(_):
+        for h in habits:
+            if h.goal_type == "DAILY":
+                compute_streaks_for_daily(dates_by_habit[h.id], today)
+            else:
+                compute_streaks_for_x_per_week(dates_by_habit[h.id], today, h.target_per_period)
+
+    habit_ids = [r[0] for r in rows]
+    ordinals = [r[1].toordinal() for r in rows]
+    goal_ids = [h.id for h in habits]
+    goal_types = [h.goal_type for h in habits]
+    targets = [h.target_per_period for h in habits]
+
+    async def batch(_):
+        compute_streaks_batch(habit_ids, ordinals, goal_ids, goal_types, targets, today)
+
+    return {
+        "compute_streaks_python_all_habits": await measure(scalar, iterations),
+        "compute_streaks_batch_all_habits": await measure(batch, iterations),
+    }
+
+async def bench_streak_backends(session_factory, dataset: Dataset, iterations: int) -> Dict[str, dict]:
+    results = {}
+    original = config.STREAK_BACKEND
+    try:
+        for backend in STREAK_BACKENDS:
+            config.STREAK_BACKEND = backend
+
+            async def one_user(i):
+                user_id = dataset.user_ids[i % len(dataset.user_ids)]
+                async with session_factory() as db:
+                    user = await db.get(models.User, user_id)
+                    habits = (await db.scalars(
+                        select(models.Habit).options(*habit_load_options())
+                        .where(models.Habit.user_id == user_id, models.Habit.is_archived == False)
+                    )).all()
+                    await db.run_sync(compute_today_streaks, user, habits, dataset.today)
+
+            results[f"compute_today_streaks[{backend}]"] = await measure(one_user, iterations)
+    finally:
+        config.STREAK_BACKEND = original
+    return results
+
+async def bench_http(session_factory, dataset: Dataset, iterations: int, login_iterations: int) -> Dict[str, dict]:
+    async def bench_get_db():
+        async with session_factory() as db:
+            yield db
+
+    app.dependency_overrides[get_directory_db] = bench_get_db
+    tokens = {user_id: create_access_token(user_id) for user_id in dataset.user_ids}
+
+    def auth(i):
+        user_id = dataset.user_ids[i % len(dataset.user_ids)]
+        return user_id, {"Authorization": f"Bearer {tokens[user_id]}"}
+
+    results = {}
+    try:
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+            async def call(method, url, expected, **kwargs):
+                res = await client.request(method, url, **kwargs)
+                assert res.status_code == expected, (url, res.status_code, res.text)
+
+            async def dashboard(i):
+                _, headers = auth(i)
+                await call("GET", "/dashboard/today", 200, headers=headers)
+
+            async def logs_full(i):
+                user_id, headers = auth(i)
+                habit_id = dataset.habit_ids[user_id][i % len(dataset.habit_ids[user_id])]
+                await call("GET", f"/habits/{habit_id}/logs", 200, headers=headers)
+
+            async def logs_page(i):
+                user_id, headers = auth(i)
+                habit_id = dataset.habit_ids[user_id][i % len(dataset.habit_ids[user_id])]
+                await call("GET", f"/habits/{habit_id}/logs?limit=100", 200, headers=headers)
+
+            async def login(i):
+                user_id, _ = auth(i)
+                await call(
+                    "POST", "/auth/login", 200,
+                    data={"username": dataset.usernames[user_id], "password": PASSWORD},
+                )
+
+            created = itertools.count()
+
+            async def create_log(_):
+                # dates after today never collide with the seeded history
+                n = next(created)
+                user_id, headers = auth(n)
+                habit_id = dataset.habit_ids[user_id][0]
+                d = dataset.today + timedelta(days=1 + n // len(dataset.user_ids))
+                await call("POST", f"/habits/{habit_id}/logs", 201, headers=headers, json={"date": str(d)})
+
+            results["GET /dashboard/today"] = await measure(dashboard, iterations)
+            results["GET /habits/{id}/logs"] = await measure(logs_full, iterations)
+            results["GET /habits/{id}/logs?limit=100"] = await measure(logs_page, iterations)
+            results["POST /auth/login"] = await measure(login, login_iterations, warmup=1)
+            # last, since it adds rows the other benchmarks would then read
+            results["POST /habits/{id}/logs"] = await measure(create_log, iterations)
+    finally:
+        app.dependency_overrides.clear()
+    return results
+
+async def run_database(name: str, url: str, args) -> Dict[str, dict]:
+    engine_kwargs = {"poolclass": StaticPool} if ":memory:" in url else {}
+    engine = create_async_engine(url, **engine_kwargs)
+    session_factory = async_sessionmaker(engine, autoflush=False, expire_on_commit=False)
+    try:
+        async with engine.begin() as conn:
+            await conn.run_sync(models.Base.metadata.create_all)
+
+        started = time.perf_counter()
+        async with session_factory() as db:
+            dataset = await db.run_sync(generate, args.users, args.habits, args.years, args.seed)
+        print(
+            f"[{name}] seeded {len(dataset.user_ids)} users, {len(dataset.all_habit_ids)} habits, "
+            f"{dataset.log_count:,} logs in {time.perf_counter() - started:.1f} s",
+            file=sys.stderr,
+        )
+
+        results = {}
+        results.update(await bench_streak_functions(session_factory, dataset, max(args.iterations // 10, 3)))
+        results.update(await bench_streak_backends(session_factory, dataset, args.iterations))
+        results.update(await bench_http(session_factory, dataset, args.iterations, args.login_iterations))
+        return results
+    finally:
+        await engine.dispose()
+
+def _git_revision() -> str:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+def compare(current: dict, baseline: dict, threshold: float) -> List[str]:
+    """One line per benchmark whose METRIC grew by more than ``threshold``."""
+    regressions = []
+    for database, benches in current["results"].items():
+        for bench, stats in benches.items():
+            old = baseline.get("results", {}).get(database, {}).get(bench)
+            if old is None or old[METRIC] <= 0:
+                continue
+            ratio = stats[METRIC] / old[METRIC]
+            if ratio > 1 + threshold:
+                regressions.append(
+                    f"{database:<7} {bench:<36} {old[METRIC]:9.2f} -> {stats[METRIC]:9.2f} ms  (+{(ratio - 1) * 100:.0f}%)"
+                )
+    return regressions
+
+async def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--users", type=int, default=20)
+    parser.add_argument("--habits", type=int, default=8, help="habits per user")
+    parser.add_argument("--years", type=float, default=3)
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--iterations", type=int, default=100)
+    parser.add_argument("--login-iterations", type=int, default=10)
+    parser.add_argument("--databases", nargs="+", choices=("memory", "file"), default=["memory", "file"])
+    parser.add_argument("--out", default="benchmark-results.json")
+    parser.add_argument("--compare", help="earlier results file to check for regressions")
+    parser.add_argument("--threshold", type=float, default=0.2, help="allowed slowdown, 0.2 = 20%%")
+    parser.add_argument("--fail-on-regression", action="store_true")
+    args = parser.parse_args()
+
+    report = {
+        "meta": {
+            "created_at": datetime.now(timezone.utc).isoformat(),
+            "git_revision": _git_revision(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "bcrypt_rounds": config.BCRYPT_ROUNDS,
+            "streak_backend": config.STREAK_BACKEND,
+            "args": {k: v for k, v in vars(args).items() if k not in ("out", "compare", "fail_on_regression")},
+        },
+        "results": {},
+    }
+
+    with tempfile.TemporaryDirectory() as tmp:
+        urls = {
+            "memory": "sqlite+aiosqlite:///:memory:",
+            "file": f"sqlite+aiosqlite:///{os.path.join(tmp, 'bench.db')}",
+        }
+        for name in args.databases:
+            report["results"][name] = await run_database(name, urls[name], args)
+
+    with open(args.out, "w") as f:
+        json.dump(report, f, indent=2)
+
+    for database, benches in report["results"].items():
+        print(f"{database}:")
+        for bench, stats in benches.items():
+            print(f"  {bench:<38} p50 {stats['p50_ms']:9.2f} ms   p95 {stats['p95_ms']:9.2f} ms")
+    print(f"results written to {args.out}")
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        regressions = compare(report, baseline, args.threshold)
+        if regressions:
+            print(f"\n{len(regressions)} regression(s) against {args.compare} ({METRIC}, threshold {args.threshold:.0%}):")
+            for line in regressions:
+                print("  " + line)
+            if args.fail_on_regression:
+                return 1
+        else:
+            print(f"\nno regressions against {args.compare}")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(asyncio.run(main()))
@@ -1,23 +1,67 @@
+import os
+from contextlib import asynccontextmanager
+
 from fastapi import FastAPI
+from fastapi.concurrency import run_in_threadpool
 from fastapi.middleware.cors import CORSMiddleware
-from app.routers import auth, habits, dashboard
-from app import models
-from app.db import engine
-import os
+from app import config
+from app.routers import auth, habits, dashboard, export, analytics, metrics
+from app.services.group_commit import check_durability, close_group_commit_writers
+from app.services.hash_pool import hash_pool
+from app.services.metrics import MetricsMiddleware
+from app.services.rollover import rollover_scheduler
+from app.db import async_engine, engine
+from app.shards import get_shard_router
 
+def check_schema():
+    """
+    Migrations run once per deployment (``python -m app.migrations``); each
+    worker only makes sure none are pending, unless AUTO_MIGRATE is set.
+    """
+    # imported here so importing main never touches migration code
+    from app.migrations import pending_migrations, run_migrations
 
-# the method defined here is used to set up the database locally when uvicorn is run
-def create_tables_if_not_exist():
+    for name, target in [("Database", engine), *get_shard_router().named_engines()]:
+        if config.AUTO_MIGRATE:
+            run_migrations(target)
+            continue
+        pending = pending_migrations(target)
+        if pending:
+            raise RuntimeError(
+                f"{name} has unapplied migrations ({', '.join(pending)}). "
+                "Run `python -m app.migrations`, or set AUTO_MIGRATE=true for local development."
+            )
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # fail at startup rather than on the first check-in
+    check_durability(config.GROUP_COMMIT_DURABILITY)
     if os.getenv("ENV") != "test":
-        models.Base.metadata.create_all(bind=engine)
-create_tables_if_not_exist()
+        await run_in_threadpool(check_schema)
+        if config.DASHBOARD_PRECOMPUTE:
+            rollover_scheduler.start()
+    yield
+    await rollover_scheduler.stop()
+    await close_group_commit_writers()
+    hash_pool.shutdown()
+    await get_shard_router().dispose()
+    await async_engine.dispose()
+    engine.dispose()
+
 app = FastAPI(
-    title="Habit Tracker API"
+    title="Habit Tracker API",
+    lifespan=lifespan,
 )
 
 app.include_router(auth.router)
 app.include_router(habits.router)
 app.include_router(dashboard.router)
+app.include_router(export.router)
+app.include_router(analytics.router)
+
+if config.METRICS_ENABLED:
+    app.include_router(metrics.router)
+    app.add_middleware(MetricsMiddleware)
 
 app.add_middleware(
     CORSMiddleware,
@@ -1,18 +1,26 @@
 import os
+
+os.environ["ENV"] = "test"
+os.environ.setdefault("SECRET_KEY", "test-secret-key")
+# cheap hashes keep the auth fixtures fast; the pool still runs in processes
+os.environ.setdefault("BCRYPT_ROUNDS", "4")
+os.environ.setdefault("PASSWORD_HASH_WORKERS", "2")
+
 import pytest
 from fastapi.testclient import TestClient
 from sqlalchemy import create_engine
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
 from sqlalchemy.orm import sessionmaker
 from sqlalchemy.pool import StaticPool
 
 from main import app
-from app.dependencies import get_db
+from app.dependencies import get_directory_db
 from app import models
-
-os.environ["ENV"] = "test"
-os.environ.setdefault("SECRET_KEY", "test-secret-key")
+from app.services.dashboard_store import get_dashboard_store
+from app.services.user_cache import get_user_cache
 
 TEST_DATABASE_URL = "sqlite+pysqlite:///:memory:"
+TEST_ASYNC_DATABASE_URL = "sqlite+aiosqlite:///:memory:"
 
 engine = create_engine(
     TEST_DATABASE_URL,
@@ -41,22 +49,56 @@ def db_session():
         transaction.rollback()
         connection.close()
 
+async def _create_schema(async_engine):
+    async with async_engine.begin() as conn:
+        await conn.run_sync(models.Base.metadata.create_all)
+
+@pytest.fixture()
+def app_sessionmaker():
+    # each test gets a fresh in-memory database; the engine is created and
+    # disposed on the TestClient's event loop, which also serves the requests
+    async_engine = create_async_engine(
+        TEST_ASYNC_DATABASE_URL,
+        connect_args={"check_same_thread":False},
+        poolclass=StaticPool,
+    )
+    return async_sessionmaker(async_engine, autoflush=False, expire_on_commit=False)
+
 @pytest.fixture()
-def client(db_session):
+def client(app_sessionmaker):
+    async_engine = app_sessionmaker.kw["bind"]
 
-    def override_get_db():
-        try:
-            yield db_session
-        finally:
-            pass
+    async def override_get_db():
+        async with app_sessionmaker() as session:
+            yield session
 
-    app.dependency_overrides[get_db] = override_get_db
+    # unsharded, get_db hands out the directory session too
+    app.dependency_overrides[get_directory_db] = override_get_db
+    # user ids restart at 1 in every fresh database
+    get_user_cache().clear()
+    get_dashboard_store().clear()
 
     with TestClient(app) as c:
+        c.portal.call(_create_schema, async_engine)
         yield c
+        c.portal.call(async_engine.dispose)
 
     app.dependency_overrides.clear()
 
+@pytest.fixture()
+def app_db(client, app_sessionmaker):
+    """
+    Runs ``fn(session)`` with a sync Session on the database the client uses,
+    e.g. ``app_db(lambda db: db.query(models.User).count())``.
+    """
+    async def run(fn):
+        async with app_sessionmaker() as session:
+            result = await session.run_sync(fn)
+            await session.commit()
+            return result
+
+    return lambda fn: client.portal.call(run, fn)
+
 @pytest.fixture()
 def user_payload():
     return {
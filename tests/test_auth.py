@@ -1,3 +1,13 @@
+import asyncio
+from datetime import timedelta
+
+import pytest
+from fastapi import HTTPException
+
+from app import models, security
+from app.passwordhash import Hash
+from app.services.hash_pool import hash_pool
+
 def test_register_creates_user(client, user_payload):
     res = client.post("/auth/register", json=user_payload)
     assert res.status_code == 201, res.text
@@ -27,4 +37,53 @@ def test_auth_me_returns_current_user(client, auth_headers, user_payload):
     data = res.json()
 
     assert data["email"] == user_payload["email"]
-    assert data["username"] == user_payload["username"]
\ No newline at end of file
+    assert data["username"] == user_payload["username"]
+
+def test_login_rehashes_password_with_outdated_cost(client, app_db, user_payload, register_user):
+    def downgrade(db):
+        user = db.query(models.User).filter(models.User.username == user_payload["username"]).one()
+        user.password_hash = Hash.bcrypt(user_payload["password"], rounds=5)
+
+    app_db(downgrade)
+
+    res = client.post(
+        "/auth/login",
+        data={"username":user_payload["username"], "password":user_payload["password"]},
+        headers={"Content-Type":"application/x-www-form-urlencoded"},
+    )
+    assert res.status_code == 200, res.text
+
+    stored = app_db(
+        lambda db: db.query(models.User.password_hash)
+        .filter(models.User.username == user_payload["username"]).scalar()
+    )
+    assert Hash.cost(stored) == 4
+    assert Hash.verify(user_payload["password"], stored)
+
+def test_login_returns_503_when_hash_pool_is_saturated(client, user_payload, register_user, monkeypatch):
+    monkeypatch.setattr(hash_pool, "max_pending", 0)
+    res = client.post(
+        "/auth/login",
+        data={"username":user_payload["username"], "password":user_payload["password"]},
+        headers={"Content-Type":"application/x-www-form-urlencoded"},
+    )
+    assert res.status_code == 503, res.text
+    assert res.headers["Retry-After"] == "1"
+
+def test_verified_token_cache_hits_and_expires(monkeypatch):
+    cache = security.VerifiedTokenCache(maxsize=10)
+    monkeypatch.setattr(security, "token_cache", cache)
+
+    token = security.create_access_token(user_id=7)
+    first = asyncio.run(security.decode_access_token(token))
+    second = asyncio.run(security.decode_access_token(token))
+    assert first.sub == second.sub == 7
+    assert cache.stats()["hits"] == 1
+    assert cache.stats()["misses"] == 1
+
+    # an entry is never served past the token's own exp
+    expired = security.create_access_token(user_id=7, expires_delta=timedelta(seconds=-1))
+    cache.put(cache.key(expired), security.TokenPayload(sub=7, exp=1))
+    with pytest.raises(HTTPException) as exc:
+        asyncio.run(security.decode_access_token(expired))
+    assert exc.value.status_code == 401
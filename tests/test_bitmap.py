@@ -0,0 +1,95 @@
+import random
+from datetime import date, timedelta
+
+from app import config, models
+from app.services.bitmap import _longest_run, _run_ending_at, _to_int, completion_rate, is_set, new_bitmap, read_bitmap_streaks, set_days
+from app.services.streaks import compute_streaks_for_daily, compute_streaks_for_x_per_week
+
+def test_bitmap_streaks_match_python():
+    rng = random.Random(3)
+    start = date(2023, 1, 4)
+    for _ in range(300):
+        goal_type = rng.choice(["DAILY", "X_PER_WEEK"])
+        target = rng.randint(0, 8)
+        density = rng.random()
+        dates = [start + timedelta(days=i) for i in range(rng.randint(0, 200)) if rng.random() < density]
+
+        habit = models.Habit(start_date=start + timedelta(days=rng.randint(0, 30)))
+        bitmap = new_bitmap(habit)
+        # out of order and in several writes, like back-dated and bulk logs
+        shuffled = rng.sample(dates, len(dates))
+        set_days(bitmap, shuffled[: len(shuffled) // 2])
+        set_days(bitmap, shuffled[len(shuffled) // 2:])
+        assert bitmap.origin.weekday() == 0
+
+        for _ in range(3):
+            today = start + timedelta(days=rng.randint(-5, 230))
+            past = [d for d in dates if d <= today]
+            if goal_type == "DAILY":
+                expected = compute_streaks_for_daily(past, today)
+            else:
+                expected = compute_streaks_for_x_per_week(past, today, target)
+            got = read_bitmap_streaks(bitmap, goal_type, target, today)
+            assert got == (today in dates, *expected), (goal_type, target, today, dates)
+
+def test_bitmap_rate_and_lookup():
+    habit = models.Habit(start_date=date(2024, 5, 1))
+    bitmap = new_bitmap(habit)
+    set_days(bitmap, [date(2024, 5, 1), date(2024, 5, 2), date(2024, 5, 4)])
+    assert is_set(bitmap, date(2024, 5, 2))
+    assert not is_set(bitmap, date(2024, 5, 3))
+    assert not is_set(bitmap, date(2023, 1, 1))
+    bits = _to_int(bitmap.bits)
+    assert completion_rate(bits, bitmap.origin, date(2024, 5, 1), date(2024, 5, 4)) == 0.75
+    assert completion_rate(bits, bitmap.origin, date(2024, 4, 1), date(2024, 4, 30)) == 0.0
+    # three years of daily history stays a few hundred bytes
+    set_days(bitmap, [date(2024, 5, 1) + timedelta(days=i) for i in range(3 * 365)])
+    assert len(bitmap.bits) <= 140
+
+def test_strided_runs_match_a_scan():
+    rng = random.Random(5)
+    for _ in range(300):
+        stride = rng.randint(1, 9)
+        bits = rng.getrandbits(rng.randint(1, 120))
+        position = rng.randint(0, 130)
+
+        def is_on(i):
+            return i >= 0 and bool((bits >> i) & 1)
+
+        ending = 0
+        while is_on(position - ending * stride):
+            ending += 1
+        longest = 0
+        for i in range(bits.bit_length()):
+            length = 0
+            while is_on(i + length * stride):
+                length += 1
+            longest = max(longest, length)
+        assert _run_ending_at(bits, position, stride) == ending, (bits, position, stride)
+        assert _longest_run(bits, stride) == longest, (bits, stride)
+
+def test_dashboard_with_bitmap_backend(client, auth_headers, monkeypatch):
+    monkeypatch.setattr(config, "STREAK_BACKEND", "bitmap")
+    today = date.fromisoformat(client.get("/dashboard/today", headers=auth_headers).json()["date"])
+
+    hres = client.post(
+        "/habits/",
+        json={"name": "Read", "goal_type": "DAILY", "start_date": str(today - timedelta(days=10))},
+        headers=auth_headers,
+    )
+    habit_id = hres.json()["id"]
+    for offset in (0, 1, 4, 5, 6):
+        res = client.post(f"/habits/{habit_id}/logs", json={"date": str(today - timedelta(days=offset))}, headers=auth_headers)
+        assert res.status_code == 201, res.text
+    res = client.post(
+        "/habits/logs/bulk",
+        json=[{"habit_id": habit_id, "date": str(today - timedelta(days=offset))} for offset in (2, 7)],
+        headers=auth_headers,
+    )
+    assert res.json()["created"] == 2
+
+    data = client.get("/dashboard/today", headers=auth_headers).json()
+    item = next(i for i in data["habits"] if i["habit"]["id"] == habit_id)
+    assert item["is_completed"] is True
+    assert item["current_streak"] == 3
+    assert item["best_streak"] == 4
@@ -1,5 +1,11 @@
 from datetime import date
 
+from sqlalchemy import event, insert, select
+
+from app import models
+from app.services.bitmap import is_set
+from app.services.checkin import toggle_today
+
 def test_dashboard_today_returns_habits_and_completion(client, auth_headers):
     initial = client.get("/dashboard/today", headers=auth_headers)
     assert initial.status_code == 200, initial.text
@@ -46,4 +52,129 @@ def test_dashboard_today_returns_habits_and_completion(client, auth_headers):
 
     by_id = {item["habit"]["id"]: item for item in data["habits"]}
     assert by_id[h1["id"]]["is_completed"] is True
-    assert by_id[h2["id"]]["is_completed"] is False
\ No newline at end of file
+    assert by_id[h2["id"]]["is_completed"] is False
+
+def test_dashboard_range_returns_day_strings_and_streaks_as_of_end(client, auth_headers):
+    daily = client.post(
+        "/habits/",
+        json={"name": "Run", "goal_type": "DAILY", "target_per_period": 1, "start_date": "2024-01-01"},
+        headers=auth_headers,
+    ).json()
+    weekly = client.post(
+        "/habits/",
+        json={"name": "Gym", "goal_type": "X_PER_WEEK", "target_per_period": 2, "start_date": "2024-01-01"},
+        headers=auth_headers,
+    ).json()
+    client.post(
+        "/habits/logs/bulk",
+        json=[{"habit_id": daily["id"], "date": f"2024-01-0{d}"} for d in (1, 2, 3, 5, 6, 8)]
+        + [{"habit_id": weekly["id"], "date": d} for d in ("2024-01-02", "2024-01-04", "2024-01-09", "2024-01-10")],
+        headers=auth_headers,
+    )
+
+    res = client.get("/dashboard/range", params={"from": "2024-01-02", "to": "2024-01-06"}, headers=auth_headers)
+    assert res.status_code == 200, res.text
+    data = res.json()
+    assert (data["start"], data["end"]) == ("2024-01-02", "2024-01-06")
+    by_id = {item["habit"]["id"]: item for item in data["habits"]}
+    # logs after the end date count for neither the days nor the streaks
+    assert by_id[daily["id"]]["days"] == "11011"
+    assert (by_id[daily["id"]]["current_streak"], by_id[daily["id"]]["best_streak"]) == (2, 3)
+    assert by_id[daily["id"]]["completion_rate"] == 0.8
+    assert by_id[weekly["id"]]["days"] == "10100"
+    assert (by_id[weekly["id"]]["current_streak"], by_id[weekly["id"]]["best_streak"]) == (1, 1)
+
+    before_start = client.get("/dashboard/range", params={"from": "2023-12-30", "to": "2024-01-01"}, headers=auth_headers)
+    assert {item["days"] for item in before_start.json()["habits"]} == {"001", "000"}
+    # only the day since the start date counts
+    assert {item["completion_rate"] for item in before_start.json()["habits"]} == {1.0, 0.0}
+
+def test_dashboard_range_rejects_bad_ranges(client, auth_headers):
+    inverted = client.get("/dashboard/range", params={"from": "2024-02-01", "to": "2024-01-01"}, headers=auth_headers)
+    assert inverted.status_code == 400
+    too_long = client.get("/dashboard/range", params={"from": "2022-12-31", "to": "2024-01-01"}, headers=auth_headers)
+    assert too_long.status_code == 400
+
+def test_checkin_toggles_today_for_several_habits(client, auth_headers, app_db):
+    today = client.get("/dashboard/today", headers=auth_headers).json()["date"]
+    ids = [
+        client.post(
+            "/habits/",
+            json={"name": name, "goal_type": "DAILY", "target_per_period": 1, "start_date": "2024-01-01"},
+            headers=auth_headers,
+        ).json()["id"]
+        for name in ("Water", "Walk", "Journal")
+    ]
+    client.post(f"/habits/{ids[1]}/logs", json={"date": today}, headers=auth_headers)
+
+    res = client.post("/dashboard/today/checkin", json={"habit_ids": ids[:2]}, headers=auth_headers)
+    assert res.status_code == 200, res.text
+    data = res.json()
+    assert data["date"] == today
+    # only the habits asked about, each flipped
+    assert [(i["habit"]["id"], i["is_completed"], i["current_streak"]) for i in data["habits"]] == [
+        (ids[0], True, 1),
+        (ids[1], False, 0),
+    ]
+    by_id = {i["habit"]["id"]: i for i in client.get("/dashboard/today", headers=auth_headers).json()["habits"]}
+    assert [by_id[i]["is_completed"] for i in ids] == [True, False, False]
+
+    # derived tables match a rebuild after a removal
+    def derived(db):
+        habit = db.get(models.Habit, ids[1])
+        rollups = db.scalars(select(models.HabitRollup).where(models.HabitRollup.habit_id == ids[1])).all()
+        return habit.streak_state.best_run, is_set(habit.completion_bitmap, date.fromisoformat(today)), rollups
+
+    assert app_db(derived) == (0, False, [])
+
+    missing = client.post("/dashboard/today/checkin", json={"habit_ids": [ids[2], 999]}, headers=auth_headers)
+    assert missing.status_code == 404
+    # nothing is written when any id is unknown
+    assert app_db(lambda db: db.scalar(select(models.HabitLog).where(models.HabitLog.habit_id == ids[2]))) is None
+    assert client.post("/dashboard/today/checkin", json={"habit_ids": []}, headers=auth_headers).status_code == 422
+
+def test_checkin_that_changes_nothing_keeps_the_data_version(client, auth_headers, app_db):
+    today = date.fromisoformat(client.get("/dashboard/today", headers=auth_headers).json()["date"])
+    habit_id = client.post(
+        "/habits/",
+        json={"name": "Water", "goal_type": "DAILY", "target_per_period": 1, "start_date": "2024-01-01"},
+        headers=auth_headers,
+    ).json()["id"]
+    version = app_db(lambda db: db.get(models.User, 1).data_version)
+
+    def check_in_racing_another(db):
+        # another check-in logs the habit between the lookup and the insert
+        raced = []
+
+        def race(orm_execute_state):
+            if orm_execute_state.is_insert and not raced:
+                raced.append(True)
+                db.execute(insert(models.HabitLog).values(habit_id=habit_id, user_id=1, date=today))
+
+        event.listen(db, "do_orm_execute", race)
+        try:
+            return toggle_today(db, db.get(models.User, 1), [habit_id], today)
+        finally:
+            event.remove(db, "do_orm_execute", race)
+
+    _, changed = app_db(check_in_racing_another)
+    assert changed == []
+    assert app_db(lambda db: db.get(models.User, 1).data_version) == version
+
+def test_checkin_rejects_habits_not_on_todays_dashboard(client, auth_headers, app_db):
+    archived = client.post(
+        "/habits/",
+        json={"name": "Old", "goal_type": "DAILY", "target_per_period": 1, "start_date": "2024-01-01"},
+        headers=auth_headers,
+    ).json()["id"]
+    client.delete(f"/habits/{archived}", headers=auth_headers)
+    future = client.post(
+        "/habits/",
+        json={"name": "Later", "goal_type": "DAILY", "target_per_period": 1, "start_date": "2099-01-01"},
+        headers=auth_headers,
+    ).json()["id"]
+
+    for habit_id in (archived, future):
+        res = client.post("/dashboard/today/checkin", json={"habit_ids": [habit_id]}, headers=auth_headers)
+        assert res.status_code == 404
+    assert app_db(lambda db: db.scalar(select(models.HabitLog))) is None
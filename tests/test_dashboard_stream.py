@@ -0,0 +1,50 @@
+import json
+
+from app import models
+from app.services.dashboard_events import dashboard_stream, get_dashboard_events
+
+def _event(chunk):
+    name, data = chunk.strip().split("\n")
+    return name.removeprefix("event: "), json.loads(data.removeprefix("data: "))
+
+def test_stream_sends_snapshot_then_deltas(client, auth_headers, app_sessionmaker):
+    habit = client.post(
+        "/habits/",
+        json={"name": "Floss", "goal_type": "DAILY", "target_per_period": 1, "start_date": "2024-01-01"},
+        headers=auth_headers,
+    ).json()
+    other = client.post(
+        "/habits/",
+        json={"name": "Read", "goal_type": "DAILY", "target_per_period": 1, "start_date": "2024-01-01"},
+        headers=auth_headers,
+    ).json()
+
+    user = models.User(id=habit["user_id"], timezone="EST")
+    stream = dashboard_stream(app_sessionmaker(), user, heartbeat_seconds=0.05)
+    next_event = lambda: client.portal.call(stream.__anext__)
+    try:
+        name, snapshot = _event(next_event())
+        assert name == "snapshot"
+        assert {item["habit"]["id"] for item in snapshot["habits"]} == {habit["id"], other["id"]}
+        assert get_dashboard_events().subscriber_count() == 1
+
+        client.post(f"/habits/{habit['id']}/logs", json={"date": snapshot["date"]}, headers=auth_headers)
+        name, delta = _event(next_event())
+        assert name == "habits"
+        assert [(i["habit"]["id"], i["is_completed"], i["current_streak"]) for i in delta["habits"]] == [
+            (habit["id"], True, 1),
+        ]
+        assert delta["removed"] == []
+
+        client.delete(f"/habits/{other['id']}", headers=auth_headers)
+        name, delta = _event(next_event())
+        assert (delta["habits"], delta["removed"]) == ([], [other["id"]])
+
+        # nothing changed: a keep-alive comment
+        assert next_event() == ": ping\n\n"
+    finally:
+        client.portal.call(stream.aclose)
+    assert get_dashboard_events().subscriber_count() == 0
+
+def test_stream_requires_auth(client):
+    assert client.get("/dashboard/stream").status_code == 401
@@ -0,0 +1,36 @@
+import pytest
+from sqlalchemy import text
+
+import main
+from app import config
+from app.db import create_engines, sqlite_pragmas
+from app.migrations import pending_migrations
+
+def test_tuned_profile_is_applied_on_connect(tmp_path):
+    path = tmp_path / "tuned.db"
+    sync_engine, async_engine = create_engines(f"sqlite:///{path}", f"sqlite+aiosqlite:///{path}", "tuned")
+    try:
+        with sync_engine.connect() as conn:
+            assert conn.execute(text("PRAGMA journal_mode")).scalar() == "wal"
+            # 1 = NORMAL
+            assert conn.execute(text("PRAGMA synchronous")).scalar() == 1
+            assert conn.execute(text("PRAGMA busy_timeout")).scalar() == int(sqlite_pragmas("tuned")["busy_timeout"])
+    finally:
+        sync_engine.dispose()
+
+def test_unknown_sqlite_profile_is_rejected():
+    with pytest.raises(ValueError):
+        sqlite_pragmas("fast")
+
+def test_workers_refuse_to_start_with_pending_migrations(tmp_path, monkeypatch):
+    sync_engine, _ = create_engines(f"sqlite:///{tmp_path / 'app.db'}", f"sqlite+aiosqlite:///{tmp_path / 'app.db'}")
+    monkeypatch.setattr(main, "engine", sync_engine)
+    try:
+        with pytest.raises(RuntimeError, match="python -m app.migrations"):
+            main.check_schema()
+
+        monkeypatch.setattr(config, "AUTO_MIGRATE", True)
+        main.check_schema()
+        assert pending_migrations(sync_engine) == []
+    finally:
+        sync_engine.dispose()
@@ -0,0 +1,45 @@
+from datetime import date
+
+from sqlalchemy import event
+
+def test_dashboard_conditional_get(client, auth_headers, app_sessionmaker):
+    first = client.get("/dashboard/today", headers=auth_headers)
+    etag = first.headers["etag"]
+    today = date.fromisoformat(first.json()["date"])
+
+    statements = []
+    sync_engine = app_sessionmaker.kw["bind"].sync_engine
+    record = lambda conn, cursor, statement, *args: statements.append(statement)
+    event.listen(sync_engine, "before_cursor_execute", record)
+    try:
+        res = client.get("/dashboard/today", headers={**auth_headers, "If-None-Match": etag})
+    finally:
+        event.remove(sync_engine, "before_cursor_execute", record)
+    assert res.status_code == 304
+    assert res.content == b""
+    assert res.headers["etag"] == etag
+    assert not any("habits" in s or "habit_logs" in s for s in statements), statements
+
+    hres = client.post(
+        "/habits/", json={"name": "Walk", "goal_type": "DAILY", "start_date": str(today)}, headers=auth_headers,
+    )
+    res = client.get("/dashboard/today", headers={**auth_headers, "If-None-Match": etag})
+    assert res.status_code == 200
+    assert res.headers["etag"] != etag
+    etag = res.headers["etag"]
+
+    client.post(f"/habits/{hres.json()['id']}/logs", json={"date": str(today)}, headers=auth_headers)
+    res = client.get("/dashboard/today", headers={**auth_headers, "If-None-Match": etag})
+    assert res.status_code == 200
+    assert res.json()["habits"][0]["is_completed"] is True
+
+def test_habit_listing_etag_depends_on_query(client, auth_headers):
+    plain = client.get("/habits/", headers=auth_headers).headers["etag"]
+    archived = client.get("/habits/?include_archived=true", headers=auth_headers).headers["etag"]
+    assert plain != archived
+
+    res = client.get("/habits/", headers={**auth_headers, "If-None-Match": f'W/{plain}, "other"'})
+    assert res.status_code == 304
+
+    client.post("/habits/logs/bulk", json=[], headers=auth_headers)
+    assert client.get("/habits/", headers={**auth_headers, "If-None-Match": plain}).status_code == 304
@@ -0,0 +1,52 @@
+import csv
+import gzip
+import io
+import json
+
+def _seed(client, auth_headers):
+    hres = client.post(
+        "/habits/",
+        json={"name":"Read", "goal_type":"DAILY", "start_date":"2024-01-01"},
+        headers=auth_headers,
+    )
+    habit_id = hres.json()["id"]
+    client.post(
+        "/habits/logs/bulk",
+        json=[{"habit_id": habit_id, "date": f"2024-01-{day:02d}"} for day in range(1, 11)],
+        headers=auth_headers,
+    )
+    empty = client.post(
+        "/habits/",
+        json={"name":"Swim", "goal_type":"WEEKLY", "start_date":"2024-01-01"},
+        headers=auth_headers,
+    )
+    return habit_id, empty.json()["id"]
+
+def test_export_ndjson(client, auth_headers):
+    habit_id, _ = _seed(client, auth_headers)
+
+    res = client.get("/export?format=ndjson", headers=auth_headers)
+    assert res.status_code == 200, res.text
+    assert res.headers["content-type"].startswith("application/x-ndjson")
+
+    records = [json.loads(line) for line in res.text.splitlines()]
+    assert [r["type"] for r in records].count("habit") == 2
+    logs = [r for r in records if r["type"] == "log"]
+    assert len(logs) == 10
+    assert logs[0] == {**logs[0], "habit_id": habit_id, "date": "2024-01-01"}
+
+def test_export_csv_gzip(client, auth_headers):
+    habit_id, empty_id = _seed(client, auth_headers)
+
+    res = client.get("/export?format=csv&gzip=true", headers=auth_headers)
+    assert res.status_code == 200, res.text
+    assert res.headers["content-type"] == "application/gzip"
+    assert "content-encoding" not in res.headers
+    assert res.headers["content-disposition"] == 'attachment; filename="habit-tracker-export.csv.gz"'
+
+    # the file itself is gzip, not decoded on the way
+    body = gzip.decompress(res.content)
+    rows = list(csv.DictReader(io.StringIO(body.decode())))
+    assert len(rows) == 11
+    assert sum(1 for r in rows if r["habit_id"] == str(habit_id)) == 10
+    assert [r["log_id"] for r in rows if r["habit_id"] == str(empty_id)] == [""]
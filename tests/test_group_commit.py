@@ -0,0 +1,64 @@
+import asyncio
+
+import httpx
+import pytest
+
+from app import config, models
+from app.services.group_commit import GroupCommitSaturated, GroupCommitWriter, _writers, check_durability
+from main import app
+
+def test_concurrent_check_ins_share_commits(client, auth_headers, app_db, monkeypatch):
+    monkeypatch.setattr(config, "GROUP_COMMIT", True)
+    monkeypatch.setattr(config, "GROUP_COMMIT_WINDOW_MS", 20)
+    habit_id = client.post(
+        "/habits/",
+        json={"name": "Stretch", "goal_type": "DAILY", "target_per_period": 1, "start_date": "2024-01-01"},
+        headers=auth_headers,
+    ).json()["id"]
+    version = app_db(lambda db: db.get(models.User, 1).data_version)
+
+    # ten days, with the last one sent twice
+    days = [f"2024-01-{d:02d}" for d in range(1, 11)] + ["2024-01-10"]
+
+    async def check_in_all():
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as ac:
+            return await asyncio.gather(*(
+                ac.post(f"/habits/{habit_id}/logs", json={"date": day}, headers=auth_headers) for day in days
+            ))
+
+    responses = client.portal.call(check_in_all)
+    assert sorted(r.status_code for r in responses) == [201] * 10 + [400]
+    created = [r.json() for r in responses if r.status_code == 201]
+    assert sorted(log["date"] for log in created) == days[:10]
+    assert all(log["id"] and log["habit_id"] == habit_id for log in created)
+
+    writer = next(iter(_writers.values()))
+    assert writer.rows == 11 and writer.batches < 11
+    # one bump per user per batch
+    assert version < app_db(lambda db: db.get(models.User, 1).data_version) <= version + writer.batches
+
+    logs = client.get(f"/habits/{habit_id}/logs", headers=auth_headers).json()
+    assert len(logs) == 10
+    assert app_db(lambda db: db.get(models.HabitStreakState, habit_id).best_run) == 10
+
+def test_full_queue_rejects_new_logs(client, app_sessionmaker):
+    async def submit_two():
+        writer = GroupCommitWriter(app_sessionmaker.kw["bind"], 10, 256, max_pending=1)
+        try:
+            # the second lands before the writer has taken the first off the queue
+            return await asyncio.gather(
+                writer.submit(1, 1, {"date": "2024-01-01"}),
+                writer.submit(1, 1, {"date": "2024-01-02"}),
+                return_exceptions=True,
+            )
+        finally:
+            writer._task.cancel()
+
+    first, second = client.portal.call(asyncio.wait_for, submit_two(), 5)
+    assert isinstance(second, GroupCommitSaturated)
+
+def test_unknown_durability_is_rejected():
+    check_durability("full")
+    with pytest.raises(ValueError):
+        check_durability("fsync")
@@ -1,5 +1,11 @@
 from datetime import date
 
+from sqlalchemy import event, insert, select
+
+from app import models, schemas
+from app.services import log_ingest
+from app.services.log_ingest import ingest_logs
+
 def test_create_habit_authenticated(client, auth_headers):
     payload = {
         "name":"Workout",
@@ -35,4 +41,147 @@ def test_create_habit_log_for_today(client, auth_headers):
     log = lres.json()
 
     assert log["habit_id"] == habit_id
-    assert log["date"] == str(date.today())
\ No newline at end of file
+    assert log["date"] == str(date.today())
+
+def test_duplicate_habit_log_is_rejected(client, auth_headers):
+    habit_payload = {
+        "name":"Journal",
+        "goal_type":"DAILY",
+        "start_date": str(date.today()),
+    }
+    hres = client.post("/habits/", json=habit_payload, headers=auth_headers)
+    assert hres.status_code == 201, hres.text
+    habit_id = hres.json()["id"]
+
+    log_payload = {"date":str(date.today()), "value":1}
+    first = client.post(f"/habits/{habit_id}/logs", json=log_payload, headers=auth_headers)
+    assert first.status_code == 201, first.text
+
+    second = client.post(f"/habits/{habit_id}/logs", json=log_payload, headers=auth_headers)
+    assert second.status_code == 400, second.text
+
+    logs = client.get(f"/habits/{habit_id}/logs", headers=auth_headers).json()
+    assert len(logs) == 1
+
+def test_bulk_create_habit_logs(client, auth_headers):
+    habit_payload = {"name":"Walk", "goal_type":"DAILY", "start_date": "2024-01-01"}
+    hres = client.post("/habits/", json=habit_payload, headers=auth_headers)
+    assert hres.status_code == 201, hres.text
+    habit_id = hres.json()["id"]
+
+    items = [
+        {"habit_id": habit_id, "date": "2024-01-01"},
+        {"habit_id": habit_id, "date": "2024-01-02", "value": 2},
+        {"habit_id": habit_id, "date": "2024-01-01"},
+        {"habit_id": habit_id + 1000, "date": "2024-01-01"},
+        {"habit_id": habit_id, "date": "not-a-date"},
+    ]
+    res = client.post("/habits/logs/bulk", json=items, headers=auth_headers)
+    assert res.status_code == 200, res.text
+    data = res.json()
+
+    assert data["created"] == 2
+    assert data["skipped"] == 3
+    assert [r["status"] for r in data["results"]] == [
+        "created", "created", "duplicate", "not_found", "invalid",
+    ]
+
+    ndjson = '{"habit_id": %d, "date": "2024-01-02"}\n{"habit_id": %d, "date": "2024-01-03"}\n' % (habit_id, habit_id)
+    res = client.post(
+        "/habits/logs/bulk",
+        content=ndjson,
+        headers={**auth_headers, "Content-Type": "application/x-ndjson"},
+    )
+    assert res.status_code == 200, res.text
+    assert [r["status"] for r in res.json()["results"]] == ["duplicate", "created"]
+
+    logs = client.get(f"/habits/{habit_id}/logs", headers=auth_headers).json()
+    assert [log["date"] for log in logs] == ["2024-01-01", "2024-01-02", "2024-01-03"]
+
+def test_oversized_bulk_body_is_refused_before_it_is_read(client, auth_headers, monkeypatch):
+    monkeypatch.setattr(log_ingest, "MAX_BULK_BYTES", 100)
+    body = b"[" + b",".join(b'{"habit_id": 1, "date": "2024-01-01"}' for _ in range(5)) + b"]"
+    # by its Content-Length
+    res = client.post("/habits/logs/bulk", content=body, headers={**auth_headers, "Content-Type": "application/json"})
+    assert res.status_code == 413
+    # chunked, without one
+    res = client.post(
+        "/habits/logs/bulk",
+        content=iter([body[:60], body[60:]]),
+        headers={**auth_headers, "Content-Type": "application/json"},
+    )
+    assert res.status_code == 413
+
+def test_bulk_logs_lost_to_a_concurrent_writer_are_not_counted(client, auth_headers, app_db):
+    habit_id = client.post(
+        "/habits/", json={"name": "Swim", "goal_type": "DAILY", "start_date": "2024-01-01"}, headers=auth_headers,
+    ).json()["id"]
+    items = [
+        schemas.HabitLogBulkItem(habit_id=habit_id, date=date(2024, 1, 1)),
+        schemas.HabitLogBulkItem(habit_id=habit_id, date=date(2024, 1, 2)),
+    ]
+
+    def ingest_racing_another_writer(db):
+        # another request inserts 2024-01-02 between the duplicate check and the insert
+        raced = []
+
+        def race(orm_execute_state):
+            if orm_execute_state.is_insert and not raced:
+                raced.append(True)
+                db.execute(insert(models.HabitLog).values(habit_id=habit_id, user_id=1, date=date(2024, 1, 2)))
+
+        event.listen(db, "do_orm_execute", race)
+        try:
+            return ingest_logs(db, db.get(models.User, 1), items)
+        finally:
+            event.remove(db, "do_orm_execute", race)
+
+    result = app_db(ingest_racing_another_writer)
+    assert (result.created, result.skipped) == (1, 1)
+    assert [r.status.value for r in result.results] == ["created", "duplicate"]
+    rollups = app_db(lambda db: db.scalars(
+        select(models.HabitRollup.log_count).where(models.HabitRollup.habit_id == habit_id)
+    ).all())
+    # only the row this request inserted was added on top of the racing one
+    assert rollups == [1, 1]
+
+def test_keyset_pagination_for_habits_and_logs(client, auth_headers):
+    for i in range(5):
+        res = client.post(
+            "/habits/",
+            json={"name":f"Habit {i}", "goal_type":"DAILY", "start_date":"2024-01-01"},
+            headers=auth_headers,
+        )
+        assert res.status_code == 201, res.text
+
+    legacy = client.get("/habits/", headers=auth_headers).json()
+    assert isinstance(legacy, list) and len(legacy) == 5
+
+    seen, cursor = [], None
+    while True:
+        params = {"limit": 2, **({"cursor": cursor} if cursor else {})}
+        page = client.get("/habits/", params=params, headers=auth_headers).json()
+        seen += [h["id"] for h in page["items"]]
+        cursor = page["next_cursor"]
+        if cursor is None:
+            break
+    assert seen == [h["id"] for h in legacy]
+
+    habit_id = legacy[0]["id"]
+    client.post(
+        "/habits/logs/bulk",
+        json=[{"habit_id": habit_id, "date": f"2024-02-{day:02d}"} for day in range(1, 8)],
+        headers=auth_headers,
+    )
+    first = client.get(f"/habits/{habit_id}/logs", params={"limit": 3, "from": "2024-02-02"}, headers=auth_headers).json()
+    assert [log["date"] for log in first["items"]] == ["2024-02-02", "2024-02-03", "2024-02-04"]
+    second = client.get(
+        f"/habits/{habit_id}/logs",
+        params={"limit": 3, "from": "2024-02-02", "cursor": first["next_cursor"]},
+        headers=auth_headers,
+    ).json()
+    assert [log["date"] for log in second["items"]] == ["2024-02-05", "2024-02-06", "2024-02-07"]
+    assert second["next_cursor"] is None
+
+    bad = client.get(f"/habits/{habit_id}/logs", params={"cursor": "garbage"}, headers=auth_headers)
+    assert bad.status_code == 400
@@ -0,0 +1,56 @@
+import re
+from datetime import date
+
+import pytest
+from sqlalchemy import create_engine, text
+from sqlalchemy.exc import OperationalError
+
+from app.services.metrics import _QUERY_STARTED, Histogram, RequestTimings, _current, instrument_engine
+
+def test_server_timing_and_metrics_endpoint(client, auth_headers, app_sessionmaker):
+    instrument_engine(app_sessionmaker.kw["bind"].sync_engine)
+    today = date.fromisoformat(client.get("/dashboard/today", headers=auth_headers).json()["date"])
+    client.post("/habits/", json={"name": "Floss", "goal_type": "DAILY", "start_date": str(today)}, headers=auth_headers)
+
+    res = client.get("/dashboard/today", headers=auth_headers)
+    timing = res.headers["server-timing"]
+    queries = int(re.search(r'db;desc="(\d+) queries";dur=[\d.]+', timing).group(1))
+    assert queries >= 2
+    assert "streaks;dur=" in timing
+    assert "total;dur=" in timing
+
+    body = client.get("/metrics").text
+    assert 'http_request_duration_seconds_count{method="GET",route="/dashboard/today"}' in body
+    assert re.search(r'http_request_sql_queries_bucket\{method="GET",route="/dashboard/today",le="\+Inf"\} \d+', body)
+    assert 'http_request_phase_duration_seconds_sum{method="GET",route="/dashboard/today",phase="streaks"}' in body
+    assert 'user_cache{stat="hits"}' in body
+    # the path template, not the raw path, so ids don't create new series
+    client.get("/habits/12345", headers=auth_headers)
+    assert 'route="/habits/{habit_id}"' in client.get("/metrics").text
+
+def test_failed_statements_leave_no_start_times_behind():
+    engine = create_engine("sqlite://")
+    instrument_engine(engine)
+    timings = RequestTimings()
+    token = _current.set(timings)
+    try:
+        with engine.connect() as conn:
+            for _ in range(3):
+                with pytest.raises(OperationalError):
+                    conn.execute(text("SELECT * FROM missing"))
+            conn.execute(text("SELECT 1"))
+            assert conn.info[_QUERY_STARTED] == []
+    finally:
+        _current.reset(token)
+        engine.dispose()
+    assert timings.queries == 4
+
+def test_histogram_renders_cumulative_buckets():
+    h = Histogram("demo_seconds", "Demo.", ("route",), (0.1, 1.0))
+    for value in (0.05, 0.5, 0.5, 3.0):
+        h.observe(("/x",), value)
+    lines = h.render()
+    assert 'demo_seconds_bucket{route="/x",le="0.1"} 1' in lines
+    assert 'demo_seconds_bucket{route="/x",le="1"} 3' in lines
+    assert 'demo_seconds_bucket{route="/x",le="+Inf"} 4' in lines
+    assert 'demo_seconds_count{route="/x"} 4' in lines
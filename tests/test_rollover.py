@@ -0,0 +1,62 @@
+from datetime import date, datetime, timezone
+
+from app import config
+from app.routers import dashboard as dashboard_router
+from app.services.dashboard_store import get_dashboard_store
+from app.services.leases import hold_lease, release_lease
+from app.services.rollover import next_rollover, overdue_zones, precompute_dashboards, users_by_timezone
+
+def test_next_rollover_groups_zones_sharing_a_midnight():
+    now = datetime(2024, 3, 10, 12, tzinfo=timezone.utc)
+    when, zones = next_rollover(["America/New_York", "UTC", "Europe/London", "EST"], now)
+    assert when == datetime(2024, 3, 11, tzinfo=timezone.utc)
+    assert sorted(zones) == ["Europe/London", "UTC"]
+
+def test_midnights_passed_during_a_build_are_overdue():
+    # Kolkata (+05:30) and Kathmandu (+05:45) reached midnight while an
+    # earlier group was being built; UTC is still on the day it has
+    done = {"UTC": date(2024, 3, 10), "Asia/Kathmandu": date(2024, 3, 10), "Asia/Kolkata": date(2024, 3, 10)}
+    now = datetime(2024, 3, 10, 18, 40, tzinfo=timezone.utc)
+    assert overdue_zones(done, now) == {"Asia/Kathmandu": date(2024, 3, 11), "Asia/Kolkata": date(2024, 3, 11)}
+    assert overdue_zones({**done, "Asia/Kathmandu": date(2024, 3, 11), "Asia/Kolkata": date(2024, 3, 11)}, now) == {}
+
+def test_dashboard_is_served_from_precomputed_payload(client, auth_headers, app_db, monkeypatch):
+    today = date.fromisoformat(client.get("/dashboard/today", headers=auth_headers).json()["date"])
+    habit_id = client.post(
+        "/habits/",
+        json={"name": "Read", "goal_type": "DAILY", "target_per_period": 1, "start_date": "2024-01-01"},
+        headers=auth_headers,
+    ).json()["id"]
+    live = client.get("/dashboard/today", headers=auth_headers).json()
+
+    monkeypatch.setattr(config, "DASHBOARD_PRECOMPUTE", True)
+    groups = app_db(users_by_timezone)
+    assert groups == {"EST": [1]}
+    app_db(lambda db: precompute_dashboards(db, groups["EST"], today))
+    # another worker: nothing in its own store, only the saved snapshot
+    get_dashboard_store().clear()
+
+    builds = []
+    build = dashboard_router.build_today_payload
+    monkeypatch.setattr(
+        dashboard_router, "build_today_payload", lambda *args: builds.append(args) or build(*args),
+    )
+    assert client.get("/dashboard/today", headers=auth_headers).json() == live
+    assert builds == []
+
+    # a write bumps data_version, so the stored payload no longer applies
+    client.post(f"/habits/{habit_id}/logs", json={"date": str(today)}, headers=auth_headers)
+    res = client.get("/dashboard/today", headers=auth_headers).json()
+    assert len(builds) == 1
+    assert res["habits"][0]["is_completed"] is True
+
+def test_only_one_worker_holds_the_precompute_lease(db_session):
+    assert hold_lease(db_session, "job", "a", ttl=60, now=1000)
+    assert not hold_lease(db_session, "job", "b", ttl=60, now=1030)
+    # the holder renews; the other takes over only once it has lapsed
+    assert hold_lease(db_session, "job", "a", ttl=60, now=1050)
+    assert not hold_lease(db_session, "job", "b", ttl=60, now=1100)
+    assert hold_lease(db_session, "job", "b", ttl=60, now=1111)
+    assert not hold_lease(db_session, "job", "a", ttl=60, now=1112)
+    release_lease(db_session, "job", "b")
+    assert hold_lease(db_session, "job", "a", ttl=60, now=1113)
@@ -0,0 +1,64 @@
+from sqlalchemy import select
+
+from app import models
+from app.services.rollups import rebuild_all_rollups
+
+def _rollup_rows(db):
+    return sorted(
+        (r.habit_id, r.period, r.period_start, r.log_count, r.value_sum, r.target, r.met)
+        for r in db.scalars(select(models.HabitRollup))
+    )
+
+def test_rollups_follow_log_writes_and_goal_changes(client, auth_headers, app_db):
+    hres = client.post(
+        "/habits/",
+        json={"name": "Yoga", "goal_type": "X_PER_WEEK", "target_per_period": 2, "start_date": "2024-01-01"},
+        headers=auth_headers,
+    )
+    habit_id = hres.json()["id"]
+    client.post(f"/habits/{habit_id}/logs", json={"date": "2024-01-02", "value": 3}, headers=auth_headers)
+    client.post(
+        "/habits/logs/bulk",
+        json=[
+            {"habit_id": habit_id, "date": "2024-01-04", "value": 2},
+            {"habit_id": habit_id, "date": "2024-01-10"},
+            {"habit_id": habit_id, "date": "2024-02-01"},
+        ],
+        headers=auth_headers,
+    )
+
+    weeks = client.get(
+        "/analytics/rollups", params={"period": "week", "from": "2024-01-03", "to": "2024-01-31"}, headers=auth_headers,
+    ).json()
+    assert weeks["start"] == "2024-01-01"
+    assert [(r["period_start"], r["log_count"], r["value_sum"], r["met"]) for r in weeks["rollups"]] == [
+        ("2024-01-01", 2, 5, True),
+        ("2024-01-08", 1, 1, False),
+        # the week of 2024-02-01 starts inside the range
+        ("2024-01-29", 1, 1, False),
+    ]
+
+    months = client.get(
+        "/analytics/rollups", params={"period": "month", "from": "2024-01-01", "to": "2024-02-29"}, headers=auth_headers,
+    ).json()["rollups"]
+    # 2 per week pro-rated over 31 days
+    assert [(r["period_start"], r["log_count"], r["target"]) for r in months] == [
+        ("2024-01-01", 3, 9),
+        ("2024-02-01", 1, 9),
+    ]
+
+    client.patch(f"/habits/{habit_id}", json={"goal_type": "DAILY"}, headers=auth_headers)
+    weeks = client.get(
+        "/analytics/rollups",
+        params={"period": "week", "from": "2024-01-01", "to": "2024-01-07", "habit_id": habit_id},
+        headers=auth_headers,
+    ).json()["rollups"]
+    assert [(r["target"], r["met"]) for r in weeks] == [(7, False)]
+
+    incremental = app_db(_rollup_rows)
+    app_db(rebuild_all_rollups)
+    assert app_db(_rollup_rows) == incremental
+
+def test_rollups_reject_inverted_range(client, auth_headers):
+    res = client.get("/analytics/rollups", params={"from": "2024-02-01", "to": "2024-01-01"}, headers=auth_headers)
+    assert res.status_code == 400
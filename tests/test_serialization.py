@@ -0,0 +1,35 @@
+from datetime import date, timedelta
+
+from app import config
+
+def test_fast_serialization_matches_pydantic(client, auth_headers, monkeypatch):
+    today = date.fromisoformat(client.get("/dashboard/today", headers=auth_headers).json()["date"])
+    habit_ids = []
+    for name, goal_type in (("Swim", "DAILY"), ("Gym", "X_PER_WEEK")):
+        res = client.post(
+            "/habits/",
+            json={"name": name, "goal_type": goal_type, "target_per_period": 2, "start_date": str(today - timedelta(days=9))},
+            headers=auth_headers,
+        )
+        habit_ids.append(res.json()["id"])
+    for offset in (0, 1, 2):
+        client.post(f"/habits/{habit_ids[0]}/logs", json={"date": str(today - timedelta(days=offset))}, headers=auth_headers)
+
+    urls = [
+        "/dashboard/today",
+        "/dashboard/range",
+        "/habits/",
+        "/habits/?limit=1",
+        f"/habits/{habit_ids[0]}/logs",
+        f"/habits/{habit_ids[0]}/logs?limit=2",
+    ]
+    for url in urls:
+        monkeypatch.setattr(config, "FAST_SERIALIZATION", False)
+        slow = client.get(url, headers=auth_headers)
+        monkeypatch.setattr(config, "FAST_SERIALIZATION", True)
+        fast = client.get(url, headers=auth_headers)
+        assert fast.status_code == slow.status_code == 200
+        assert fast.json() == slow.json(), url
+        assert fast.headers["content-type"] == "application/json"
+        if "etag" in slow.headers:
+            assert fast.headers["etag"] == slow.headers["etag"]
@@ -0,0 +1,129 @@
+from datetime import date
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import async_sessionmaker
+from sqlalchemy.orm import Session
+
+from main import app
+from app import models
+from app.db import create_engines
+from app.dependencies import get_directory_db
+from app.migrations import run_migrations
+from app.services.dashboard_store import get_dashboard_store
+from app.services.user_cache import get_user_cache
+from app.shards import IdCollision, ShardRouter, get_shard_router, move_user, rebalance_moves, set_shard_router
+
+@pytest.fixture()
+def sharded(tmp_path):
+    directory_engine, directory_async = create_engines(
+        f"sqlite:///{tmp_path / 'directory.db'}", f"sqlite+aiosqlite:///{tmp_path / 'directory.db'}",
+    )
+    router = ShardRouter([f"sqlite:///{tmp_path / f'shard{i}.db'}" for i in range(2)], directory=directory_engine)
+    for target in [directory_engine, *router.engines]:
+        run_migrations(target)
+    directory_sessions = async_sessionmaker(directory_async, autoflush=False, expire_on_commit=False)
+
+    async def override_get_directory_db():
+        async with directory_sessions() as session:
+            yield session
+
+    previous = get_shard_router()
+    set_shard_router(router)
+    app.dependency_overrides[get_directory_db] = override_get_directory_db
+    get_user_cache().clear()
+    get_dashboard_store().clear()
+    try:
+        with TestClient(app) as client:
+            yield client, directory_engine, router
+            client.portal.call(router.dispose)
+            client.portal.call(directory_async.dispose)
+    finally:
+        app.dependency_overrides.clear()
+        set_shard_router(previous)
+        directory_engine.dispose()
+
+def _signup(client, name):
+    client.post("/auth/register", json={"email": f"{name}@example.com", "username": name, "password": "supersecret123"})
+    token = client.post("/auth/login", data={"username": name, "password": "supersecret123"}).json()["access_token"]
+    headers = {"Authorization": f"Bearer {token}"}
+    habit = client.post(
+        "/habits/",
+        json={"name": f"{name}'s habit", "goal_type": "DAILY", "target_per_period": 1, "start_date": "2024-01-01"},
+        headers=headers,
+    ).json()
+    client.post(f"/habits/{habit['id']}/logs", json={"date": "2024-01-01"}, headers=headers)
+    return headers
+
+def _habit_owners(engine):
+    with Session(bind=engine) as db:
+        return sorted(db.scalars(select(models.Habit.user_id)))
+
+def test_users_are_routed_to_their_shard_and_can_be_moved(sharded):
+    client, directory_engine, router = sharded
+    ada = _signup(client, "ada")
+    bob = _signup(client, "bob")
+
+    # user 1 -> shard 1, user 2 -> shard 0; the directory keeps only accounts
+    assert _habit_owners(router.engines[0]) == [2]
+    assert _habit_owners(router.engines[1]) == [1]
+    assert _habit_owners(directory_engine) == []
+    assert client.get("/auth/me", headers=ada).json()["username"] == "ada"
+    assert [h["name"] for h in client.get("/habits/", headers=bob).json()] == ["bob's habit"]
+
+    with Session(bind=directory_engine) as directory:
+        assert move_user(router, directory, 1, 0) > 0
+    assert _habit_owners(router.engines[0]) == [1, 2]
+    assert _habit_owners(router.engines[1]) == []
+    with Session(bind=router.engines[0]) as shard:
+        assert shard.scalar(select(func.count()).select_from(models.HabitLog)) == 2
+    assert [h["name"] for h in client.get("/habits/", headers=ada).json()] == ["ada's habit"]
+
+def _ids(engine, model, user_id):
+    with Session(bind=engine) as db:
+        return sorted(db.scalars(select(model.id).where(model.user_id == user_id)))
+
+def test_moved_users_keep_their_habit_and_log_ids(sharded):
+    client, directory_engine, router = sharded
+    ada = _signup(client, "ada")
+    bob = _signup(client, "bob")
+    # numbered per shard, both habits would have been id 1
+    habit_ids = _ids(router.engines[1], models.Habit, 1)
+    log_ids = _ids(router.engines[1], models.HabitLog, 1)
+    assert not set(habit_ids) & set(_ids(router.engines[0], models.Habit, 2))
+
+    with Session(bind=directory_engine) as directory:
+        move_user(router, directory, 1, 0)
+    assert _ids(router.engines[0], models.Habit, 1) == habit_ids
+    assert _ids(router.engines[0], models.HabitLog, 1) == log_ids
+    habit_id = habit_ids[0]
+    assert client.get(f"/habits/{habit_id}", headers=ada).json()["name"] == "ada's habit"
+    res = client.post(f"/habits/{habit_id}/logs", json={"date": "2024-01-02"}, headers=ada)
+    assert res.status_code == 201, res.text
+    # new rows on the target shard still get ids no other shard has
+    assert res.json()["id"] not in log_ids + _ids(router.engines[0], models.HabitLog, 2)
+    assert client.get("/habits/", headers=bob).status_code == 200
+
+def test_move_refuses_ids_the_target_already_uses(sharded):
+    client, directory_engine, router = sharded
+    ada = _signup(client, "ada")
+    habit_id = _ids(router.engines[1], models.Habit, 1)[0]
+    # a row numbered before ids came from the directory
+    with Session(bind=router.engines[0]) as shard:
+        shard.merge(models.User(id=99, email="old@example.com", username="old", password_hash=""))
+        shard.execute(models.Habit.__table__.insert(), [{
+            "id": habit_id, "user_id": 99, "name": "old", "goal_type": "DAILY", "start_date": date(2024, 1, 1),
+        }])
+        shard.commit()
+
+    with Session(bind=directory_engine) as directory:
+        with pytest.raises(IdCollision):
+            move_user(router, directory, 1, 0)
+    # nothing moved
+    assert _ids(router.engines[1], models.Habit, 1) == [habit_id]
+    assert client.get(f"/habits/{habit_id}", headers=ada).json()["name"] == "ada's habit"
+
+def test_rebalance_moves_even_out_shards():
+    moves = rebalance_moves({0: 4, 1: 0, 2: 1}, {0: [1, 2, 3, 4], 1: [], 2: [5]})
+    assert moves == [(4, 1), (3, 1)]
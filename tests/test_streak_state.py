@@ -0,0 +1,75 @@
+import random
+from datetime import date, timedelta
+
+from app import models
+from app.services.streak_state import apply_log, init_streak_state, read_streaks
+from app.services.streaks import compute_streaks_for_daily, compute_streaks_for_x_per_week
+
+def _random_dates(rng, start, days, density):
+    return sorted(start + timedelta(days=i) for i in range(days) if rng.random() < density)
+
+def test_incremental_state_matches_full_recompute():
+    rng = random.Random(1234)
+    start = date(2024, 1, 1)
+
+    for _ in range(200):
+        goal_type = rng.choice(["DAILY", "X_PER_WEEK"])
+        target = rng.randint(1, 5)
+        dates = _random_dates(rng, start, rng.randint(1, 120), rng.random())
+        today = start + timedelta(days=rng.randint(0, 130))
+        dates = [d for d in dates if d <= today]
+
+        habit = models.Habit(goal_type=goal_type, target_per_period=target)
+        state = init_streak_state(habit)
+        for d in dates:
+            assert apply_log(state, d)
+
+        if goal_type == "DAILY":
+            expected = compute_streaks_for_daily(dates, today)
+        else:
+            expected = compute_streaks_for_x_per_week(dates, today, target)
+
+        completed_today, current, best = read_streaks(state, today)
+        assert (current, best) == expected
+        assert completed_today == (today in dates)
+
+def test_back_dated_log_asks_for_rebuild():
+    habit = models.Habit(goal_type="DAILY", target_per_period=1)
+    state = init_streak_state(habit)
+    assert apply_log(state, date(2024, 3, 10))
+    assert not apply_log(state, date(2024, 3, 9))
+
+def test_dashboard_streak_after_back_dated_log(client, auth_headers):
+    today_str = client.get("/dashboard/today", headers=auth_headers).json()["date"]
+    today = date.fromisoformat(today_str)
+
+    hres = client.post(
+        "/habits/",
+        json={"name": "Stretch", "goal_type": "DAILY", "start_date": str(today - timedelta(days=5))},
+        headers=auth_headers,
+    )
+    assert hres.status_code == 201, hres.text
+    habit_id = hres.json()["id"]
+
+    for offset in (0, 2, 1):
+        d = today - timedelta(days=offset)
+        res = client.post(f"/habits/{habit_id}/logs", json={"date": str(d)}, headers=auth_headers)
+        assert res.status_code == 201, res.text
+
+    data = client.get("/dashboard/today", headers=auth_headers).json()
+    item = next(i for i in data["habits"] if i["habit"]["id"] == habit_id)
+    assert item["is_completed"] is True
+    assert item["current_streak"] == 3
+    assert item["best_streak"] == 3
+
+    res = client.patch(
+        f"/habits/{habit_id}",
+        json={"goal_type": "X_PER_WEEK", "target_per_period": 10},
+        headers=auth_headers,
+    )
+    assert res.status_code == 200, res.text
+
+    data = client.get("/dashboard/today", headers=auth_headers).json()
+    item = next(i for i in data["habits"] if i["habit"]["id"] == habit_id)
+    assert item["current_streak"] == 0
+    assert item["best_streak"] == 0
@@ -0,0 +1,52 @@
+import random
+from datetime import date, timedelta
+
+from app.services.streaks import (
+    compute_streaks_batch, compute_streaks_for_daily, compute_streaks_for_x_per_week,
+)
+
+def _scalar(goal_type, dates, today, target):
+    if goal_type == "DAILY":
+        return compute_streaks_for_daily(dates, today)
+    if goal_type in ("X_PER_WEEK", "WEEKLY"):
+        return compute_streaks_for_x_per_week(dates, today, target)
+    return 0, 0
+
+def test_batch_matches_scalar_functions():
+    rng = random.Random(42)
+    start = date(2022, 12, 20)
+
+    goal_ids, goal_types, targets = [], [], []
+    log_habits, log_ordinals = [], []
+    histories = {}
+    for habit_id in rng.sample(range(1, 10_000), 300):
+        goal_type = rng.choice(["DAILY", "X_PER_WEEK", "WEEKLY", "CUSTOM"])
+        target = rng.randint(0, 4)
+        density = rng.random()
+        dates = [start + timedelta(days=i) for i in range(rng.randint(0, 150)) if rng.random() < density]
+        # duplicate dates count towards weekly targets, but not daily runs
+        dates += rng.sample(dates, min(len(dates), rng.randint(0, 3)))
+        rng.shuffle(dates)
+
+        goal_ids.append(habit_id)
+        goal_types.append(goal_type)
+        targets.append(target)
+        histories[habit_id] = (goal_type, dates, target)
+        log_habits += [habit_id] * len(dates)
+        log_ordinals += [d.toordinal() for d in dates]
+
+    # logs for an unknown habit are ignored
+    log_habits.append(10_001)
+    log_ordinals.append(start.toordinal())
+
+    for offset in (0, 30, 75, 140, 200):
+        today = start + timedelta(days=offset)
+        current, best = compute_streaks_batch(log_habits, log_ordinals, goal_ids, goal_types, targets, today)
+        for i, habit_id in enumerate(goal_ids):
+            goal_type, dates, target = histories[habit_id]
+            assert (current[i], best[i]) == _scalar(goal_type, dates, today, target), (goal_type, target, today)
+
+def test_batch_with_no_logs():
+    current, best = compute_streaks_batch([], [], [1, 2], ["DAILY", "WEEKLY"], [1, 1], date(2024, 1, 1))
+    assert current.tolist() == [0, 0]
+    assert best.tolist() == [0, 0]
@@ -0,0 +1,73 @@
+import random
+from datetime import date, timedelta
+
+import pytest
+
+from app import config, models
+from app.services.streaks import compute_streaks_for_daily, compute_streaks_for_x_per_week
+from app.services.streaks_sql import compute_streaks_sql
+
+def _expected(goal_type, dates, today, target):
+    dates = [d for d in dates if d <= today]
+    if goal_type == "DAILY":
+        current, best = compute_streaks_for_daily(dates, today)
+    elif goal_type == "X_PER_WEEK":
+        current, best = compute_streaks_for_x_per_week(dates, today, target)
+    else:
+        current, best = 0, 0
+    return today in dates, current, best
+
+@pytest.mark.parametrize("seed", range(5))
+def test_sql_streaks_match_python(db_session, seed):
+    rng = random.Random(seed)
+    user = models.User(email=f"parity{seed}@example.com", username=f"parity{seed}", password_hash="x")
+    db_session.add(user)
+    db_session.flush()
+
+    start = date(2023, 1, 1)
+    histories = {}
+    for _ in range(40):
+        goal_type = rng.choice(["DAILY", "X_PER_WEEK", "WEEKLY"])
+        target = rng.randint(1, 4)
+        habit = models.Habit(
+            user_id=user.id, name="h", goal_type=goal_type, target_per_period=target, start_date=start,
+        )
+        db_session.add(habit)
+        db_session.flush()
+
+        density = rng.random()
+        dates = [start + timedelta(days=i) for i in range(rng.randint(0, 200)) if rng.random() < density]
+        db_session.add_all(
+            models.HabitLog(habit_id=habit.id, user_id=user.id, date=d) for d in dates
+        )
+        histories[habit.id] = (goal_type, dates, target)
+    db_session.flush()
+
+    for _ in range(5):
+        today = start + timedelta(days=rng.randint(0, 220))
+        results = compute_streaks_sql(db_session, histories.keys(), today)
+        assert len(results) == len(histories)
+        for habit_id, (goal_type, dates, target) in histories.items():
+            assert results[habit_id] == _expected(goal_type, dates, today, target), (habit_id, goal_type, today)
+
+def test_dashboard_with_sql_backend(client, auth_headers, monkeypatch):
+    monkeypatch.setattr(config, "STREAK_BACKEND", "sql")
+    today_str = client.get("/dashboard/today", headers=auth_headers).json()["date"]
+    today = date.fromisoformat(today_str)
+
+    hres = client.post(
+        "/habits/",
+        json={"name": "Run", "goal_type": "DAILY", "start_date": str(today - timedelta(days=3))},
+        headers=auth_headers,
+    )
+    habit_id = hres.json()["id"]
+    for offset in (0, 1, 3):
+        d = today - timedelta(days=offset)
+        res = client.post(f"/habits/{habit_id}/logs", json={"date": str(d)}, headers=auth_headers)
+        assert res.status_code == 201, res.text
+
+    data = client.get("/dashboard/today", headers=auth_headers).json()
+    item = next(i for i in data["habits"] if i["habit"]["id"] == habit_id)
+    assert item["is_completed"] is True
+    assert item["current_streak"] == 2
+    assert item["best_streak"] == 2
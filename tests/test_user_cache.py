@@ -0,0 +1,75 @@
+import time
+
+from app import models
+from app.services.user_cache import (
+    InProcessUserCache, SharedUserCache, get_user_cache, set_user_cache, user_to_cache,
+)
+
+class FakeSharedStore:
+    """Stands in for a Redis client shared by several workers."""
+
+    def __init__(self):
+        self.data = {}
+
+    def get(self, key):
+        value = self.data.get(key)
+        if value is None or value[1] < time.monotonic():
+            return None
+        return value[0]
+
+    def set(self, key, value, ex=None):
+        self.data[key] = (value, time.monotonic() + (ex or 3600))
+
+    def delete(self, key):
+        self.data.pop(key, None)
+
+def test_in_process_cache_is_bounded_and_expires():
+    cache = InProcessUserCache(maxsize=2, ttl_seconds=60)
+    cache.set(1, {"id": 1})
+    cache.set(2, {"id": 2})
+    assert cache.get(1) == {"id": 1}
+    cache.set(3, {"id": 3})
+
+    assert cache.get(2) is None
+    assert cache.get(3) == {"id": 3}
+    assert cache.stats()["size"] == 2
+
+    expiring = InProcessUserCache(maxsize=2, ttl_seconds=-1)
+    expiring.set(1, {"id": 1})
+    assert expiring.get(1) is None
+
+def test_auth_me_is_served_from_cache(client, auth_headers, user_payload):
+    cache = get_user_cache()
+    before = cache.stats()
+
+    first = client.get("/auth/me", headers=auth_headers)
+    second = client.get("/auth/me", headers=auth_headers)
+    assert first.status_code == second.status_code == 200
+    assert first.json() == second.json()
+    assert second.json()["username"] == user_payload["username"]
+
+    after = cache.stats()
+    assert after["hits"] >= before["hits"] + 1
+
+def test_user_update_invalidates_shared_cache(db_session):
+    previous = get_user_cache()
+    shared = SharedUserCache(FakeSharedStore(), ttl_seconds=60)
+    set_user_cache(shared)
+    try:
+        user = models.User(email="cache@example.com", username="cache", password_hash="x", timezone="UTC")
+        db_session.add(user)
+        db_session.commit()
+
+        shared.set(user.id, user_to_cache(user))
+        assert shared.get(user.id)["timezone"] == "UTC"
+
+        user.timezone = "Europe/Paris"
+        db_session.commit()
+        assert shared.get(user.id) is None
+
+        shared.set(user.id, user_to_cache(user))
+        db_session.delete(user)
+        db_session.commit()
+        assert shared.get(user.id) is None
+    finally:
+        set_user_cache(previous)